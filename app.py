@@ -1,36 +1,241 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
+from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash, g, has_request_context, Response, stream_with_context, abort
 import requests
 import json
+import math
 import os
+import atexit
+import click
+import csv
+import glob
+import gzip
+import hashlib
+import io
+import inspect
+import mimetypes
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
 from supabase import create_client, Client
 import re
 from openai import OpenAI
-from functools import wraps
+from functools import lru_cache, wraps
+from concurrent.futures import ThreadPoolExecutor
 import bcrypt
+import httpx
 from dotenv import load_dotenv
+from werkzeug.middleware.proxy_fix import ProxyFix
+from nutrition import COMMON_FOODS, NUTRIENTS_PER_100G, food_matcher, measure_portion, parse_quantity
+from nutrition_store import NutritionStore, write_nutrition_store
+from calorie_engine import NutrientTable, item_calories, recompute_totals
+from meal_index import MealIndex
+from job_queue import JobQueue, RetryLater
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# True when serving under gevent (gunicorn -k gevent, see gunicorn.conf.py).
+# Sockets are then cooperative, so one worker process holds hundreds of
+# in-flight model and Supabase calls instead of one per OS thread.
+try:
+    from gevent import monkey as gevent_monkey
+    GREEN_THREADS = gevent_monkey.is_module_patched('socket')
+except ImportError:
+    GREEN_THREADS = False
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
+app = Flask(__name__, static_folder=None)  # Static files are served by serve_static below
 app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-here')  # Change this in production
 
+# Number of reverse proxies in front of the app (Vercel's edge is one). Only
+# the X-Forwarded-For entries they appended are trusted, so request.remote_addr
+# is the real client and a spoofed header can't dodge the per-IP limiter.
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', '1'))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+# Static assets are read once at startup with a content hash and gzip/brotli
+# variants. Versioned URLs (?v=<hash>) are cached for a year; pages and
+# unversioned URLs revalidate with an ETag. Rendered pages differ per user,
+# so only the most recent PAGE_CACHE_SIZE are kept, compressed at levels fast
+# enough for the request path.
+STATIC_DIR = os.path.join(app.root_path, 'static')
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+PAGE_CACHE_SIZE = int(os.environ.get('PAGE_CACHE_SIZE', '256'))
+
+static_assets = {}
+
+def compress_variants(body, mimetype, fast=False):
+    variants = {'identity': body}
+    if mimetype.startswith(COMPRESSIBLE_TYPES):
+        variants['gzip'] = gzip.compress(body, compresslevel=6 if fast else 9, mtime=0)
+        if brotli:
+            variants['br'] = brotli.compress(body, quality=5 if fast else 11)
+    return variants
+
+@lru_cache(maxsize=PAGE_CACHE_SIZE)
+def page_variants(body):
+    return compress_variants(body, 'text/html', fast=True)
+
+def load_static_assets():
+    """Read every static file once, with its content hash and compressed variants"""
+    for root, _, files in os.walk(STATIC_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            filename = os.path.relpath(path, STATIC_DIR).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                body = f.read()
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            static_assets[filename] = {
+                'version': hashlib.md5(body).hexdigest()[:12],
+                'mimetype': mimetype,
+                'variants': compress_variants(body, mimetype)
+            }
+
+def asset_url(filename):
+    """Content-versioned URL for a static file, for use in templates"""
+    asset = static_assets.get(filename)
+    return url_for('static', filename=filename, v=asset['version'] if asset else None)
+
+app.jinja_env.globals['asset_url'] = asset_url
+
+def compressed_response(variants, mimetype, etag, status=200):
+    """Pick the best encoding the client accepts and build a conditional response"""
+    accepted = request.headers.get('Accept-Encoding', '')
+    encoding = next((e for e in ('br', 'gzip') if e in variants and e in accepted), 'identity')
+    response = Response(variants[encoding], status=status, mimetype=mimetype)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag(f"{etag}-{encoding}")
+    return response
+
+@app.route('/static/<path:filename>', endpoint='static')
+def serve_static(filename):
+    asset = static_assets.get(filename)
+    if not asset:
+        abort(404)
+    
+    response = compressed_response(asset['variants'], asset['mimetype'], asset['version'])
+    if request.args.get('v') == asset['version']:
+        response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def send_page(html, status=200):
+    """Serve a rendered page compressed, with an ETag so repeat visits get a 304"""
+    body = html.encode('utf-8')
+    etag = hashlib.md5(body).hexdigest()
+    response = compressed_response(page_variants(body), 'text/html', etag, status)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request) if status == 200 else response
+
+load_static_assets()
+
 # Configuration - Using GitHub's AI API
 GITHUB_TOKEN = os.environ.get('GITHUB_TOKEN')
-GITHUB_ENDPOINT = "https://models.github.ai/inference"
+GITHUB_ENDPOINT = os.environ.get('MODEL_ENDPOINT', "https://models.github.ai/inference")  # loadtest.py points this at a fake model
 
 # Supabase configuration
 SUPABASE_URL = os.environ.get('SUPABASE_URL')
 SUPABASE_KEY = os.environ.get('SUPABASE_KEY')
 
-# Initialize Supabase client
+# Shared HTTP connection pools for Supabase and the model API. One pooled,
+# keep-alive client per upstream is reused by every gunicorn thread, so
+# requests skip the TCP/TLS handshake once a connection is warm. Green-thread
+# workers keep far more calls in flight, so their pools default larger.
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '200' if GREEN_THREADS else '20'))
+HTTP_KEEPALIVE_CONNECTIONS = int(os.environ.get('HTTP_KEEPALIVE_CONNECTIONS', '50' if GREEN_THREADS else '10'))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get('HTTP_KEEPALIVE_EXPIRY', '30'))
+HTTP_TIMEOUT = float(os.environ.get('HTTP_TIMEOUT', '60'))
+
+try:
+    import h2  # noqa: F401  (httpx only negotiates HTTP/2 when h2 is installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+HTTP2_ENABLED = HTTP2_AVAILABLE and os.environ.get('HTTP2_ENABLED', 'true').lower() != 'false'
+
+http_pool_stats = {}
+http_pool_stats_lock = threading.Lock()
+
+class PooledTransport(httpx.HTTPTransport):
+    """HTTP transport that records how busy its connection pool is"""
+    
+    def __init__(self, name, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = {
+            'in_flight': 0,
+            'peak_in_flight': 0,
+            'requests': 0,
+            'saturated': 0  # Requests that had to wait because every connection was busy
+        }
+        http_pool_stats[name] = self
+    
+    def handle_request(self, request):
+        with http_pool_stats_lock:
+            self.stats['requests'] += 1
+            if self.stats['in_flight'] >= HTTP_POOL_SIZE:
+                self.stats['saturated'] += 1
+            self.stats['in_flight'] += 1
+            self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.stats['in_flight'])
+        try:
+            return super().handle_request(request)
+        finally:
+            with http_pool_stats_lock:
+                self.stats['in_flight'] -= 1
+
+def create_pooled_http_client(name, **kwargs):
+    """Build a keep-alive httpx client whose pool usage is reported under `name`"""
+    transport = PooledTransport(
+        name,
+        limits=httpx.Limits(
+            max_connections=HTTP_POOL_SIZE,
+            max_keepalive_connections=HTTP_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        http2=HTTP2_ENABLED
+    )
+    return httpx.Client(transport=transport, timeout=HTTP_TIMEOUT, **kwargs)
+
+def get_http_pool_stats():
+    """Snapshot of pool usage per upstream"""
+    snapshot = {}
+    with http_pool_stats_lock:
+        for name, transport in http_pool_stats.items():
+            snapshot[name] = dict(transport.stats, pool_size=HTTP_POOL_SIZE, http2=HTTP2_ENABLED)
+            try:
+                connections = transport._pool.connections
+                snapshot[name]['open_connections'] = len(connections)
+                snapshot[name]['idle_connections'] = sum(1 for c in connections if c.is_idle())
+            except AttributeError:
+                pass
+    return snapshot
+
+# Initialize Supabase client, swapping its PostgREST session for the pooled one
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase.postgrest.session = create_pooled_http_client(
+    'supabase',
+    base_url=str(supabase.postgrest.session.base_url),
+    headers=supabase.postgrest.session.headers
+)
 
 # Initialize OpenAI client for GitHub AI
+model_http_client = create_pooled_http_client('models')
 client = OpenAI(
     base_url=GITHUB_ENDPOINT,
     api_key=GITHUB_TOKEN,
+    http_client=model_http_client,
 )
 
 # Login required decorator
@@ -42,37 +247,301 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Request-scoped data loader. Read helpers decorated with @request_memoized
+# run each distinct query at most once per request; writes invalidate the
+# helpers whose results they change.
+DATA_LOADER_DEBUG = os.environ.get('DATA_LOADER_DEBUG', '').lower() in ('1', 'true', 'yes')
+
+def request_memoized(f):
+    signature = inspect.signature(f)
+    
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not has_request_context():
+            return f(*args, **kwargs)
+        
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (f.__name__, tuple(bound.arguments.items()))
+        
+        cache = g.setdefault('data_cache', {})
+        if key in cache:
+            return cache[key]
+        
+        g.query_count = g.get('query_count', 0) + 1
+        result = f(*args, **kwargs)
+        cache[key] = result
+        return result
+    return decorated_function
+
+def invalidate_request_cache(*names):
+    """Forget memoized results for the given helper names in this request"""
+    if not has_request_context() or 'data_cache' not in g:
+        return
+    for key in [k for k in g.data_cache if k[0] in names]:
+        del g.data_cache[key]
+
+@app.after_request
+def report_query_count(response):
+    if DATA_LOADER_DEBUG:
+        query_count = g.get('query_count', 0)
+        response.headers['X-Query-Count'] = str(query_count)
+        print(f"[data loader] {request.method} {request.path}: {query_count} queries")
+    return response
+
+# Password hashing runs on a small dedicated pool so bursts of logins
+# cannot tie up the request threads the LLM routes need.
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+BCRYPT_WORKERS = int(os.environ.get('BCRYPT_WORKERS', '2'))
+BCRYPT_MAX_PENDING = int(os.environ.get('BCRYPT_MAX_PENDING', '16'))
+BCRYPT_TIMEOUT = float(os.environ.get('BCRYPT_TIMEOUT', '10'))
+
+if GREEN_THREADS:
+    # Patched threads are greenlets, and bcrypt would block every request in
+    # the worker; gevent's executor runs it on real OS threads instead
+    from gevent.threadpool import ThreadPoolExecutor as PasswordExecutor
+else:
+    PasswordExecutor = ThreadPoolExecutor
+password_pool = PasswordExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix='bcrypt')
+password_slots = threading.BoundedSemaphore(BCRYPT_MAX_PENDING)
+
+class PasswordPoolBusy(Exception):
+    pass
+
+def run_in_password_pool(fn, *args):
+    """Run a bcrypt call on the password pool, refusing work once the backlog is full"""
+    if not password_slots.acquire(blocking=False):
+        raise PasswordPoolBusy("Too many sign-in attempts right now. Please try again shortly.")
+    try:
+        return password_pool.submit(fn, *args).result(timeout=BCRYPT_TIMEOUT)
+    finally:
+        password_slots.release()
+
+def hash_password(password):
+    return run_in_password_pool(
+        lambda pw: bcrypt.hashpw(pw.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8'),
+        password
+    )
+
+def check_password(password, hashed):
+    return run_in_password_pool(lambda pw, h: bcrypt.checkpw(pw.encode('utf-8'), h.encode('utf-8')), password, hashed)
+
+def password_needs_rehash(hashed):
+    """True when a stored hash uses a lower work factor than BCRYPT_ROUNDS"""
+    try:
+        return int(hashed.split('$')[2]) < BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+# Token buckets for /login, /register and the model-backed routes. Bucket
+# state lives in a pluggable store: the local one only sees this process, so
+# set RATE_LIMIT_BACKEND=redis for limits shared by every worker.
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'local')
+
+class LocalBucketStore:
+    """Buckets in a dict; each entry is (tokens, updated, time it is full again)"""
+    
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+    
+    def take(self, key, capacity, refill_per_second, cost=1):
+        """Spend cost tokens (a negative cost refunds) from key's bucket; returns (allowed, seconds until one is free)"""
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated, _ = self.buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+            allowed = tokens >= cost
+            if allowed:
+                tokens = min(capacity, tokens - cost)
+            self.buckets[key] = (tokens, now, now + (capacity - tokens) / refill_per_second)
+            # Drop full buckets now and then so the table does not grow forever
+            if len(self.buckets) > 10000:
+                self.buckets = {k: v for k, v in self.buckets.items() if v[2] > now}
+            return allowed, 0.0 if allowed else (1 - tokens) / refill_per_second
+
+class RedisBucketStore:
+    """Buckets as Redis hashes, updated atomically by a script using the Redis clock"""
+    
+    SCRIPT = """
+    redis.replicate_commands()
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    local wait = (1 - tokens) / rate
+    if tokens >= cost then
+        tokens = math.min(capacity, tokens - cost)
+        allowed = 1
+        wait = 0
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(wait)}
+    """
+    
+    def __init__(self, url):
+        import redis
+        self.redis = redis.Redis.from_url(url)
+        self.script = self.redis.register_script(self.SCRIPT)
+    
+    def take(self, key, capacity, refill_per_second, cost=1):
+        allowed, wait = self.script(keys=[f"ratelimit:{key}"], args=[capacity, refill_per_second, cost])
+        return bool(allowed), float(wait)
+
+RATE_LIMIT_BACKENDS = {
+    'local': LocalBucketStore,
+    'redis': lambda: RedisBucketStore(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+}
+rate_limit_store = RATE_LIMIT_BACKENDS[RATE_LIMIT_BACKEND]()
+
+class TokenBucketLimiter:
+    def __init__(self, capacity, refill_per_second, store=None):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.store = store or rate_limit_store
+    
+    def check(self, key):
+        """(allowed, seconds to wait before retrying); a limit of 0 per minute is off"""
+        if self.refill_per_second <= 0:
+            return True, 0.0
+        try:
+            return self.store.take(key, self.capacity, self.refill_per_second)
+        except Exception as e:
+            # A broken limiter store should not take the app down with it
+            print(f"Error checking rate limit: {str(e)}")
+            return True, 0.0
+    
+    def allow(self, key):
+        return self.check(key)[0]
+    
+    def refund(self, key):
+        """Give back a token taken by check() for a call that never happened"""
+        if self.refill_per_second <= 0:
+            return
+        try:
+            self.store.take(key, self.capacity, self.refill_per_second, cost=-1)
+        except Exception as e:
+            print(f"Error refunding rate limit: {str(e)}")
+
+auth_ip_limiter = TokenBucketLimiter(
+    int(os.environ.get('AUTH_IP_BURST', '20')),
+    float(os.environ.get('AUTH_IP_PER_MINUTE', '10')) / 60
+)
+auth_username_limiter = TokenBucketLimiter(
+    int(os.environ.get('AUTH_USERNAME_BURST', '5')),
+    float(os.environ.get('AUTH_USERNAME_PER_MINUTE', '3')) / 60
+)
+
+# Model quota: each user gets their own bucket, charged per request (queued
+# meals from /sync_entries and /import are charged when their job runs, see
+# take_model_token), and every model call, in a request or a background
+# job, also draws from one global bucket sized to the model API's shared limit
+llm_user_limiter = TokenBucketLimiter(
+    int(os.environ.get('LLM_USER_BURST', '10')),
+    float(os.environ.get('LLM_USER_PER_MINUTE', '6')) / 60
+)
+llm_global_limiter = TokenBucketLimiter(
+    int(os.environ.get('LLM_GLOBAL_BURST', '60')),
+    float(os.environ.get('LLM_GLOBAL_PER_MINUTE', '120')) / 60
+)
+
+def llm_quota_exceeded(user_id):
+    """Take a model call from user_id's and the global quota; a 429 response if either is spent, else None"""
+    # The user's own bucket first, so one user's loop never drains the global one
+    user_key = f"llm:user:{user_id}"
+    allowed, wait = llm_user_limiter.check(user_key)
+    scope = 'user'
+    if allowed:
+        allowed, wait = llm_global_limiter.check('llm:global')
+        scope = 'global'
+        if not allowed:
+            # No call is made, so the user keeps their token
+            llm_user_limiter.refund(user_key)
+    if allowed:
+        return None
+    
+    retry_after = max(1, math.ceil(wait))
+    message = ("You're sending requests faster than your AI quota allows." if scope == 'user'
+               else 'The AI service is busy right now.')
+    response = jsonify({
+        'success': False,
+        'error': f"{message} Please try again in {retry_after} seconds.",
+        'retry_after': retry_after,
+        'quota': scope
+    })
+    return response, 429, {'Retry-After': str(retry_after)}
+
+def llm_quota(f):
+    """Answer 429 with Retry-After, before any model call, once a quota is spent"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        return llm_quota_exceeded(session['user_id']) or f(*args, **kwargs)
+    return decorated_function
+
+def get_client_ip():
+    return request.remote_addr
+
+def auth_throttled(username):
+    """Check the per-IP and per-username buckets for an auth attempt"""
+    ip_allowed = auth_ip_limiter.allow(f"ip:{get_client_ip()}")
+    username_allowed = auth_username_limiter.allow(f"user:{(username or '').lower()}")
+    return not (ip_allowed and username_allowed)
+
 # User authentication functions
+# Postgres' default names for the UNIQUE columns of users (SQL.txt)
+UNIQUE_CONSTRAINT_MESSAGES = {
+    'users_username_key': "Username already exists",
+    'users_email_key': "Email already exists"
+}
+
+def unique_violation_message(error):
+    """Friendly message for a users UNIQUE constraint violation, or None"""
+    code = getattr(error, 'code', None)
+    text = ' '.join(str(part) for part in (getattr(error, 'message', ''), getattr(error, 'details', ''), error))
+    if code != '23505' and 'duplicate key' not in text:
+        return None
+    # Go by the constraint name; the details echo the value, which may contain anything
+    constraint = re.search(r'unique constraint "(\w+)"', text)
+    if constraint and constraint.group(1) in UNIQUE_CONSTRAINT_MESSAGES:
+        return UNIQUE_CONSTRAINT_MESSAGES[constraint.group(1)]
+    return "Username or email already exists"
+
 def register_user(username, password, email):
     try:
-        # Check if username already exists
-        result = supabase.table('users').select('*').eq('username', username).execute()
-        if result.data:
-            return False, "Username already exists"
-        
-        # Check if email already exists
-        result = supabase.table('users').select('*').eq('email', email).execute()
-        if result.data:
-            return False, "Email already exists"
-        
         # Hash password
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        hashed_password = hash_password(password)
         
         # Create new user
         user_data = {
             'username': username,
-            'password': hashed_password.decode('utf-8'),
+            'password': hashed_password,
             'email': email,
             'created_at': datetime.now().isoformat()
         }
         
-        result = supabase.table('users').insert(user_data).execute()
+        # The UNIQUE constraints on username and email do the duplicate checks
+        try:
+            result = supabase.table('users').insert(user_data).execute()
+        except Exception as e:
+            message = unique_violation_message(e)
+            if message:
+                return False, message
+            raise
         
         if result.data and len(result.data) > 0:
             return True, result.data[0]['id']
         else:
             return False, "Failed to create user"
             
+    except PasswordPoolBusy as e:
+        return False, str(e)
     except Exception as e:
         print(f"Registration error: {str(e)}")  # Add logging
         return False, str(e)
@@ -80,7 +549,7 @@ def register_user(username, password, email):
 def verify_user(username, password):
     try:
         # Get user by username
-        result = supabase.table('users').select('*').eq('username', username).execute()
+        result = supabase.table('users').select('id, username, password').eq('username', username).execute()
         
         if not result.data:
             return False, "User not found"
@@ -88,7 +557,13 @@ def verify_user(username, password):
         user = result.data[0]
         
         # Verify password
-        if bcrypt.checkpw(password.encode('utf-8'), user['password'].encode('utf-8')):
+        if check_password(password, user['password']):
+            if password_needs_rehash(user['password']):
+                # Upgrade old hashes to the current work factor while we have the plaintext
+                try:
+                    supabase.table('users').update({'password': hash_password(password)}).eq('id', user['id']).execute()
+                except Exception as e:
+                    print(f"Error rehashing password: {str(e)}")
             return True, user
         return False, "Invalid password"
     except Exception as e:
@@ -97,232 +572,69 @@ def verify_user(username, password):
 # Routes for authentication
 @app.route('/login', methods=['GET', 'POST'])
 def login():
+    status = 200
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
         
-        success, result = verify_user(username, password)
-        
-        if success:
-            session['user_id'] = result['id']
-            session['username'] = result['username']
-            return redirect(url_for('index'))
+        if auth_throttled(username):
+            flash('Too many login attempts. Please wait a minute and try again.', 'error')
+            status = 429
         else:
-            flash(result, 'error')
-    
-    return r'''
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Login - AI Calorie Tracker</title>
-        <script src="https://cdn.tailwindcss.com"></script>
-        <script src="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/js/all.min.js"></script>
-        <style>
-            .gradient-bg {
-                background: linear-gradient(135deg, #f6f8fd 0%, #f1f4f9 100%);
-            }
-            .glass-effect {
-                background: rgba(255, 255, 255, 0.7);
-                backdrop-filter: blur(20px);
-                border: 1px solid rgba(255, 255, 255, 0.8);
-                box-shadow: 0 8px 32px rgba(0, 0, 0, 0.05);
-            }
-            .card-hover {
-                transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-            }
-            .card-hover:hover {
-                transform: translateY(-5px);
-                box-shadow: 0 20px 25px -5px rgba(0, 0, 0, 0.05), 0 10px 10px -5px rgba(0, 0, 0, 0.02);
-            }
-            .fade-in {
-                animation: fadeIn 0.5s ease-in;
-            }
-            @keyframes fadeIn {
-                from { opacity: 0; transform: translateY(10px); }
-                to { opacity: 1; transform: translateY(0); }
-            }
-        </style>
-    </head>
-    <body class="min-h-screen gradient-bg flex items-center justify-center p-4">
-        <div class="max-w-md w-full">
-            <div class="glass-effect rounded-2xl p-8 card-hover fade-in">
-                <div class="text-center mb-8">
-                    <div class="w-20 h-20 bg-gradient-to-br from-blue-500 to-purple-600 rounded-2xl flex items-center justify-center text-white text-3xl font-bold mx-auto mb-4 shadow-lg">
-                        <i class="fas fa-utensils"></i>
-                    </div>
-                    <h1 class="text-3xl font-bold text-gray-800 mb-2">Welcome Back</h1>
-                    <p class="text-gray-500">Sign in to continue tracking your nutrition</p>
-                </div>
-                
-                <form method="POST" class="space-y-6">
-                    <div class="space-y-4">
-                        <div>
-                            <label class="block text-sm font-medium text-gray-700 mb-2">Username</label>
-                            <div class="relative">
-                                <div class="absolute inset-y-0 left-0 pl-3 flex items-center pointer-events-none">
-                                    <i class="fas fa-user text-gray-400"></i>
-                                </div>
-                                <input type="text" name="username" required
-                                    class="w-full pl-10 pr-4 py-3 rounded-xl border border-gray-200 focus:ring-2 focus:ring-blue-500/20 focus:border-blue-500 transition-all duration-200 bg-white/50"
-                                    placeholder="Enter your username">
-                            </div>
-                        </div>
-                        
-                        <div>
-                            <label class="block text-sm font-medium text-gray-700 mb-2">Password</label>
-                            <div class="relative">
-                                <div class="absolute inset-y-0 left-0 pl-3 flex items-center pointer-events-none">
-                                    <i class="fas fa-lock text-gray-400"></i>
-                                </div>
-                                <input type="password" name="password" required
-                                    class="w-full pl-10 pr-4 py-3 rounded-xl border border-gray-200 focus:ring-2 focus:ring-blue-500/20 focus:border-blue-500 transition-all duration-200 bg-white/50"
-                                    placeholder="Enter your password">
-                            </div>
-                        </div>
-                    </div>
-                    
-                    <button type="submit"
-                        class="w-full bg-gradient-to-r from-blue-500 via-purple-500 to-pink-500 hover:from-blue-600 hover:via-purple-600 hover:to-pink-600 text-white font-medium py-3 px-6 rounded-xl transition-all duration-300 flex items-center justify-center shadow-lg hover:shadow-xl transform hover:scale-[1.02]">
-                        <i class="fas fa-sign-in-alt mr-2"></i>
-                        Sign In
-                    </button>
-                </form>
-                
-                <div class="mt-8 text-center">
-                    <p class="text-gray-500">Don't have an account? 
-                        <a href="/register" class="text-blue-500 hover:text-blue-600 font-medium transition-colors duration-200">Create Account</a>
-                    </p>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    '''
+            success, result = verify_user(username, password)
+            
+            if success:
+                session['user_id'] = result['id']
+                session['username'] = result['username']
+                return redirect(url_for('index'))
+            else:
+                flash(result, 'error')
+    
+    return send_page(render_template('login.html'), status)
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
+    status = 200
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
         email = request.form.get('email')
         
-        success, result = register_user(username, password, email)
-        
-        if success:
-            flash('Registration successful! Please login.', 'success')
-            return redirect(url_for('login'))
+        if auth_throttled(username):
+            flash('Too many registration attempts. Please wait a minute and try again.', 'error')
+            status = 429
         else:
-            flash(result, 'error')
-    
-    return r'''
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Register - AI Calorie Tracker</title>
-        <script src="https://cdn.tailwindcss.com"></script>
-        <script src="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/js/all.min.js"></script>
-        <style>
-            .gradient-bg {
-                background: linear-gradient(135deg, #f6f8fd 0%, #f1f4f9 100%);
-            }
-            .glass-effect {
-                background: rgba(255, 255, 255, 0.7);
-                backdrop-filter: blur(20px);
-                border: 1px solid rgba(255, 255, 255, 0.8);
-                box-shadow: 0 8px 32px rgba(0, 0, 0, 0.05);
-            }
-            .card-hover {
-                transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-            }
-            .card-hover:hover {
-                transform: translateY(-5px);
-                box-shadow: 0 20px 25px -5px rgba(0, 0, 0, 0.05), 0 10px 10px -5px rgba(0, 0, 0, 0.02);
-            }
-            .fade-in {
-                animation: fadeIn 0.5s ease-in;
-            }
-            @keyframes fadeIn {
-                from { opacity: 0; transform: translateY(10px); }
-                to { opacity: 1; transform: translateY(0); }
-            }
-        </style>
-    </head>
-    <body class="min-h-screen gradient-bg flex items-center justify-center p-4">
-        <div class="max-w-md w-full">
-            <div class="glass-effect rounded-2xl p-8 card-hover fade-in">
-                <div class="text-center mb-8">
-                    <div class="w-20 h-20 bg-gradient-to-br from-blue-500 to-purple-600 rounded-2xl flex items-center justify-center text-white text-3xl font-bold mx-auto mb-4 shadow-lg">
-                        <i class="fas fa-user-plus"></i>
-                    </div>
-                    <h1 class="text-3xl font-bold text-gray-800 mb-2">Create Account</h1>
-                    <p class="text-gray-500">Join our nutrition tracking community</p>
-                </div>
-                
-                <form method="POST" class="space-y-6">
-                    <div class="space-y-4">
-                        <div>
-                            <label class="block text-sm font-medium text-gray-700 mb-2">Username</label>
-                            <div class="relative">
-                                <div class="absolute inset-y-0 left-0 pl-3 flex items-center pointer-events-none">
-                                    <i class="fas fa-user text-gray-400"></i>
-                                </div>
-                                <input type="text" name="username" required
-                                    class="w-full pl-10 pr-4 py-3 rounded-xl border border-gray-200 focus:ring-2 focus:ring-blue-500/20 focus:border-blue-500 transition-all duration-200 bg-white/50"
-                                    placeholder="Choose a username">
-                            </div>
-                        </div>
-                        
-                        <div>
-                            <label class="block text-sm font-medium text-gray-700 mb-2">Email</label>
-                            <div class="relative">
-                                <div class="absolute inset-y-0 left-0 pl-3 flex items-center pointer-events-none">
-                                    <i class="fas fa-envelope text-gray-400"></i>
-                                </div>
-                                <input type="email" name="email" required
-                                    class="w-full pl-10 pr-4 py-3 rounded-xl border border-gray-200 focus:ring-2 focus:ring-blue-500/20 focus:border-blue-500 transition-all duration-200 bg-white/50"
-                                    placeholder="Enter your email">
-                            </div>
-                        </div>
-                        
-                        <div>
-                            <label class="block text-sm font-medium text-gray-700 mb-2">Password</label>
-                            <div class="relative">
-                                <div class="absolute inset-y-0 left-0 pl-3 flex items-center pointer-events-none">
-                                    <i class="fas fa-lock text-gray-400"></i>
-                                </div>
-                                <input type="password" name="password" required
-                                    class="w-full pl-10 pr-4 py-3 rounded-xl border border-gray-200 focus:ring-2 focus:ring-blue-500/20 focus:border-blue-500 transition-all duration-200 bg-white/50"
-                                    placeholder="Create a password">
-                            </div>
-                        </div>
-                    </div>
-                    
-                    <button type="submit"
-                        class="w-full bg-gradient-to-r from-blue-500 via-purple-500 to-pink-500 hover:from-blue-600 hover:via-purple-600 hover:to-pink-600 text-white font-medium py-3 px-6 rounded-xl transition-all duration-300 flex items-center justify-center shadow-lg hover:shadow-xl transform hover:scale-[1.02]">
-                        <i class="fas fa-user-plus mr-2"></i>
-                        Create Account
-                    </button>
-                </form>
-                
-                <div class="mt-8 text-center">
-                    <p class="text-gray-500">Already have an account? 
-                        <a href="/login" class="text-blue-500 hover:text-blue-600 font-medium transition-colors duration-200">Sign In</a>
-                    </p>
-                </div>
-            </div>
-        </div>
-    </body>
-    </html>
-    '''
+            success, result = register_user(username, password, email)
+            
+            if success:
+                flash('Registration successful! Please login.', 'success')
+                return redirect(url_for('login'))
+            else:
+                flash(result, 'error')
+    
+    return send_page(render_template('register.html'), status)
+
+@app.route('/pool_stats')
+@login_required
+def pool_stats():
+    return jsonify(get_http_pool_stats())
+
+@app.route('/sw.js')
+def service_worker():
+    # Served from the root so the worker's scope covers the whole app
+    asset = static_assets['sw.js']
+    response = compressed_response(asset['variants'], asset['mimetype'], asset['version'])
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 @app.route('/logout')
 def logout():
     session.clear()
-    return redirect(url_for('login'))
+    response = redirect(url_for('login'))
+    # Also drops the offline queue, cached pages and service worker in browsers
+    # that support it, for when the page's own cleanup didn't run
+    response.headers['Clear-Site-Data'] = '"cache", "storage"'
+    return response
 
 # Available models
 AVAILABLE_MODELS = {
@@ -382,34 +694,12 @@ def parse_food_entries(response_text):
             # Process each food entry to add multipliers
             processed_entries = []
             for entry in data:
-                # Convert quantity to number
-                quantity = entry['quantity']
-                if isinstance(quantity, str):
-                    # Handle common quantity strings
-                    if 'bit' in quantity.lower() or 'little' in quantity.lower():
-                        quantity = 0.5
-                    elif 'half' in quantity.lower():
-                        quantity = 0.5
-                    elif 'quarter' in quantity.lower():
-                        quantity = 0.25
-                    else:
-                        # Try to extract any numbers from the string
-                        numbers = ''.join(filter(str.isdigit, quantity))
-                        quantity = float(numbers) if numbers else 1.0
-                
-                # Calculate total multiplier based on quantity and portion
-                portion_multiplier = 1.0
-                if entry.get('portion'):
-                    portion_multiplier = get_portion_multiplier(entry['portion'])
-                
-                total_multiplier = float(quantity) * portion_multiplier
+                # Quantity ("1.5", "1/2", "2-3", "200g") and portion in servings and grams
+                measured = measure_portion(entry['food'], entry['quantity'], entry.get('portion'))
                 
                 processed_entry = {
                     'food': entry['food'],
-                    'quantity': float(quantity),
-                    'portion': entry.get('portion', 'standard'),
-                    'container_multiplier': portion_multiplier,
-                    'total_multiplier': total_multiplier,
+                    **measured,
                     'calories_per_item': float(entry['calories_per_item']),
                     'total_calories': float(entry['total_calories']),
                     'confidence': float(entry.get('confidence', 0.8))
@@ -443,37 +733,21 @@ def parse_food_entries(response_text):
             
             # Extract quantity
             elif current_food and 'Quantity' in line:
-                try:
-                    quantity = ''.join(filter(str.isdigit, line))
-                    current_food['quantity'] = float(quantity) if quantity else 1.0
-                except:
-                    pass
+                current_food['quantity'] = parse_quantity(line.split(':', 1)[-1])['amount']
             
             # Extract calories
             elif current_food and ('Calories' in line or 'calories' in line):
-                try:
-                    calories = ''.join(filter(str.isdigit, line))
-                    current_food['calories_per_item'] = float(calories) if calories else 0
-                    current_food['total_calories'] = current_food['calories_per_item'] * current_food['quantity']
-                except:
-                    pass
+                current_food['calories_per_item'] = parse_quantity(line.split(':', 1)[-1], default=0.0)['amount']
+                current_food['total_calories'] = current_food['calories_per_item'] * current_food['quantity']
         
         # Process extracted entries to add multipliers
         processed_entries = []
         for entry in food_entries:
-            # Calculate total multiplier based on quantity and portion
-            portion_multiplier = 1.0
-            if entry.get('portion'):
-                portion_multiplier = get_portion_multiplier(entry['portion'])
-            
-            total_multiplier = float(entry['quantity']) * portion_multiplier
+            measured = measure_portion(entry['food'], entry['quantity'], entry.get('portion'))
             
             processed_entry = {
                 'food': entry['food'],
-                'quantity': float(entry['quantity']),
-                'portion': entry.get('portion', 'standard'),
-                'container_multiplier': portion_multiplier,
-                'total_multiplier': total_multiplier,
+                **measured,
                 'calories_per_item': float(entry['calories_per_item']),
                 'total_calories': float(entry['total_calories']),
                 'confidence': float(entry.get('confidence', 0.8))
@@ -537,8 +811,8 @@ def parse_insights(response_text):
             'next_meal': 'Suggesting next meal...'
         }
 
-def advanced_food_extraction(text, model_client, model_name):
-    """AI-powered food and quantity extraction with calorie estimation"""
+def advanced_food_extraction(text, model_client, model_name, raise_errors=False):
+    """AI-powered food and quantity extraction with calorie estimation; raise_errors=True raises model failures instead of returning no foods"""
     logs = []
     logs.append(f"🤖 === AI FOOD DETECTION STARTED WITH {AVAILABLE_MODELS[model_name]} ===")
     logs.append(f"📝 Input text: '{text}'")
@@ -622,39 +896,24 @@ def advanced_food_extraction(text, model_client, model_name):
                     
             except Exception as e:
                 logs.append(f"\n⚠️ Response Processing Error: {str(e)}")
+                if raise_errors:
+                    raise
                 return [], logs
         else:
             logs.append("\n❌ Empty Response Error:")
             logs.append("  • No food items detected")
+            if raise_errors:
+                raise RuntimeError('Empty response from the model')
             return [], logs
             
     except Exception as e:
         logs.append("\n❌ API Error:")
         logs.append(f"  • Error Type: {type(e).__name__}")
         logs.append(f"  • Error Message: {str(e)}")
+        if raise_errors:
+            raise
         return [], logs
 
-def get_portion_multiplier(portion):
-    """Convert portion descriptions to calorie multipliers"""
-    portion = portion.lower()
-    multipliers = {
-        'small': 0.7,
-        'medium': 1.0,
-        'large': 1.3,
-        'bowl': 1.5,
-        'plate': 2.0,
-        'piece': 1.0,
-        'slice': 1.0,
-        'cup': 1.0,
-        'glass': 1.0,
-        'serving': 1.0,
-        'portion': 1.0,
-        'half': 0.5,
-        'quarter': 0.25,
-        'full': 1.0
-    }
-    return multipliers.get(portion, 1.0)
-
 def calculate_enhanced_calories(food_entries):
     """Calculate calories with detailed breakdown using AI-detected values"""
     total_calories = 0
@@ -663,20 +922,29 @@ def calculate_enhanced_calories(food_entries):
     
     logs.append("\n🧮 === CALORIE CALCULATION ===")
     
-    for entry in food_entries:
+    # Same vectorized path the bulk recalculation uses, with one row per item
+    calories = item_calories([entry['calories_per_item'] for entry in food_entries],
+                             [entry['total_multiplier'] for entry in food_entries])
+    
+    for entry, adjusted_calories in zip(food_entries, calories.tolist()):
         # Use the AI-provided calories per item
         base_calories = entry['calories_per_item']
         total_multiplier = entry['total_multiplier']
-        
-        adjusted_calories = int(base_calories * total_multiplier)
         total_calories += adjusted_calories
         
+        # Entries from measure_portion carry their weight, so keep the energy density too
+        grams = entry.get('grams')
+        kcal_per_100g = round(adjusted_calories * 100 / grams, 1) if grams else None
+        
         detailed_breakdown.append({
             'food': entry['food'],
             'base_calories': base_calories,
             'quantity': entry['quantity'],
+            'portion': entry.get('portion', 'standard'),
             'container_multiplier': entry['container_multiplier'],
             'total_multiplier': total_multiplier,
+            'grams': round(grams, 1) if grams else None,
+            'kcal_per_100g': kcal_per_100g,
             'total_calories': adjusted_calories,
             'confidence': entry['confidence']
         })
@@ -684,43 +952,171 @@ def calculate_enhanced_calories(food_entries):
         logs.append(f"  • {entry['food']}:")
         logs.append(f"    - Base calories: {base_calories}")
         logs.append(f"    - Multiplier: {total_multiplier:.1f}x")
+        if grams:
+            logs.append(f"    - Weight: {grams:.0f} g ({kcal_per_100g} kcal/100g)")
         logs.append(f"    - Total: {adjusted_calories} cal")
         logs.append(f"    - Confidence: {entry['confidence']:.2f}")
     
     logs.append(f"\n🔥 Total calories: {total_calories}")
     return total_calories, detailed_breakdown, logs
 
-def save_to_database(user_input, food_entries, total_calories, detailed_breakdown):
-    """Save calorie entry to Supabase database"""
+def decode_json_column(value, default=None):
+    """Read a food_items/detailed_breakdown value stored as JSONB or legacy JSON text"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return default
+    return value if value is not None else default
+
+def build_food_item_rows(entry_id, user_id, date, detailed_breakdown):
+    """One calorie_entry_items row per detected food in a breakdown"""
+    rows = []
+    for item in detailed_breakdown or []:
+        if not isinstance(item, dict) or not item.get('food'):
+            continue
+        rows.append({
+            'entry_id': entry_id,
+            'user_id': user_id,
+            'date': date,
+            'food': str(item['food']).strip().lower(),
+            'quantity': item.get('quantity'),
+            'portion': item.get('portion'),
+            'multiplier': item.get('total_multiplier'),
+            'grams': item.get('grams'),
+            'base_calories': item.get('base_calories'),
+            'calories': item.get('total_calories'),
+            'confidence': item.get('confidence')
+        })
+    return rows
+
+def save_to_database(user_input, food_entries, total_calories, detailed_breakdown, user_id=None, entry_date=None,
+                     created_at=None, client_id=None):
+    """Save calorie entry to Supabase database (for the session user unless user_id is given)"""
     logs = []
     
     try:
         data = {
-            'user_id': session['user_id'],  # Add user_id to the entry
+            'user_id': user_id or session['user_id'],  # Add user_id to the entry
             'user_input': user_input,
-            'food_items': json.dumps([entry['food'] for entry in food_entries]),
+            'food_items': [entry['food'] for entry in food_entries],
             'total_calories': total_calories,
-            'detailed_breakdown': json.dumps(detailed_breakdown),
-            'created_at': datetime.now().isoformat(),
-            'date': datetime.now().date().isoformat()
+            'detailed_breakdown': detailed_breakdown,
+            'created_at': created_at or datetime.now().astimezone().isoformat(),
+            'date': entry_date or datetime.now().date().isoformat()
         }
+        if client_id:
+            # Client-generated id from an offline sync; UNIQUE per user makes retries no-ops
+            data['client_id'] = client_id
         
         result = supabase.table('calorie_entries').insert(data).execute()
-        logs.append(f"💾 Database save successful: Entry ID {result.data[0]['id']}")
-        return True, result.data[0]['id'], logs
+        entry_id = result.data[0]['id']
+        invalidate_request_cache('get_daily_summary', 'get_week_entries', 'get_recent_history')
+        add_to_meal_index(data['user_id'], result.data[0], bump_data_version(data['user_id']))
+        publish_change(data['user_id'], 'entry_added', entry=result.data[0])
+        logs.append(f"💾 Database save successful: Entry ID {entry_id}")
+        
+        item_rows = build_food_item_rows(entry_id, data['user_id'], data['date'], detailed_breakdown)
+        if item_rows:
+            try:
+                supabase.table('calorie_entry_items').insert(item_rows).execute()
+                logs.append(f"💾 Saved {len(item_rows)} food item rows")
+            except Exception as e:
+                # The entry itself is saved; the backfill can rebuild its items later
+                logs.append(f"⚠️ Food item rows not saved: {str(e)}")
+        return True, entry_id, logs
     except Exception as e:
         logs.append(f"❌ Database error: {str(e)}")
         return False, None, logs
 
+def backfill_food_items(batch_size=500):
+    """Stream every calorie entry by id and create its missing food item rows"""
+    last_id = 0
+    entries_seen = 0
+    rows_written = 0
+    
+    while True:
+        result = supabase.table('calorie_entries').select('id, user_id, date, detailed_breakdown').gt('id', last_id).order('id').limit(batch_size).execute()
+        if not result.data:
+            break
+        
+        entry_ids = [entry['id'] for entry in result.data]
+        existing = supabase.table('calorie_entry_items').select('entry_id').in_('entry_id', entry_ids).execute()
+        done_ids = {row['entry_id'] for row in existing.data}
+        
+        rows = []
+        for entry in result.data:
+            if entry['id'] in done_ids:
+                continue
+            breakdown = decode_json_column(entry['detailed_breakdown'], [])
+            rows.extend(build_food_item_rows(entry['id'], entry['user_id'], entry['date'], breakdown))
+        
+        if rows:
+            supabase.table('calorie_entry_items').insert(rows).execute()
+        
+        entries_seen += len(result.data)
+        rows_written += len(rows)
+        last_id = entry_ids[-1]
+        print(f"Backfilled through entry {last_id}: {entries_seen} entries, {rows_written} item rows")
+    
+    return entries_seen, rows_written
+
+@app.cli.command('backfill-food-items')
+def backfill_food_items_command():
+    """Populate calorie_entry_items from existing calorie entries"""
+    entries_seen, rows_written = backfill_food_items()
+    print(f"Done: {entries_seen} entries scanned, {rows_written} item rows written")
+
+def recalculate_entry_totals(batch_size=2000):
+    """Recompute total_calories for every entry from its stored breakdown, a batch at a time"""
+    last_id = 0
+    entries_seen = 0
+    entries_fixed = 0
+    users_changed = set()
+    
+    while True:
+        result = supabase.table('calorie_entries').select('id, user_id, total_calories, detailed_breakdown').gt('id', last_id).order('id').limit(batch_size).execute()
+        if not result.data:
+            break
+        
+        # One vectorized pass over every item in the batch
+        breakdowns = [decode_json_column(entry['detailed_breakdown'], []) for entry in result.data]
+        totals = recompute_totals(breakdowns).tolist()
+        
+        for entry, breakdown, total in zip(result.data, breakdowns, totals):
+            if breakdown and total != entry['total_calories']:
+                supabase.table('calorie_entries').update({'total_calories': total}).eq('id', entry['id']).execute()
+                users_changed.add(entry['user_id'])
+                entries_fixed += 1
+        
+        entries_seen += len(result.data)
+        last_id = result.data[-1]['id']
+        print(f"Recalculated through entry {last_id}: {entries_seen} entries, {entries_fixed} updated")
+    
+    for user_id in users_changed:
+        bump_data_version(user_id)
+    return entries_seen, entries_fixed
+
+@app.cli.command('recalculate-totals')
+def recalculate_totals_command():
+    """Recompute every entry's total_calories from its detailed breakdown"""
+    entries_seen, entries_fixed = recalculate_entry_totals()
+    print(f"Done: {entries_seen} entries scanned, {entries_fixed} totals updated")
+
 def delete_entry(entry_id):
     """Delete a calorie entry from database"""
     try:
         # Only delete if the entry belongs to the current user
         result = supabase.table('calorie_entries').delete().eq('id', entry_id).eq('user_id', session['user_id']).execute()
+        invalidate_request_cache('get_daily_summary', 'get_week_entries', 'get_recent_history')
+        bump_data_version(session['user_id'])
+        for removed in result.data or []:
+            publish_change(session['user_id'], 'entry_removed', entry_id=removed['id'], date=removed['date'], total_calories=removed['total_calories'])
         return True, f"Entry {entry_id} deleted successfully"
     except Exception as e:
         return False, f"Error deleting entry: {str(e)}"
 
+@request_memoized
 def get_daily_summary(date=None):
     """Get daily calorie summary from database for current user"""
     if not date:
@@ -732,42 +1128,337 @@ def get_daily_summary(date=None):
     except Exception as e:
         return []
 
+@request_memoized
+def get_week_entries():
+    """Get the last 7 days of calorie entries for current user, newest first"""
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=6)  # Last 7 days
+    
+    result = supabase.table('calorie_entries').select('*').eq('user_id', session['user_id']).gte('date', start_date.isoformat()).lte('date', end_date.isoformat()).order('created_at', desc=True).execute()
+    return result.data
+
+def summarize_week(entries):
+    """Group a week of entries into per-day chart data"""
+    end_date = datetime.now().date()
+    start_date = end_date - timedelta(days=6)
+    
+    # Group by date and sum calories
+    daily_totals = {}
+    daily_entries = {}  # Track entries per day
+    
+    for entry in entries:
+        date = entry['date']
+        calories = entry['total_calories']
+        daily_totals[date] = daily_totals.get(date, 0) + calories
+        daily_entries[date] = daily_entries.get(date, 0) + 1
+    
+    # Create chart data for last 7 days
+    chart_data = []
+    total_entries = 0
+    for i in range(7):
+        date = (start_date + timedelta(days=i)).isoformat()
+        chart_data.append({
+            'date': date,
+            'calories': daily_totals.get(date, 0),
+            'entries': daily_entries.get(date, 0),
+            'day': (start_date + timedelta(days=i)).strftime('%a')
+        })
+        total_entries += daily_entries.get(date, 0)
+    
+    return chart_data, total_entries
+
 def get_weekly_data():
     """Get weekly calorie data for charts for current user"""
     try:
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=6)  # Last 7 days
-        
-        # Get all entries for the week for current user
-        result = supabase.table('calorie_entries').select('*').eq('user_id', session['user_id']).gte('date', start_date.isoformat()).lte('date', end_date.isoformat()).execute()
-        
-        # Group by date and sum calories
-        daily_totals = {}
-        daily_entries = {}  # Track entries per day
-        
-        for entry in result.data:
-            date = entry['date']
-            calories = entry['total_calories']
-            daily_totals[date] = daily_totals.get(date, 0) + calories
-            daily_entries[date] = daily_entries.get(date, 0) + 1
-        
-        # Create chart data for last 7 days
-        chart_data = []
-        total_entries = 0
-        for i in range(7):
-            date = (start_date + timedelta(days=i)).isoformat()
-            chart_data.append({
-                'date': date,
-                'calories': daily_totals.get(date, 0),
-                'entries': daily_entries.get(date, 0),
-                'day': (start_date + timedelta(days=i)).strftime('%a')
-            })
-            total_entries += daily_entries.get(date, 0)
-        
-        return chart_data, total_entries
+        return summarize_week(get_week_entries())
     except Exception as e:
         return [], 0
 
+HISTORY_LIMIT = 15
+
+@request_memoized
+def get_recent_history(limit=HISTORY_LIMIT):
+    """Most recent calorie entries for current user"""
+    result = supabase.table('calorie_entries').select('*').eq('user_id', session['user_id']).order('created_at', desc=True).limit(limit).execute()
+    return result.data
+
+def build_dashboard_state():
+    """Everything the dashboard renders, built from one week query plus history if needed"""
+    week_entries = get_week_entries()
+    today = datetime.now().date().isoformat()
+    today_entries = [entry for entry in week_entries if entry['date'] == today]
+    chart_data, total_entries = summarize_week(week_entries)
+    
+    # The week query is already newest first, so it covers history when long enough
+    if len(week_entries) >= HISTORY_LIMIT:
+        history = week_entries[:HISTORY_LIMIT]
+    else:
+        history = get_recent_history()
+    
+    return {
+        'daily_summary': {
+            'date': today,
+            'entries': today_entries,
+            'total_calories': sum(entry['total_calories'] for entry in today_entries),
+            'entries_count': len(today_entries)
+        },
+        'history': history,
+        'weekly': {
+            'data': chart_data,
+            'total_entries': total_entries
+        }
+    }
+
+# Per-user change feed. Writes publish small deltas (entry added/removed,
+# entries cleared, state changed) that /events pushes to every open tab
+# and device over SSE. The local backend only reaches clients connected to
+# this process; set CHANGE_FEED_BACKEND=redis to fan out across workers.
+CHANGE_FEED_BACKEND = os.environ.get('CHANGE_FEED_BACKEND', 'local')
+CHANGE_FEED_HEARTBEAT = float(os.environ.get('CHANGE_FEED_HEARTBEAT', '15'))
+
+class LocalChangeFeed:
+    """In-process pub/sub: one bounded queue per open connection"""
+    
+    def __init__(self):
+        self.subscribers = {}
+        self.lock = threading.Lock()
+    
+    def publish(self, user_id, event):
+        with self.lock:
+            targets = list(self.subscribers.get(user_id, ()))
+        for target in targets:
+            try:
+                target.put_nowait(event)
+            except queue.Full:
+                pass  # A stalled client misses deltas and resyncs on reconnect
+    
+    def subscribe(self, user_id):
+        subscription = queue.Queue(maxsize=100)
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add(subscription)
+        
+        feed = self
+        class Subscription:
+            def get(self, timeout):
+                try:
+                    return subscription.get(timeout=timeout)
+                except queue.Empty:
+                    return None
+            
+            def close(self):
+                with feed.lock:
+                    feed.subscribers.get(user_id, set()).discard(subscription)
+                    if not feed.subscribers.get(user_id):
+                        feed.subscribers.pop(user_id, None)
+        return Subscription()
+
+class RedisChangeFeed:
+    """Redis pub/sub, so every worker's clients see every write"""
+    
+    def __init__(self, url):
+        import redis
+        self.redis = redis.Redis.from_url(url)
+    
+    def publish(self, user_id, event):
+        self.redis.publish(f"changes:{user_id}", json.dumps(event))
+    
+    def subscribe(self, user_id):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(f"changes:{user_id}")
+        
+        class Subscription:
+            def get(self, timeout):
+                message = pubsub.get_message(timeout=timeout)
+                return json.loads(message['data']) if message else None
+            
+            def close(self):
+                pubsub.close()
+        return Subscription()
+
+CHANGE_FEED_BACKENDS = {
+    'local': LocalChangeFeed,
+    'redis': lambda: RedisChangeFeed(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+}
+change_feed = CHANGE_FEED_BACKENDS[CHANGE_FEED_BACKEND]()
+
+def publish_change(user_id, event_type, **data):
+    """Push a delta to the user's open clients; never fails the write that caused it"""
+    event = dict(data, type=event_type)
+    # Lets the tab that made the change skip the echo of its own write
+    if has_request_context():
+        event['origin'] = request.headers.get('X-Client-Id')
+    try:
+        change_feed.publish(user_id, event)
+    except Exception as e:
+        print(f"Error publishing change: {str(e)}")
+
+@app.route('/events')
+@login_required
+def events():
+    user_id = session['user_id']
+    
+    def stream():
+        subscription = change_feed.subscribe(user_id)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                event = subscription.get(CHANGE_FEED_HEARTBEAT)
+                if event is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            subscription.close()
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+# Per-user data version, bumped on every calorie entry write. Read endpoints
+# derive their ETag / Last-Modified from it and answer 304 without running
+# their queries when the client is already up to date.
+@request_memoized
+def get_data_version(user_id):
+    """(version, updated_at) for a user, or None if it cannot be read"""
+    try:
+        result = supabase.table('users').select('data_version, data_updated_at').eq('id', user_id).execute()
+        if not result.data:
+            return None
+        row = result.data[0]
+        updated_at = datetime.fromisoformat(row['data_updated_at']) if row.get('data_updated_at') else None
+        return row['data_version'], updated_at
+    except Exception as e:
+        print(f"Error getting data version: {str(e)}")
+        return None
+
+def bump_data_version(user_id):
+    """Mark a user's data as changed so cached reads revalidate; returns the new version, or None"""
+    version = None
+    try:
+        result = supabase.rpc('bump_data_version', {'uid': user_id}).execute()
+        version = result.data if isinstance(result.data, int) else None
+    except Exception as e:
+        print(f"Error bumping data version: {str(e)}")
+    invalidate_request_cache('get_data_version')
+    return version
+
+def versioned_read(f):
+    """Serve a read endpoint conditionally on the user's data version"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return f(*args, **kwargs)
+        
+        version = get_data_version(session['user_id'])
+        if version is None:
+            return f(*args, **kwargs)
+        
+        # Responses depend on "today" too, so a new day invalidates them without a write
+        data_version, updated_at = version
+        today = datetime.now().date()
+        etag = hashlib.md5(f"{session['user_id']}:{data_version}:{today}:{request.full_path}".encode('utf-8')).hexdigest()
+        last_modified = datetime.combine(today, datetime.min.time()).astimezone()
+        if updated_at and updated_at > last_modified:
+            last_modified = updated_at
+        
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(etag)
+        else:
+            not_modified = bool(request.if_modified_since) and last_modified.replace(microsecond=0) <= request.if_modified_since
+        
+        if not_modified:
+            response = Response(status=304)
+        else:
+            response = app.make_response(f(*args, **kwargs))
+            body = response.get_json(silent=True)
+            if response.status_code != 200 or (isinstance(body, dict) and body.get('success') is False):
+                return response
+        
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return decorated_function
+
+def wants_dashboard_state():
+    """Mutating endpoints return fresh dashboard state when asked with include_state"""
+    if request.args.get('include_state', '').lower() in ('1', 'true', 'yes'):
+        return True
+    body = request.get_json(silent=True) or {}
+    return bool(body.get('include_state'))
+
+def with_dashboard_state(payload):
+    if payload.get('success') and wants_dashboard_state():
+        try:
+            payload['dashboard_state'] = build_dashboard_state()
+        except Exception as e:
+            print(f"Error building dashboard state: {str(e)}")
+    return payload
+
+# Per-user index of past meals. Repeats ("same breakfast as yesterday", or a
+# meal typed again) reuse the stored breakdown instead of calling a model.
+# A meal saved here is added to the cached index in place; an index is
+# refetched only when the data version moved some other way (a delete, an
+# import, another worker).
+REUSE_MIN_SIMILARITY = float(os.environ.get('REUSE_MIN_SIMILARITY', '0.9'))
+MEAL_INDEX_ENTRIES = int(os.environ.get('MEAL_INDEX_ENTRIES', '300'))
+MEAL_INDEX_CACHE_SIZE = int(os.environ.get('MEAL_INDEX_CACHE_SIZE', '256'))
+meal_indexes = OrderedDict()  # user_id -> (data_version, MealIndex), least recently used first
+meal_indexes_lock = threading.Lock()
+
+def get_meal_index(user_id):
+    """The user's MealIndex over their most recent entries, newest first"""
+    version = get_data_version(user_id)
+    with meal_indexes_lock:
+        cached = meal_indexes.get(user_id)
+        if cached and version is not None and cached[0] == version[0]:
+            meal_indexes.move_to_end(user_id)
+            return cached[1]
+    
+    result = supabase.table('calorie_entries').select('id, user_input, total_calories, detailed_breakdown, date, created_at').eq('user_id', user_id).order('created_at', desc=True).limit(MEAL_INDEX_ENTRIES).execute()
+    entries = [dict(entry, detailed_breakdown=decode_json_column(entry['detailed_breakdown'], [])) for entry in result.data]
+    index = MealIndex(entries, limit=MEAL_INDEX_ENTRIES)
+    
+    if version is not None:
+        with meal_indexes_lock:
+            meal_indexes[user_id] = (version[0], index)
+            meal_indexes.move_to_end(user_id)
+            while len(meal_indexes) > MEAL_INDEX_CACHE_SIZE:
+                meal_indexes.popitem(last=False)
+    return index
+
+def add_to_meal_index(user_id, entry, version):
+    """Add a just-saved entry to the user's cached index, if the write that made version was the only one since"""
+    if version is None:
+        return
+    with meal_indexes_lock:
+        cached = meal_indexes.get(user_id)
+        if not cached or cached[0] != version - 1:
+            return
+        meal_indexes[user_id] = (version, cached[1])
+    cached[1].add(dict(entry, detailed_breakdown=decode_json_column(entry.get('detailed_breakdown'), [])))
+
+def client_timezone(name):
+    """The tzinfo for an IANA zone name the client sent, else the server's own"""
+    if name:
+        try:
+            return ZoneInfo(str(name))
+        except (KeyError, ValueError):
+            pass
+    return datetime.now().astimezone().tzinfo
+
+def find_reusable_entry(user_id, user_input, now=None):
+    """(entry, similarity, reason) for a past entry that already answers user_input, or None.
+    
+    now is when the meal was logged, in the user's timezone; "same as yesterday" is relative to it.
+    """
+    try:
+        return get_meal_index(user_id).find(user_input, REUSE_MIN_SIMILARITY, now)
+    except Exception as e:
+        print(f"Error searching past meals: {str(e)}")
+        return None
+
 def get_llm_insights(food_entries, total_calories, model_client, model_name):
     """Get AI-powered insights about the food entries using the selected model"""
     logs = []
@@ -869,1449 +1560,26 @@ def get_llm_insights(food_entries, total_calories, model_client, model_name):
 @app.route('/')
 @login_required
 def index():
-    return r'''
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>AI Calorie Tracker Pro</title>
-        <script src="https://cdn.tailwindcss.com"></script>
-        <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-        <script src="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/js/all.min.js"></script>
-        <style>
-            .gradient-bg {
-                background: linear-gradient(135deg, #f6f8fd 0%, #f1f4f9 100%);
-            }
-            .glass-effect {
-                background: rgba(255, 255, 255, 0.7);
-                backdrop-filter: blur(20px);
-                border: 1px solid rgba(255, 255, 255, 0.8);
-                box-shadow: 0 8px 32px rgba(0, 0, 0, 0.05);
-            }
-            .log-container {
-                font-family: 'JetBrains Mono', monospace;
-                max-height: 400px;
-                overflow-y: auto;
-            }
-            .voice-recording {
-                animation: pulse 1.5s infinite;
-            }
-            @keyframes pulse {
-                0%, 100% { transform: scale(1); }
-                50% { transform: scale(1.05); }
-            }
-            .card-hover {
-                transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-            }
-            .card-hover:hover {
-                transform: translateY(-5px);
-                box-shadow: 0 20px 25px -5px rgba(0, 0, 0, 0.05), 0 10px 10px -5px rgba(0, 0, 0, 0.02);
-            }
-            .fade-in {
-                animation: fadeIn 0.5s ease-in;
-            }
-            @keyframes fadeIn {
-                from { opacity: 0; transform: translateY(10px); }
-                to { opacity: 1; transform: translateY(0); }
-            }
-            .slide-in {
-                animation: slideIn 0.5s ease-out;
-            }
-            @keyframes slideIn {
-                from { transform: translateX(-20px); opacity: 0; }
-                to { transform: translateX(0); opacity: 1; }
-            }
-            .custom-scrollbar::-webkit-scrollbar {
-                width: 6px;
-            }
-            .custom-scrollbar::-webkit-scrollbar-track {
-                background: rgba(0, 0, 0, 0.05);
-                border-radius: 3px;
-            }
-            .custom-scrollbar::-webkit-scrollbar-thumb {
-                background: rgba(0, 0, 0, 0.1);
-                border-radius: 3px;
-            }
-            .custom-scrollbar::-webkit-scrollbar-thumb:hover {
-                background: rgba(0, 0, 0, 0.2);
-            }
-            .sidebar {
-                transition: all 0.3s ease;
-                position: sticky;
-                top: 0;
-                height: 100vh;
-                overflow-y: auto;
-            }
-            .sidebar-tab {
-                transition: all 0.2s ease;
-                position: relative;
-                overflow: hidden;
-            }
-            .sidebar-tab::before {
-                content: '';
-                position: absolute;
-                left: 0;
-                top: 0;
-                height: 100%;
-                width: 0;
-                background: linear-gradient(90deg, rgba(99, 102, 241, 0.1), rgba(99, 102, 241, 0));
-                transition: width 0.3s ease;
-            }
-            .sidebar-tab:hover::before {
-                width: 100%;
-            }
-            .sidebar-tab.active {
-                background: rgba(255, 255, 255, 0.9);
-                box-shadow: 0 4px 12px rgba(0, 0, 0, 0.05);
-            }
-            .sidebar-tab.active::before {
-                width: 100%;
-                background: linear-gradient(90deg, rgba(99, 102, 241, 0.2), rgba(99, 102, 241, 0));
-            }
-            .tab-content {
-                display: none;
-            }
-            .tab-content.active {
-                display: block;
-                animation: fadeIn 0.3s ease-in;
-            }
-            .chat-message {
-                animation: slideIn 0.3s ease-out;
-            }
-            .chat-input {
-                transition: all 0.2s ease;
-            }
-            .chat-input:focus {
-                box-shadow: 0 0 0 2px rgba(99, 102, 241, 0.2);
-            }
-            .typing-indicator {
-                display: flex;
-                align-items: center;
-                gap: 4px;
-            }
-            .typing-indicator span {
-                width: 8px;
-                height: 8px;
-                background: #6366f1;
-                border-radius: 50%;
-                animation: typing 1s infinite;
-            }
-            .typing-indicator span:nth-child(2) { animation-delay: 0.2s; }
-            .typing-indicator span:nth-child(3) { animation-delay: 0.4s; }
-            @keyframes typing {
-                0%, 100% { transform: translateY(0); }
-                50% { transform: translateY(-4px); }
-            }
-        </style>
-    </head>
-    <body class="min-h-screen gradient-bg">
-        <!-- Header -->
-        <div class="bg-white/80 backdrop-blur-md border-b border-white/20 sticky top-0 z-50">
-            <div class="max-w-7xl mx-auto px-6 py-4">
-                <div class="flex items-center justify-between">
-                    <div class="flex items-center space-x-4">
-                        <div class="w-12 h-12 rounded-xl bg-gradient-to-br from-blue-500 to-purple-600 flex items-center justify-center text-white text-2xl font-bold shadow-lg">
-                            <i class="fas fa-utensils"></i>
-                        </div>
-                        <div>
-                            <h1 class="text-2xl font-bold text-gray-800">AI Calorie Tracker</h1>
-                            
-                        </div>
-                    </div>
-                    <div class="flex items-center space-x-6">
-                        <div class="text-right">
-                            <div class="flex items-center justify-end space-x-2 mb-1">
-                                <span class="text-sm text-gray-500">Today's Goal</span>
-                                <span class="text-sm font-medium text-gray-700" id="todayProgress">0/2000</span>
-                            </div>
-                            <div class="w-48 h-2 bg-gray-200 rounded-full overflow-hidden">
-                                <div id="goalProgressBar" class="h-full bg-gradient-to-r from-blue-500 to-purple-600 transition-all duration-500" style="width: 0%"></div>
-                            </div>
-                        </div>
-                        <div class="flex items-center space-x-4">
-                            <select id="modelSelect" class="bg-white/50 border border-gray-200 rounded-lg px-3 py-2 text-sm text-gray-700 focus:outline-none focus:ring-2 focus:ring-blue-500/20 focus:border-blue-500">
-                                <option value="microsoft/Phi-4">Fast Phi-4</option>
-                                <option value="mistral-ai/Ministral-3B">Fastest Ministral-3B</option>
-                                <option value="openai/gpt-4.1">Fast GPT-4.1</option>
-                                <option value="deepseek/DeepSeek-R1">Slowest DeepSeek-R1</option>
-                            </select>
-                            <button 
-                                onclick="resetAllData()"
-                                class="bg-red-500/10 hover:bg-red-500/20 text-red-500 px-4 py-2 rounded-lg transition-all duration-200 flex items-center"
-                                title="Reset All Data"
-                            >
-                                <i class="fas fa-trash-alt mr-2"></i>
-                                Reset All
-                            </button>
-                            <a href="/logout" class="w-12 h-12 rounded-full bg-gradient-to-br from-red-400 to-red-500 flex items-center justify-center text-white shadow-lg hover:shadow-xl transition-all duration-200" title="Logout">
-                                <i class="fas fa-sign-out-alt"></i>
-                            </a>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-
-        <div class="flex">
-            <!-- Sidebar -->
-            <div class="w-64 glass-effect border-r border-white/20 p-4 sidebar">
-                <div class="space-y-2">
-                    <button class="sidebar-tab active w-full flex items-center space-x-3 px-4 py-3 rounded-xl text-gray-700 hover:bg-white/50 transition-all duration-200" data-tab="dashboard">
-                        <i class="fas fa-chart-line text-blue-500"></i>
-                        <span>Dashboard</span>
-                    </button>
-                    <button class="sidebar-tab w-full flex items-center space-x-3 px-4 py-3 rounded-xl text-gray-700 hover:bg-white/50 transition-all duration-200" data-tab="history">
-                        <i class="fas fa-history text-purple-500"></i>
-                        <span>History</span>
-                    </button>
-                    <button class="sidebar-tab w-full flex items-center space-x-3 px-4 py-3 rounded-xl text-gray-700 hover:bg-white/50 transition-all duration-200" data-tab="ai-coach">
-                        <i class="fas fa-robot text-green-500"></i>
-                        <span>AI Coach</span>
-                    </button>
-                </div>
-            </div>
-
-            <!-- Main Content -->
-            <div class="flex-1">
-                <!-- Dashboard Tab -->
-                <div id="dashboard" class="tab-content active">
-                    <div class="max-w-7xl mx-auto px-6 py-8 mb-24">
-                        <div class="grid grid-cols-12 gap-6">
-                            <!-- Left Column: Input & Analysis -->
-                            <div class="col-span-12 lg:col-span-4 space-y-6">
-                                <!-- Input Section -->
-                                <div class="glass-effect rounded-2xl p-6 card-hover fade-in">
-                                    <h2 class="text-lg font-semibold text-gray-800 mb-4 flex items-center">
-                                        <i class="fas fa-microphone-alt mr-2 text-blue-500"></i>
-                                        Food Entry
-                                    </h2>
-                                    
-                                    <div class="mb-4">
-                                        <textarea 
-                                            id="foodInput" 
-                                            class="w-full p-4 bg-white/50 border border-gray-100 rounded-xl focus:ring-2 focus:ring-blue-500/20 focus:border-blue-500 transition-all duration-200 resize-none shadow-sm" 
-                                            rows="4" 
-                                            placeholder="e.g., I had 3 chapati and 2 bowls of dal for lunch..."
-                                        ></textarea>
-                                    </div>
-                                    
-                                    <div class="flex gap-3">
-                                        <button 
-                                            id="processBtn" 
-                                            class="flex-1 bg-gradient-to-r from-blue-500 via-purple-500 to-pink-500 hover:from-blue-600 hover:via-purple-600 hover:to-pink-600 text-white font-medium py-3 px-6 rounded-xl transition-all duration-300 flex items-center justify-center shadow-lg hover:shadow-xl transform hover:scale-[1.02]"
-                                        >
-                                            <i class="fas fa-brain mr-2"></i>
-                                            Process with AI
-                                        </button>
-                                        <button 
-                                            id="voiceBtn" 
-                                            class="bg-gradient-to-r from-green-400 to-blue-500 hover:from-green-500 hover:to-blue-600 text-white font-medium py-3 px-4 rounded-xl transition-all duration-200 shadow-md hover:shadow-lg"
-                                            title="Voice Input"
-                                        >
-                                            <i class="fas fa-microphone"></i>
-                                        </button>
-                                    </div>
-                                </div>
-
-                                <!-- Results Section -->
-                                <div id="resultsSection" class="glass-effect rounded-2xl p-6 card-hover slide-in">
-                                    <h2 class="text-lg font-semibold text-gray-800 mb-4 flex items-center">
-                                        <i class="fas fa-chart-pie mr-2 text-orange-500"></i>
-                                        Analysis Results
-                                    </h2>
-                                    <div id="resultsContent" class="text-center py-8">
-                                        <div class="text-gray-400 mb-2">
-                                            <i class="fas fa-utensils text-4xl"></i>
-                                        </div>
-                                        <p class="text-gray-500">Input your food data to see the analysis</p>
-                                    </div>
-                                </div>
-
-                                <!-- Health Score -->
-                                <div class="glass-effect rounded-2xl p-6 card-hover fade-in">
-                                    <h2 class="text-lg font-semibold text-gray-800 mb-4 flex items-center">
-                                        <i class="fas fa-heartbeat mr-2 text-red-500"></i>
-                                        Health Score
-                                    </h2>
-                                    <div id="healthScore" class="text-center">
-                                        <div class="relative w-32 h-32 mx-auto mb-4">
-                                            <svg class="w-full h-full" viewBox="0 0 100 100">
-                                                <circle class="text-gray-200" stroke-width="10" stroke="currentColor" fill="transparent" r="40" cx="50" cy="50"/>
-                                                <circle id="healthScoreCircle" class="text-green-500" stroke-width="10" stroke-dasharray="251.2" stroke-dashoffset="125.6" stroke-linecap="round" stroke="currentColor" fill="transparent" r="40" cx="50" cy="50"/>
-                                            </svg>
-                                            <div class="absolute top-1/2 left-1/2 transform -translate-x-1/2 -translate-y-1/2 text-center">
-                                                <span class="text-3xl font-bold text-gray-800" id="scoreValue">75</span>
-                                                <span class="text-sm text-gray-500">/100</span>
-                                            </div>
-                                        </div>
-                                        <div class="text-sm text-gray-600 mb-4" id="healthScoreDescription">
-                                            Your diet is well-balanced with good variety
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-
-                            <!-- Middle Column: Stats & Trends -->
-                            <div class="col-span-12 lg:col-span-8 space-y-6">
-                                <!-- Quick Stats -->
-                                <div class="glass-effect rounded-2xl p-6 card-hover fade-in">
-                                    <h2 class="text-lg font-semibold text-gray-800 mb-4 flex items-center">
-                                        <i class="fas fa-chart-line mr-2 text-purple-500"></i>
-                                        Quick Stats
-                                    </h2>
-                                    <div id="quickStats" class="grid grid-cols-3 gap-4">
-                                        <div class="bg-gradient-to-br from-blue-50 to-purple-50 p-4 rounded-xl">
-                                            <div class="flex items-center justify-between mb-2">
-                                                <div class="text-sm text-gray-500">Avg Daily</div>
-                                                <i class="fas fa-calendar-day text-blue-500"></i>
-                                            </div>
-                                            <div class="font-bold text-gray-800 text-xl" id="avgDaily">-</div>
-                                            <div class="text-xs text-gray-500 mt-1">calories</div>
-                                        </div>
-                                        <div class="bg-gradient-to-br from-green-50 to-blue-50 p-4 rounded-xl">
-                                            <div class="flex items-center justify-between mb-2">
-                                                <div class="text-sm text-gray-500">This Week</div>
-                                                <i class="fas fa-chart-line text-green-500"></i>
-                                            </div>
-                                            <div class="font-bold text-gray-800 text-xl" id="weekTotal">-</div>
-                                            <div class="text-xs text-gray-500 mt-1">total calories</div>
-                                        </div>
-                                        <div class="bg-gradient-to-br from-purple-50 to-pink-50 p-4 rounded-xl">
-                                            <div class="flex items-center justify-between mb-2">
-                                                <div class="text-sm text-gray-500">Entries</div>
-                                                <i class="fas fa-list-check text-purple-500"></i>
-                                            </div>
-                                            <div class="font-bold text-gray-800 text-xl" id="totalEntries">-</div>
-                                            <div class="text-xs text-gray-500 mt-1">this week</div>
-                                        </div>
-                                    </div>
-                                </div>
-
-                                <!-- Weekly Chart -->
-                                <div class="glass-effect rounded-2xl p-6 card-hover fade-in">
-                                    <h2 class="text-lg font-semibold text-gray-800 mb-4 flex items-center">
-                                        <i class="fas fa-chart-bar mr-2 text-indigo-500"></i>
-                                        Weekly Trend
-                                    </h2>
-                                    <div class="h-80">
-                                        <canvas id="weeklyChart" width="800" height="300"></canvas>
-                                    </div>
-                                </div>
-
-                                <!-- AI Insights & Recommendations -->
-                                <div class="grid grid-cols-1 md:grid-cols-2 gap-6">
-                                    <!-- AI Nutrition Insights -->
-                                    <div class="glass-effect rounded-2xl p-6 card-hover fade-in">
-                                        <h2 class="text-lg font-semibold text-gray-800 mb-4 flex items-center">
-                                            <i class="fas fa-lightbulb mr-2 text-yellow-500"></i>
-                                            AI Nutrition Insights
-                                        </h2>
-                                        <div id="nutritionInsights" class="space-y-3">
-                                            <div class="bg-white/50 p-4 rounded-xl">
-                                                <div class="flex items-center mb-2">
-                                                    <i class="fas fa-seedling text-emerald-500 mr-2"></i>
-                                                    <span class="font-medium">Nutrition Gaps</span>
-                                                </div>
-                                                <div class="text-sm text-gray-600" id="nutritionGaps">Identifying gaps...</div>
-                                            </div>
-                                        </div>
-                                    </div>
-
-                                    <!-- AI Meal Recommendations -->
-                                    <div class="glass-effect rounded-2xl p-6 card-hover fade-in">
-                                        <h2 class="text-lg font-semibold text-gray-800 mb-4 flex items-center">
-                                            <i class="fas fa-utensils mr-2 text-pink-500"></i>
-                                            AI Meal Recommendations
-                                        </h2>
-                                        <div id="mealRecommendations" class="space-y-3">
-                                            <div class="bg-white/50 p-4 rounded-xl">
-                                                <div class="flex items-center mb-2">
-                                                    <i class="fas fa-sun text-yellow-500 mr-2"></i>
-                                                    <span class="font-medium">Next Meal Suggestion</span>
-                                                </div>
-                                                <div class="text-sm text-gray-600" id="nextMealSuggestion">Based on your current intake...</div>
-                                            </div>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-
-                <!-- History Tab -->
-                <div id="history" class="tab-content">
-                    <div class="max-w-7xl mx-auto px-6 py-8">
-                        <div class="glass-effect rounded-2xl p-6">
-                            <div class="flex items-center justify-between mb-6">
-                                <h2 class="text-lg font-semibold text-gray-800 flex items-center">
-                                    <i class="fas fa-history mr-2 text-purple-500"></i>
-                                    Recent Entries
-                                </h2>
-                                <button 
-                                    onclick="deleteAllEntries()"
-                                    class="bg-red-500/10 hover:bg-red-500/20 text-red-500 px-4 py-2 rounded-lg transition-all duration-200 flex items-center"
-                                    title="Delete All Entries"
-                                >
-                                    <i class="fas fa-trash-alt mr-2"></i>
-                                    Delete All
-                                </button>
-                            </div>
-                            <div id="historyContainer" class="relative">
-                                <div class="absolute left-4 top-0 bottom-0 w-0.5 bg-gradient-to-b from-blue-500/50 to-purple-500/50"></div>
-                                <div class="space-y-4 pl-8">
-                                    <div class="animate-pulse space-y-4">
-                                        <div class="h-20 bg-gray-200 rounded-lg"></div>
-                                        <div class="h-20 bg-gray-200 rounded-lg"></div>
-                                        <div class="h-20 bg-gray-200 rounded-lg"></div>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-
-                <!-- AI Coach Tab -->
-                <div id="ai-coach" class="tab-content">
-                    <div class="max-w-7xl mx-auto px-6 py-8">
-                        <div class="grid grid-cols-12 gap-6">
-                            <!-- Chat Section -->
-                            <div class="col-span-12 lg:col-span-8">
-                                <div class="glass-effect rounded-2xl p-6">
-                                    <div class="flex items-center justify-between mb-6">
-                                        <h2 class="text-lg font-semibold text-gray-800 flex items-center">
-                                            <i class="fas fa-robot mr-2 text-green-500"></i>
-                                            AI Nutrition Coach
-                                        </h2>
-                                        <button 
-                                            onclick="resetChat()"
-                                            class="bg-gray-500/10 hover:bg-gray-500/20 text-gray-500 px-4 py-2 rounded-lg transition-all duration-200 flex items-center"
-                                            title="Reset Chat"
-                                        >
-                                            <i class="fas fa-redo mr-2"></i>
-                                            Reset Chat
-                                        </button>
-                                    </div>
-                                    
-                                    <!-- Chat Messages -->
-                                    <div id="chatMessages" class="space-y-4 mb-6 max-h-[60vh] overflow-y-auto custom-scrollbar">
-                                        <div class="chat-message flex items-start space-x-3">
-                                            <div class="w-8 h-8 rounded-full bg-gradient-to-br from-green-400 to-blue-500 flex items-center justify-center text-white flex-shrink-0">
-                                                <i class="fas fa-robot text-sm"></i>
-                                            </div>
-                                            <div class="flex-1">
-                                                <div class="bg-white/50 rounded-xl p-4">
-                                                    <p class="text-gray-700">Hello! I'm your AI Nutrition Coach. I can help you achieve your health and fitness goals. What would you like to work on today?</p>
-                                                </div>
-                                                <div class="text-xs text-gray-500 mt-1">Just now</div>
-                                            </div>
-                                        </div>
-                                    </div>
-
-                                    <!-- Chat Input -->
-                                    <div class="relative">
-                                        <textarea 
-                                            id="chatInput" 
-                                            class="w-full p-4 pr-12 bg-white/50 border border-gray-100 rounded-xl focus:ring-2 focus:ring-green-500/20 focus:border-green-500 transition-all duration-200 resize-none shadow-sm chat-input" 
-                                            rows="2" 
-                                            placeholder="Type your message here..."
-                                        ></textarea>
-                                        <button 
-                                            id="sendMessageBtn"
-                                            class="absolute right-3 bottom-3 bg-gradient-to-r from-green-400 to-blue-500 hover:from-green-500 hover:to-blue-600 text-white p-2 rounded-lg transition-all duration-200"
-                                        >
-                                            <i class="fas fa-paper-plane"></i>
-                                        </button>
-                                    </div>
-                                </div>
-                            </div>
-
-                            <!-- Macro Tracking Card -->
-                            <div class="col-span-12 lg:col-span-4">
-                                <div class="glass-effect rounded-2xl p-6">
-                                    <h2 class="text-lg font-semibold text-gray-800 mb-4 flex items-center">
-                                        <i class="fas fa-chart-pie mr-2 text-purple-500"></i>
-                                        Today's Macros
-                                    </h2>
-                                    
-                                    <!-- Macro Progress -->
-                                    <div class="space-y-4">
-                                        <!-- Protein -->
-                                        <div>
-                                            <div class="flex items-center justify-between mb-1">
-                                                <span class="text-sm text-gray-600">Protein</span>
-                                                <span class="text-sm font-medium text-gray-800" id="proteinValue">0g</span>
-                                            </div>
-                                            <div class="w-full h-2 bg-gray-200 rounded-full overflow-hidden">
-                                                <div id="proteinBar" class="h-full bg-blue-500 transition-all duration-500" style="width: 0%"></div>
-                                            </div>
-                                        </div>
-                                        
-                                        <!-- Carbs -->
-                                        <div>
-                                            <div class="flex items-center justify-between mb-1">
-                                                <span class="text-sm text-gray-600">Carbs</span>
-                                                <span class="text-sm font-medium text-gray-800" id="carbsValue">0g</span>
-                                            </div>
-                                            <div class="w-full h-2 bg-gray-200 rounded-full overflow-hidden">
-                                                <div id="carbsBar" class="h-full bg-green-500 transition-all duration-500" style="width: 0%"></div>
-                                            </div>
-                                        </div>
-                                        
-                                        <!-- Fats -->
-                                        <div>
-                                            <div class="flex items-center justify-between mb-1">
-                                                <span class="text-sm text-gray-600">Fats</span>
-                                                <span class="text-sm font-medium text-gray-800" id="fatsValue">0g</span>
-                                            </div>
-                                            <div class="w-full h-2 bg-gray-200 rounded-full overflow-hidden">
-                                                <div id="fatsBar" class="h-full bg-yellow-500 transition-all duration-500" style="width: 0%"></div>
-                                            </div>
-                                        </div>
-                                        
-                                        <!-- Calories -->
-                                        <div>
-                                            <div class="flex items-center justify-between mb-1">
-                                                <span class="text-sm text-gray-600">Calories</span>
-                                                <span class="text-sm font-medium text-gray-800" id="caloriesValue">0</span>
-                                            </div>
-                                            <div class="w-full h-2 bg-gray-200 rounded-full overflow-hidden">
-                                                <div id="caloriesBar" class="h-full bg-red-500 transition-all duration-500" style="width: 0%"></div>
-                                            </div>
-                                        </div>
-                                    </div>
-
-                                    <!-- Macro Goals -->
-                                    <div class="mt-6 pt-6 border-t border-gray-200">
-                                        <h3 class="text-sm font-medium text-gray-800 mb-3">Daily Goals</h3>
-                                        <div class="grid grid-cols-2 gap-4">
-                                            <div class="bg-white/50 p-3 rounded-xl">
-                                                <div class="text-xs text-gray-500">Protein Goal</div>
-                                                <div class="text-lg font-bold text-gray-800" id="proteinGoal">120g</div>
-                                            </div>
-                                            <div class="bg-white/50 p-3 rounded-xl">
-                                                <div class="text-xs text-gray-500">Carbs Goal</div>
-                                                <div class="text-lg font-bold text-gray-800" id="carbsGoal">300g</div>
-                                            </div>
-                                            <div class="bg-white/50 p-3 rounded-xl">
-                                                <div class="text-xs text-gray-500">Fats Goal</div>
-                                                <div class="text-lg font-bold text-gray-800" id="fatsGoal">65g</div>
-                                            </div>
-                                            <div class="bg-white/50 p-3 rounded-xl">
-                                                <div class="text-xs text-gray-500">Calories Goal</div>
-                                                <div class="text-lg font-bold text-gray-800" id="caloriesGoal">2000</div>
-                                            </div>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-
-        <!-- Collapsible AI Processing Logs -->
-        <div class="fixed bottom-0 left-0 right-0 bg-gray-900/95 backdrop-blur-lg border-t border-gray-800 transform transition-transform duration-300" id="logsPanel">
-            <div class="max-w-7xl mx-auto px-4 py-2">
-                <div class="flex items-center justify-between">
-                    <div class="flex items-center space-x-2">
-                        <i class="fas fa-terminal text-blue-400"></i>
-                        <span class="text-sm text-gray-300">AI Processing Logs</span>
-                    </div>
-                    <button id="toggleLogs" class="text-gray-400 hover:text-white transition-colors p-1">
-                        <i class="fas fa-chevron-up text-xs"></i>
-                    </button>
-                </div>
-                <div id="logsContainer" class="text-xs text-gray-400 mt-1 max-h-[50vh] overflow-y-auto custom-scrollbar">
-                    <p>🤖 AI Calorie Tracker ready for input...</p>
-                </div>
-            </div>
-        </div>
-
-        <script>
-            // Global variables
-            let isProcessing = false;
-            let isRecording = false;
-            let recognition = null;
-            let weeklyChart = null;
-            let currentModel = 'mistral-ai/Ministral-3B';
-            let chatContext = [];  // Store chat context
-            let userGoals = null;  // Store user goals
-
-            // DOM elements
-            const foodInput = document.getElementById('foodInput');
-            const processBtn = document.getElementById('processBtn');
-            const voiceBtn = document.getElementById('voiceBtn');
-            const modelSelect = document.getElementById('modelSelect');
-            const resultsSection = document.getElementById('resultsSection');
-            const resultsContent = document.getElementById('resultsContent');
-            const logsContainer = document.getElementById('logsContainer');
-            const dailySummary = document.getElementById('dailySummary');
-            const historyContainer = document.getElementById('historyContainer');
-            const chatInput = document.getElementById('chatInput');
-            const sendMessageBtn = document.getElementById('sendMessageBtn');
-            const chatMessages = document.getElementById('chatMessages');
-            const proteinValue = document.getElementById('proteinValue');
-            const carbsValue = document.getElementById('carbsValue');
-            const fatsValue = document.getElementById('fatsValue');
-            const caloriesValue = document.getElementById('caloriesValue');
-            const proteinGoal = document.getElementById('proteinGoal');
-            const carbsGoal = document.getElementById('carbsGoal');
-            const fatsGoal = document.getElementById('fatsGoal');
-            const caloriesGoal = document.getElementById('caloriesGoal');
-            const proteinBar = document.getElementById('proteinBar');
-            const carbsBar = document.getElementById('carbsBar');
-            const fatsBar = document.getElementById('fatsBar');
-            const caloriesBar = document.getElementById('caloriesBar');
-
-            // Tab switching functionality
-            const tabs = document.querySelectorAll('.sidebar-tab');
-            const tabContents = document.querySelectorAll('.tab-content');
-
-            tabs.forEach(tab => {
-                tab.addEventListener('click', () => {
-                    // Remove active class from all tabs and contents
-                    tabs.forEach(t => t.classList.remove('active'));
-                    tabContents.forEach(c => c.classList.remove('active'));
-
-                    // Add active class to clicked tab and corresponding content
-                    tab.classList.add('active');
-                    const tabId = tab.getAttribute('data-tab');
-                    document.getElementById(tabId).classList.add('active');
-
-                    // If switching to history tab, refresh the history
-                    if (tabId === 'history') {
-                        loadHistory();
-                    }
-                });
-            });
-
-            // Chat functionality
-            function addMessage(content, isUser = false) {
-                const messageDiv = document.createElement('div');
-                messageDiv.className = 'chat-message flex items-start space-x-3';
-                
-                const icon = isUser ? 'user' : 'robot';
-                const iconColor = isUser ? 'from-blue-400 to-purple-500' : 'from-green-400 to-blue-500';
-                
-                messageDiv.innerHTML = `
-                    <div class="w-8 h-8 rounded-full bg-gradient-to-br ${iconColor} flex items-center justify-center text-white flex-shrink-0">
-                        <i class="fas fa-${icon} text-sm"></i>
-                    </div>
-                    <div class="flex-1">
-                        <div class="bg-white/50 rounded-xl p-4">
-                            <p class="text-gray-700">${content}</p>
-                        </div>
-                        <div class="text-xs text-gray-500 mt-1">Just now</div>
-                    </div>
-                `;
-                
-                chatMessages.appendChild(messageDiv);
-                chatMessages.scrollTop = chatMessages.scrollHeight;
-            }
-
-            function showTypingIndicator() {
-                const indicatorDiv = document.createElement('div');
-                indicatorDiv.className = 'chat-message flex items-start space-x-3';
-                indicatorDiv.id = 'typingIndicator';
-                
-                indicatorDiv.innerHTML = `
-                    <div class="w-8 h-8 rounded-full bg-gradient-to-br from-green-400 to-blue-500 flex items-center justify-center text-white flex-shrink-0">
-                        <i class="fas fa-robot text-sm"></i>
-                    </div>
-                    <div class="flex-1">
-                        <div class="bg-white/50 rounded-xl p-4">
-                            <div class="typing-indicator">
-                                <span></span>
-                                <span></span>
-                                <span></span>
-                            </div>
-                        </div>
-                    </div>
-                `;
-                
-                chatMessages.appendChild(indicatorDiv);
-                chatMessages.scrollTop = chatMessages.scrollHeight;
-            }
+    return send_page(render_template('index.html'))
 
-            function removeTypingIndicator() {
-                const indicator = document.getElementById('typingIndicator');
-                if (indicator) {
-                    indicator.remove();
-                }
-            }
-
-            async function sendMessage() {
-                const message = chatInput.value.trim();
-                if (!message) return;
-
-                // Add user message
-                addMessage(message, true);
-                chatInput.value = '';
-
-                // Show typing indicator
-                showTypingIndicator();
-
-                try {
-                    // Send message to backend with selected model
-                    const response = await fetch('/chat', {
-                        method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json'
-                        },
-                        body: JSON.stringify({
-                            message: message,
-                            context: chatContext,
-                            model: currentModel
-                        })
-                    });
-
-                    const data = await response.json();
-                    
-                    // Remove typing indicator
-                    removeTypingIndicator();
-
-                    if (data.success) {
-                        // Add AI response with formatted content
-                        addMessage(formatMessage(data.response));
-                        
-                        // Update context
-                        chatContext = data.context;
-                        
-                        // Update macros if available
-                        if (data.macros) {
-                            updateMacros(data.macros);
-                        }
-                        
-                        // Update goals if changed
-                        if (data.goal_changed) {
-                            userGoals = data.user_goals;
-                            // Refresh macros to update goals
-                            if (data.macros) {
-                                updateMacros(data.macros);
-                            }
-                        }
-                        
-                        // If food was detected, update the dashboard
-                        if (data.food_detected) {
-                            // Trigger food processing
-                            foodInput.value = data.food_input;
-                            processBtn.click();
-                        }
-                    } else {
-                        addMessage('Sorry, I encountered an error. Please try again.');
-                    }
-                } catch (error) {
-                    removeTypingIndicator();
-                    addMessage('Sorry, I encountered an error. Please try again.');
-                }
-            }
-
-            function resetChat() {
-                if (confirm('Are you sure you want to reset the chat? This will clear our conversation history.')) {
-                    chatContext = [];
-                    chatMessages.innerHTML = `
-                        <div class="chat-message flex items-start space-x-3">
-                            <div class="w-8 h-8 rounded-full bg-gradient-to-br from-green-400 to-blue-500 flex items-center justify-center text-white flex-shrink-0">
-                                <i class="fas fa-robot text-sm"></i>
-                            </div>
-                            <div class="flex-1">
-                                <div class="bg-white/50 rounded-xl p-4">
-                                    <p class="text-gray-700">Hello! I'm your AI Nutrition Coach. I can help you achieve your health and fitness goals. What would you like to work on today?</p>
-                                </div>
-                                <div class="text-xs text-gray-500 mt-1">Just now</div>
-                            </div>
-                        </div>
-                    `;
-                }
-            }
-
-            // Event listeners
-            sendMessageBtn.addEventListener('click', sendMessage);
-            chatInput.addEventListener('keypress', function(e) {
-                if (e.key === 'Enter' && !e.shiftKey) {
-                    e.preventDefault();
-                    sendMessage();
-                }
-            });
-
-            // Auto-resize chat input
-            chatInput.addEventListener('input', function() {
-                this.style.height = 'auto';
-                this.style.height = this.scrollHeight + 'px';
-            });
-
-            // Initialize the app
-            document.addEventListener('DOMContentLoaded', function() {
-                initializeVoiceRecognition();
-                loadDailySummary();
-                loadHistory();
-                loadWeeklyChart();
-                updateQuickStats();
-            });
-
-            // Initialize voice recognition
-            function initializeVoiceRecognition() {
-                if ('webkitSpeechRecognition' in window || 'SpeechRecognition' in window) {
-                    const SpeechRecognition = window.SpeechRecognition || window.webkitSpeechRecognition;
-                    recognition = new SpeechRecognition();
-                    recognition.continuous = false;
-                    recognition.interimResults = false;
-                    recognition.lang = 'en-US';
-
-                    recognition.onstart = function() {
-                        isRecording = true;
-                        voiceBtn.innerHTML = '<i class="fas fa-stop voice-recording"></i>';
-                        voiceBtn.classList.add('bg-red-500');
-                        voiceBtn.classList.remove('bg-green-500');
-                    };
-
-                    recognition.onresult = function(event) {
-                        const transcript = event.results[0][0].transcript;
-                        foodInput.value = transcript;
-                        logsContainer.innerHTML = `<p class="text-blue-400">🎤 Voice input: "${transcript}"</p>`;
-                    };
-
-                    recognition.onend = function() {
-                        isRecording = false;
-                        voiceBtn.innerHTML = '<i class="fas fa-microphone"></i>';
-                        voiceBtn.classList.add('bg-green-500');
-                        voiceBtn.classList.remove('bg-red-500');
-                    };
-
-                    recognition.onerror = function(event) {
-                        console.error('Speech recognition error:', event.error);
-                        logsContainer.innerHTML = `<p class="text-red-400">❌ Voice recognition error: ${event.error}</p>`;
-                    };
-                } else {
-                    voiceBtn.style.display = 'none';
-                    console.log('Speech recognition not supported');
-                }
-            }
-
-            // Voice button click handler
-            voiceBtn.addEventListener('click', function() {
-                if (!recognition) return;
-
-                if (isRecording) {
-                    recognition.stop();
-                } else {
-                    recognition.start();
-                    logsContainer.innerHTML = '<p class="text-blue-400">🎤 Listening... Speak now!</p>';
-                }
-            });
-
-            // Model selection handler
-            modelSelect.addEventListener('change', function() {
-                currentModel = this.value;
-                logsContainer.innerHTML = `<p class="text-blue-400">🔄 Switched to ${this.options[this.selectedIndex].text} model</p>`;
-            });
-
-            // Process food entry
-            processBtn.addEventListener('click', async function() {
-                const userInput = foodInput.value.trim();
-                
-                if (!userInput) {
-                    alert('Please enter what you ate or use voice input!');
-                    return;
-                }
-
-                if (isProcessing) return;
-                
-                isProcessing = true;
-                processBtn.disabled = true;
-                processBtn.innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i>Processing...';
-                
-                logsContainer.innerHTML = `<p class="text-yellow-400">🔄 AI is analyzing your food entry using ${modelSelect.options[modelSelect.selectedIndex].text}...</p>`;
-
-                try {
-                    const response = await fetch('/process_food', {
-                        method: 'POST',
-                        headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ 
-                            user_input: userInput,
-                            model: currentModel
-                        })
-                    });
-
-                    const data = await response.json();
-                    
-                    if (data.success) {
-                        displayResults(data);
-                        displayLogs(data.logs);
-                        loadDailySummary();
-                        loadHistory();
-                        loadWeeklyChart();
-                        updateQuickStats();
-                        updateNutritionInsights(data);
-                        updateMealRecommendations(data);
-                        updateHealthScore(data);
-                        foodInput.value = '';
-                    } else {
-                        logsContainer.innerHTML = `<p class="text-red-400">❌ Error processing food entry: ${data.error || 'Unknown error'}</p>`;
-                    }
-                } catch (error) {
-                    console.error('Error:', error);
-                    logsContainer.innerHTML = `<p class="text-red-400">❌ Network error: ${error.message}</p>`;
-                } finally {
-                    isProcessing = false;
-                    processBtn.disabled = false;
-                    processBtn.innerHTML = '<i class="fas fa-brain mr-2"></i>Process with AI';
-                }
-            });
-
-            // Display results
-            function displayResults(data) {
-                const resultsHTML = `
-                    <div class="space-y-4">
-                        <div class="bg-gradient-to-br from-blue-50 to-purple-50 p-4 rounded-xl">
-                            <h3 class="font-semibold text-gray-800 mb-3 flex items-center">
-                                <i class="fas fa-utensils mr-2 text-blue-500"></i>
-                                Detected Food Items
-                            </h3>
-                            <div class="space-y-2">
-                                ${data.detailed_breakdown.map(item => `
-                                    <div class="flex justify-between items-center bg-white/50 p-3 rounded-lg group hover:bg-white/80 transition-all duration-200">
-                                        <div class="flex items-center space-x-3">
-                                            <div class="w-8 h-8 rounded-lg bg-gradient-to-br from-blue-500/10 to-purple-500/10 flex items-center justify-center text-blue-500">
-                                                <i class="fas fa-utensils text-sm"></i>
-                                            </div>
-                                            <span class="font-medium text-gray-800">${item.food}</span>
-                                        </div>
-                                        <div class="flex items-center space-x-2">
-                                            <span class="text-sm text-gray-600 bg-gray-100 px-2 py-1 rounded">
-                                                ${item.quantity}x
-                                            </span>
-                                            <span class="text-sm text-gray-600 bg-gray-100 px-2 py-1 rounded">
-                                                ×${item.container_multiplier}x
-                                            </span>
-                                            <span class="font-medium text-blue-600">
-                                                ${item.total_calories} cal
-                                            </span>
-                                        </div>
-                                    </div>
-                                `).join('')}
-                            </div>
-                        </div>
-                        
-                        <div class="bg-gradient-to-br from-green-50 to-blue-50 p-4 rounded-xl">
-                            <div class="flex items-center justify-between mb-3">
-                                <h3 class="font-semibold text-gray-800 flex items-center">
-                                    <i class="fas fa-fire mr-2 text-orange-500"></i>
-                                    Total Calories
-                                </h3>
-                                <div class="text-sm text-gray-500">
-                                    ${data.daily_entries_count} entries today
-                                </div>
-                            </div>
-                            <div class="flex items-center justify-between">
-                                <div class="text-3xl font-bold text-green-600">${data.total_calories}</div>
-                                <div class="text-sm text-gray-600">
-                                    Daily Total: ${data.daily_total} cal
-                                </div>
-                            </div>
-                        </div>
-                    </div>
-                `;
-                
-                resultsContent.innerHTML = resultsHTML;
-                resultsSection.classList.remove('hidden');
-            }
-
-            // Display processing logs
-            function displayLogs(logs) {
-                const logsHTML = logs.map(log => {
-                    // Add different colors based on log type
-                    let colorClass = 'text-gray-400';
-                    if (log.includes('❌')) colorClass = 'text-red-400';
-                    if (log.includes('✅')) colorClass = 'text-green-400';
-                    if (log.includes('🤖')) colorClass = 'text-blue-400';
-                    if (log.includes('📊')) colorClass = 'text-purple-400';
-                    if (log.includes('💾')) colorClass = 'text-yellow-400';
-                    
-                    return `<p class="mb-0.5 ${colorClass}">${log}</p>`;
-                }).join('');
-                
-                logsContainer.innerHTML = logsHTML;
-                logsContainer.scrollTop = logsContainer.scrollHeight;
-            }
-
-            // Delete entry function
-            async function deleteEntry(entryId) {
-                if (!confirm('Are you sure you want to delete this entry?')) return;
-
-                try {
-                    const response = await fetch(`/delete_entry/${entryId}`, { method: 'DELETE' });
-                    const data = await response.json();
-                    
-                    if (data.success) {
-                        loadDailySummary();
-                        loadHistory();
-                        loadWeeklyChart();
-                        updateQuickStats();
-                        logsContainer.innerHTML = '<p class="text-green-400">✅ Entry deleted successfully</p>';
-                    } else {
-                        logsContainer.innerHTML = `<p class="text-red-400">❌ Error: ${data.error}</p>`;
-                    }
-                } catch (error) {
-                    logsContainer.innerHTML = `<p class="text-red-400">❌ Error deleting entry</p>`;
-                }
-            }
-
-            // Load daily summary
-            async function loadDailySummary() {
-                try {
-                    const response = await fetch('/get_daily_summary');
-                    const data = await response.json();
-                    
-                    const percentage = Math.round((data.total_calories / 2000) * 100);
-                    const remaining = Math.max(0, 2000 - data.total_calories);
-                    
-                    // Update header progress
-                    document.getElementById('todayProgress').textContent = `${data.total_calories}/2000`;
-                    document.getElementById('goalProgressBar').style.width = `${Math.min(percentage, 100)}%`;
-                    
-                    const summaryHTML = `
-                        <div class="space-y-4">
-                            <div class="text-center">
-                                <div class="text-3xl font-bold text-blue-600">${data.total_calories}</div>
-                                <div class="text-gray-600 mb-2">calories today</div>
-                                <div class="w-full bg-gray-200 rounded-full h-3">
-                                    <div class="bg-gradient-to-r from-blue-500 to-purple-600 h-3 rounded-full transition-all duration-500" 
-                                         style="width: ${Math.min(percentage, 100)}%"></div>
-                                </div>
-                                <div class="text-sm text-gray-500 mt-1">${percentage}% of 2000 cal goal</div>
-                                <div class="text-sm font-medium text-green-600 mt-2">${remaining} calories remaining</div>
-                            </div>
-                            <div class="grid grid-cols-2 gap-4 text-center">
-                                <div class="bg-green-50 p-3 rounded-lg">
-                                    <div class="text-lg font-bold text-green-600">${data.entries_count}</div>
-                                    <div class="text-xs text-gray-600">Entries</div>
-                                </div>
-                                <div class="bg-purple-50 p-3 rounded-lg">
-                                    <div class="text-lg font-bold text-purple-600">${new Date().toLocaleDateString()}</div>
-                                    <div class="text-xs text-gray-600">Today</div>
-                                </div>
-                            </div>
-                        </div>
-                    `;
-                    
-                    dailySummary.innerHTML = summaryHTML;
-                } catch (error) {
-                    dailySummary.innerHTML = '<p class="text-red-600">Error loading daily summary</p>';
-                }
-            }
-
-            // Load recent history
-            async function loadHistory() {
-                try {
-                    const response = await fetch('/get_history');
-                    const data = await response.json();
-                    
-                    if (data.success && data.entries.length > 0) {
-                        const historyHTML = `
-                            <div class="space-y-4">
-                                ${data.entries.map((entry, index) => `
-                                    <div class="relative group">
-                                        <div class="absolute -left-8 top-1/2 -translate-y-1/2 w-4 h-4 rounded-full bg-gradient-to-r from-blue-500 to-purple-500 border-2 border-white shadow-lg"></div>
-                                        <div class="bg-gradient-to-r from-blue-50/50 to-purple-50/50 border border-blue-100/50 p-4 rounded-xl group-hover:shadow-lg transition-all duration-200 relative">
-                                            <div class="flex flex-col h-full">
-                                                <div class="flex items-start justify-between">
-                                                    <div class="flex-1">
-                                                        <p class="font-medium text-gray-800 mb-2 line-clamp-2">"${entry.user_input}"</p>
-                                                        <div class="flex items-center text-sm text-gray-600">
-                                                            <i class="fas fa-fire mr-1 text-orange-500"></i>
-                                                            <span>${entry.total_calories} calories</span>
-                                                        </div>
-                                                    </div>
-                                                    <button 
-                                                        onclick="deleteEntry(${entry.id})"
-                                                        class="opacity-0 group-hover:opacity-100 bg-red-500/10 hover:bg-red-500/20 text-red-500 p-2 rounded-lg transition-all duration-200 ml-2"
-                                                        title="Delete Entry"
-                                                    >
-                                                        <i class="fas fa-trash-alt text-xs"></i>
-                                                    </button>
-                                                </div>
-                                                <div class="flex items-center text-xs text-gray-500 mt-2">
-                                                    <i class="fas fa-clock mr-1"></i>
-                                                    <span>${new Date(entry.created_at).toLocaleString()}</span>
-                                                </div>
-                                            </div>
-                                        </div>
-                                    </div>
-                                `).join('')}
-                            </div>
-                        `;
-                        historyContainer.innerHTML = historyHTML;
-                    } else {
-                        historyContainer.innerHTML = `
-                            <div class="text-center py-8 text-gray-500">
-                                <i class="fas fa-utensils text-4xl mb-4"></i>
-                                <p>No entries yet. Start tracking your calories!</p>
-                            </div>
-                        `;
-                    }
-                } catch (error) {
-                    historyContainer.innerHTML = '<p class="text-red-600">Error loading history</p>';
-                }
-            }
-
-            // Load weekly chart
-            async function loadWeeklyChart() {
-                try {
-                    const response = await fetch('/get_weekly_data');
-                    const data = await response.json();
-                    
-                    const ctx = document.getElementById('weeklyChart').getContext('2d');
-                    
-                    if (weeklyChart) {
-                        weeklyChart.destroy();
-                    }
-                    
-                    weeklyChart = new Chart(ctx, {
-                        type: 'line',
-                        data: {
-                            labels: data.data.map(d => d.day),
-                            datasets: [{
-                                label: 'Daily Calories',
-                                data: data.data.map(d => d.calories),
-                                borderColor: 'rgb(99, 102, 241)',
-                                backgroundColor: 'rgba(99, 102, 241, 0.1)',
-                                borderWidth: 3,
-                                fill: true,
-                                tension: 0.4,
-                                pointBackgroundColor: 'rgb(99, 102, 241)',
-                                pointBorderColor: '#fff',
-                                pointBorderWidth: 2,
-                                pointRadius: 6
-                            }]
-                        },
-                        options: {
-                            responsive: true,
-                            maintainAspectRatio: false,
-                            plugins: {
-                                legend: {
-                                    display: false
-                                }
-                            },
-                            scales: {
-                                y: {
-                                    beginAtZero: true,
-                                    grid: {
-                                        color: 'rgba(0, 0, 0, 0.1)'
-                                    },
-                                    ticks: {
-                                        callback: function(value) {
-                                            return value + ' cal';
-                                        }
-                                    }
-                                },
-                                x: {
-                                    grid: {
-                                        display: false
-                                    }
-                                }
-                            },
-                            elements: {
-                                point: {
-                                    hoverRadius: 8
-                                }
-                            }
-                        }
-                    });
-                } catch (error) {
-                    console.error('Error loading weekly chart:', error);
-                }
-            }
-
-            // Update quick stats
-            async function updateQuickStats() {
-                try {
-                    const response = await fetch('/get_weekly_data');
-                    const data = await response.json();
-                    
-                    const totalWeekly = data.data.reduce((sum, day) => sum + day.calories, 0);
-                    const avgDaily = Math.round(totalWeekly / 7);
-                    
-                    document.getElementById('avgDaily').textContent = avgDaily.toLocaleString();
-                    document.getElementById('weekTotal').textContent = totalWeekly.toLocaleString();
-                    document.getElementById('totalEntries').textContent = data.total_entries.toLocaleString();
-                } catch (error) {
-                    console.error('Error updating quick stats:', error);
-                }
-            }
-
-            // Allow Enter key to submit
-            foodInput.addEventListener('keypress', function(e) {
-                if (e.key === 'Enter' && !e.shiftKey) {
-                    e.preventDefault();
-                    processBtn.click();
-                }
-            });
-
-            // Auto-resize textarea
-            foodInput.addEventListener('input', function() {
-                this.style.height = 'auto';
-                this.style.height = this.scrollHeight + 'px';
-            });
-
-            // Add new functions for AI features
-            function updateNutritionInsights(data) {
-                const nutritionGaps = document.getElementById('nutritionGaps');
-                
-                if (data.ai_insights) {
-                    // Format nutrition gaps as a list
-                    const nutritionGapsText = Array.isArray(data.ai_insights.nutrition_gaps)
-                        ? data.ai_insights.nutrition_gaps.join(', ')
-                        : data.ai_insights.nutrition_gaps || 'Identifying gaps...';
-                    nutritionGaps.innerHTML = nutritionGapsText;
-                }
-            }
-
-            function updateMealRecommendations(data) {
-                const nextMealSuggestion = document.getElementById('nextMealSuggestion');
-                
-                if (data.ai_insights) {
-                    // Format next meal suggestions as a list
-                    const nextMealText = Array.isArray(data.ai_insights.next_meal)
-                        ? data.ai_insights.next_meal.join(', ')
-                        : data.ai_insights.next_meal || 'Based on your current intake...';
-                    nextMealSuggestion.innerHTML = nextMealText;
-                }
-            }
-
-            function updateHealthScore(data) {
-                const scoreValue = document.getElementById('scoreValue');
-                const healthScoreDescription = document.getElementById('healthScoreDescription');
-                const healthScoreCircle = document.getElementById('healthScoreCircle');
-                
-                if (data.ai_insights) {
-                    const score = data.ai_insights.health_score || 75;
-                    
-                    // Update description based on score
-                    let description = '';
-                    if (score >= 80) {
-                        description = 'Excellent diet balance with optimal nutrition';
-                    } else if (score >= 70) {
-                        description = 'Good diet with minor improvements needed';
-                    } else if (score >= 60) {
-                        description = 'Moderate diet, consider adding more variety';
-                    } else {
-                        description = 'Diet needs improvement, focus on balanced nutrition';
-                    }
-                    
-                    // Update score
-                    scoreValue.textContent = score;
-                    
-                    // Update description
-                    healthScoreDescription.textContent = description;
-                    
-                    // Update circle color and animation
-                    const offset = 251.2 - (251.2 * (score / 100));
-                    healthScoreCircle.style.strokeDashoffset = offset;
-                    
-                    // Update circle color based on score
-                    if (score >= 80) {
-                        healthScoreCircle.classList.remove('text-yellow-500', 'text-red-500');
-                        healthScoreCircle.classList.add('text-green-500');
-                    } else if (score >= 60) {
-                        healthScoreCircle.classList.remove('text-green-500', 'text-red-500');
-                        healthScoreCircle.classList.add('text-yellow-500');
-                    } else {
-                        healthScoreCircle.classList.remove('text-green-500', 'text-yellow-500');
-                        healthScoreCircle.classList.add('text-red-500');
-                    }
-                }
-            }
-
-            // Toggle logs panel
-            const logsPanel = document.getElementById('logsPanel');
-            const toggleLogs = document.getElementById('toggleLogs');
-            let isLogsExpanded = true;
-
-            toggleLogs.addEventListener('click', () => {
-                isLogsExpanded = !isLogsExpanded;
-                if (isLogsExpanded) {
-                    logsPanel.style.transform = 'translateY(0)';
-                    document.getElementById('logsContainer').style.maxHeight = '50vh';
-                    toggleLogs.innerHTML = '<i class="fas fa-chevron-up text-xs"></i>';
-                } else {
-                    logsPanel.style.transform = 'translateY(calc(100% - 2.5rem))';
-                    document.getElementById('logsContainer').style.maxHeight = '100px';
-                    toggleLogs.innerHTML = '<i class="fas fa-chevron-down text-xs"></i>';
-                }
-            });
-
-            // Add the deleteAllEntries function
-            async function deleteAllEntries() {
-                if (!confirm('Are you sure you want to delete ALL entries? This action cannot be undone.')) return;
-
-                try {
-                    const response = await fetch('/delete_all_entries', { method: 'DELETE' });
-                    const data = await response.json();
-                    
-                    if (data.success) {
-                        loadDailySummary();
-                        loadHistory();
-                        loadWeeklyChart();
-                        updateQuickStats();
-                        logsContainer.innerHTML = '<p class="text-green-400">✅ All entries deleted successfully</p>';
-                    } else {
-                        logsContainer.innerHTML = `<p class="text-red-400">❌ Error: ${data.error}</p>`;
-                    }
-                } catch (error) {
-                    logsContainer.innerHTML = `<p class="text-red-400">❌ Error deleting entries</p>`;
-                }
-            }
-
-            // Update macros display
-            function updateMacros(macros) {
-                if (!macros) return;
-                
-                // Get current goals based on user's goal type
-                const goalType = userGoals?.goal_type || 'maintenance';
-                let goals = {
-                    protein: 120,
-                    carbs: 300,
-                    fats: 65,
-                    calories: 2000
-                };
-                
-                // Adjust goals based on goal type
-                if (goalType === 'weight_loss') {
-                    goals = {
-                        protein: 150,  // Higher protein for weight loss
-                        carbs: 200,    // Lower carbs
-                        fats: 50,      // Lower fats
-                        calories: 1800 // Lower calories
-                    };
-                } else if (goalType === 'weight_gain') {
-                    goals = {
-                        protein: 180,  // Higher protein for muscle gain
-                        carbs: 400,    // Higher carbs
-                        fats: 80,      // Higher fats
-                        calories: 2500 // Higher calories
-                    };
-                }
-                
-                // Update goal displays
-                document.getElementById('proteinGoal').textContent = `${goals.protein}g`;
-                document.getElementById('carbsGoal').textContent = `${goals.carbs}g`;
-                document.getElementById('fatsGoal').textContent = `${goals.fats}g`;
-                document.getElementById('caloriesGoal').textContent = goals.calories;
-                
-                // Update current values
-                document.getElementById('proteinValue').textContent = `${Math.round(macros.protein)}g`;
-                document.getElementById('carbsValue').textContent = `${Math.round(macros.carbs)}g`;
-                document.getElementById('fatsValue').textContent = `${Math.round(macros.fats)}g`;
-                document.getElementById('caloriesValue').textContent = Math.round(macros.calories);
-                
-                // Calculate percentages (can exceed 100%)
-                const proteinPercent = (macros.protein / goals.protein) * 100;
-                const carbsPercent = (macros.carbs / goals.carbs) * 100;
-                const fatsPercent = (macros.fats / goals.fats) * 100;
-                const caloriesPercent = (macros.calories / goals.calories) * 100;
-                
-                // Update progress bars with animation
-                updateProgressBar('proteinBar', proteinPercent);
-                updateProgressBar('carbsBar', carbsPercent);
-                updateProgressBar('fatsBar', fatsPercent);
-                updateProgressBar('caloriesBar', caloriesPercent);
-            }
-
-            function updateProgressBar(id, percent) {
-                const bar = document.getElementById(id);
-                const currentWidth = parseFloat(bar.style.width) || 0;
-                const targetWidth = Math.min(percent, 100);
-                
-                // Animate the progress bar
-                bar.style.transition = 'width 0.5s ease-out';
-                bar.style.width = `${targetWidth}%`;
-                
-                // Change color based on percentage
-                if (percent > 100) {
-                    bar.style.backgroundColor = '#ef4444'; // Red for exceeding
-                } else if (percent > 80) {
-                    bar.style.backgroundColor = '#22c55e'; // Green for good progress
-                } else {
-                    bar.style.backgroundColor = '#3b82f6'; // Blue for normal progress
-                }
-            }
-
-            // Add resetAllData function
-            async function resetAllData() {
-                if (!confirm('Are you sure you want to reset ALL your data? This will delete all your history, goals, macros, and chat history. This action cannot be undone.')) return;
-
-                try {
-                    const response = await fetch('/reset_all_data', { method: 'POST' });
-                    const data = await response.json();
-                    
-                    if (data.success) {
-                        // Reset all UI elements
-                        loadDailySummary();
-                        loadHistory();
-                        loadWeeklyChart();
-                        updateQuickStats();
-                        resetChat();
-                        updateMacros(null);
-                        
-                        // Show success message
-                        logsContainer.innerHTML = '<p class="text-green-400">✅ All data reset successfully</p>';
-                    } else {
-                        logsContainer.innerHTML = `<p class="text-red-400">❌ Error: ${data.error}</p>`;
-                    }
-                } catch (error) {
-                    logsContainer.innerHTML = `<p class="text-red-400">❌ Error resetting data</p>`;
-                }
-            }
-
-            // Update the formatMessage function to better format AI responses
-            function formatMessage(content) {
-                // Convert markdown headers to styled headers
-                content = content.replace(/^### (.*$)/gm, '<h3 class="text-lg font-bold text-gray-800 mt-4 mb-2">$1</h3>');
-                content = content.replace(/^## (.*$)/gm, '<h2 class="text-xl font-bold text-gray-800 mt-6 mb-3">$1</h2>');
-                content = content.replace(/^# (.*$)/gm, '<h1 class="text-2xl font-bold text-gray-800 mt-8 mb-4">$1</h1>');
-                
-                // Convert bullet points with better styling
-                content = content.replace(/^\* (.*$)/gm, '<li class="ml-4 mb-2">$1</li>');
-                content = content.replace(/(<li class="ml-4 mb-2">.*<\/li>)/gm, '<ul class="list-disc space-y-2 my-4 bg-white/30 p-4 rounded-lg">$1</ul>');
-                
-                // Convert numbered lists
-                content = content.replace(/^\d+\. (.*$)/gm, '<li class="ml-4 mb-2">$1</li>');
-                content = content.replace(/(<li class="ml-4 mb-2">.*<\/li>)/gm, '<ol class="list-decimal space-y-2 my-4 bg-white/30 p-4 rounded-lg">$1</ol>');
-                
-                // Convert bold and italic with better styling
-                content = content.replace(/\*\*(.*?)\*\*/g, '<strong class="font-bold text-gray-800">$1</strong>');
-                content = content.replace(/\*(.*?)\*/g, '<em class="italic text-gray-700">$1</em>');
-                
-                // Add action buttons for common responses
-                if (content.includes('Would you like me to create a diet plan?')) {
-                    content += `
-                        <div class="mt-4 flex space-x-2">
-                            <button onclick="sendMessage('Yes, please create a diet plan')" class="bg-green-500 text-white px-4 py-2 rounded-lg text-sm hover:bg-green-600 transition-colors">
-                                Yes, create plan
-                            </button>
-                            <button onclick="sendMessage('No, not yet')" class="bg-gray-500 text-white px-4 py-2 rounded-lg text-sm hover:bg-gray-600 transition-colors">
-                                Not yet
-                            </button>
-                        </div>
-                    `;
-                }
-                
-                return content;
-            }
-        </script>
-    </body>
-    </html>
-    '''
+# Answer /process_food once the entry is saved and generate insights in a
+# background job (GET /jobs/<id>) instead of a second model call in the request
+DEFER_INSIGHTS = os.environ.get('DEFER_INSIGHTS', 'true').lower() != 'false'
 
 @app.route('/process_food', methods=['POST'])
 @login_required
 def process_food():
     user_input = request.json.get('user_input', '')
     model_name = request.json.get('model', 'mistral-ai/Ministral-3B')
+    # Without a job queue (JOB_QUEUE_PATH unset) insights always come back inline
+    defer_insights = request.json.get('defer_insights', DEFER_INSIGHTS) and job_queue is not None
+    # Also queued offline under this id if the response is lost, so a later
+    # /sync_entries of the same meal is recognised as a duplicate
+    client_id = request.json.get('client_id')
+    try:
+        client_id = str(uuid.UUID(str(client_id))) if client_id else None
+    except ValueError:
+        client_id = None
     all_logs = []
     
     try:
@@ -2319,24 +1587,52 @@ def process_food():
         model_client = get_model_client(model_name)
         all_logs.append(f"🤖 === AI FOOD ANALYSIS STARTED WITH {AVAILABLE_MODELS[model_name]} ===")
         
-        # Step 1: Enhanced food extraction with AI
-        food_entries, extraction_logs = advanced_food_extraction(user_input, model_client, model_name)
-        all_logs.extend(extraction_logs)
-        
-        # Step 2: Calculate calories with enhanced breakdown
-        all_logs.append("🧮 === CALORIE CALCULATION ===")
-        total_calories, detailed_breakdown, calc_logs = calculate_enhanced_calories(food_entries)
-        all_logs.extend(calc_logs)
-        
-        # Step 3: Get AI insights
-        all_logs.append("🧠 === GETTING AI INSIGHTS ===")
-        insights, insight_logs = get_llm_insights(food_entries, total_calories, model_client, model_name)
-        all_logs.extend(insight_logs)
+        # Step 0: A repeat of a past meal reuses its breakdown with no model call
+        now = datetime.now(client_timezone(request.json.get('timezone')))
+        reused = find_reusable_entry(session['user_id'], user_input, now) if request.json.get('reuse', True) else None
+        if reused:
+            reused_entry, similarity, reason = reused
+            all_logs.append(f"♻️ Reused entry {reused_entry['id']} from {reused_entry['date']} ({reason}, similarity {similarity:.2f})")
+            food_entries = detailed_breakdown = reused_entry['detailed_breakdown']
+            total_calories = reused_entry['total_calories']
+            insights = None
+        else:
+            # Only calls that reach the model count against the quota
+            over_quota = llm_quota_exceeded(session['user_id'])
+            if over_quota:
+                return over_quota
+            
+            # Step 1: Enhanced food extraction with AI
+            food_entries, extraction_logs = advanced_food_extraction(user_input, model_client, model_name)
+            all_logs.extend(extraction_logs)
+            
+            # Step 2: Calculate calories with enhanced breakdown
+            all_logs.append("🧮 === CALORIE CALCULATION ===")
+            total_calories, detailed_breakdown, calc_logs = calculate_enhanced_calories(food_entries)
+            all_logs.extend(calc_logs)
+            
+            # Step 3: Get AI insights, now or from a background job the client polls
+            all_logs.append("🧠 === GETTING AI INSIGHTS ===")
+            if defer_insights:
+                insights = None
+                all_logs.append("⏳ Insights queued as a background job")
+            else:
+                insights, insight_logs = get_llm_insights(food_entries, total_calories, model_client, model_name)
+                all_logs.extend(insight_logs)
         
         # Step 4: Save to database with user_id
         all_logs.append("💾 === SAVING TO DATABASE ===")
-        db_success, entry_id, db_logs = save_to_database(user_input, food_entries, total_calories, detailed_breakdown)
+        db_success, entry_id, db_logs = save_to_database(user_input, food_entries, total_calories, detailed_breakdown,
+                                                         client_id=client_id)
         all_logs.extend(db_logs)
+        insights_job = None
+        if defer_insights and not reused:
+            insights_job = job_queue.enqueue('meal_insights', {
+                'entry_id': entry_id,
+                'food_entries': food_entries,
+                'total_calories': total_calories,
+                'model': model_name
+            }, priority=PRIORITY_HIGH, user_id=session['user_id'])
         
         # Step 5: Get daily summary for current user
         all_logs.append("📊 === DAILY SUMMARY ===")
@@ -2344,7 +1640,7 @@ def process_food():
         daily_total = sum(entry['total_calories'] for entry in daily_entries)
         all_logs.append(f"📈 Updated daily total: {daily_total} calories")
         
-        return jsonify({
+        return jsonify(with_dashboard_state({
             'success': True,
             'user_input': user_input,
             'food_entries': [entry['food'] for entry in food_entries],
@@ -2355,8 +1651,16 @@ def process_food():
             'logs': all_logs,
             'entry_id': entry_id,
             'ai_insights': insights,
-            'model_used': AVAILABLE_MODELS[model_name]
-        })
+            'insights_job': insights_job,
+            'model_used': None if reused else AVAILABLE_MODELS[model_name],
+            'reused_entry': {
+                'id': reused[0]['id'],
+                'date': reused[0]['date'],
+                'user_input': reused[0]['user_input'],
+                'similarity': reused[1],
+                'match': reused[2]
+            } if reused else None
+        }))
     except Exception as e:
         error_message = str(e)
         all_logs.append(f"❌ Error: {error_message}")
@@ -2370,13 +1674,14 @@ def process_food():
 @login_required
 def delete_entry_route(entry_id):
     success, message = delete_entry(entry_id)
-    return jsonify({
+    return jsonify(with_dashboard_state({
         'success': success,
         'error': message if not success else None,
         'message': message if success else None
-    })
+    }))
 
 @app.route('/get_daily_summary')
+@versioned_read
 def daily_summary():
     date = request.args.get('date', datetime.now().date().isoformat())
     entries = get_daily_summary(date)
@@ -2391,13 +1696,27 @@ def daily_summary():
 
 @app.route('/get_history')
 @login_required
+@versioned_read
 def get_history():
     try:
-        result = supabase.table('calorie_entries').select('*').eq('user_id', session['user_id']).order('created_at', desc=True).limit(15).execute()
         return jsonify({
             'success': True,
-            'entries': result.data
+            'entries': get_recent_history()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
         })
+
+@app.route('/dashboard_state')
+@login_required
+@versioned_read
+def dashboard_state():
+    try:
+        state = build_dashboard_state()
+        state['success'] = True
+        return jsonify(state)
     except Exception as e:
         return jsonify({
             'success': False,
@@ -2406,6 +1725,7 @@ def get_history():
 
 @app.route('/get_weekly_data')
 @login_required
+@versioned_read
 def get_weekly_data_route():
     try:
         data, total_entries = get_weekly_data()
@@ -2419,41 +1739,703 @@ def get_weekly_data_route():
             'total_entries': 0
         })
 
-def get_weekly_data():
-    """Get weekly calorie data for charts for current user"""
+@app.route('/food_frequency')
+@login_required
+def food_frequency():
+    # Same normalization build_food_item_rows stores the food name with
+    food = request.args.get('food', '').strip().lower()
+    if not food:
+        return jsonify({
+            'success': False,
+            'error': 'Missing food parameter'
+        })
+    
     try:
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=6)  # Last 7 days
-        
-        # Get all entries for the week for current user
-        result = supabase.table('calorie_entries').select('*').eq('user_id', session['user_id']).gte('date', start_date.isoformat()).lte('date', end_date.isoformat()).execute()
-        
-        # Group by date and sum calories
-        daily_totals = {}
-        daily_entries = {}  # Track entries per day
+        # Aggregated in the database, so counts are exact however many rows match
+        result = supabase.rpc('food_frequency', {'uid': session['user_id'], 'food_name': food}).execute()
+        stats = result.data[0] if result.data else {}
+        return jsonify({
+            'success': True,
+            'food': food,
+            'times_eaten': stats.get('times_eaten') or 0,
+            'days_eaten': stats.get('days_eaten') or 0,
+            'total_calories': stats.get('total_calories') or 0,
+            'last_eaten': stats.get('last_eaten')
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+# Favorites: the user's most logged meals and foods, from user_meal_stats and
+# user_food_stats (kept current by a trigger on calorie_entries). Logging a
+# favorite copies its stored breakdown, with no model call and no parsing.
+FAVORITES_LIMIT = 12
+
+@request_memoized
+def get_favorites(user_id, limit=FAVORITES_LIMIT):
+    """Most frequently logged meals and foods for a user"""
+    meals = supabase.table('user_meal_stats').select('id, user_input, total_calories, times_logged, last_logged_at').eq('user_id', user_id).order('times_logged', desc=True).order('last_logged_at', desc=True).limit(limit).execute()
+    foods = supabase.table('user_food_stats').select('food, times_logged, last_logged_at').eq('user_id', user_id).order('times_logged', desc=True).limit(limit).execute()
+    return {
+        'meals': meals.data,
+        'foods': foods.data
+    }
+
+@app.route('/favorites')
+@login_required
+@versioned_read
+def favorites():
+    try:
+        limit = min(int(request.args.get('limit', FAVORITES_LIMIT)), 50)
+        favorites = get_favorites(session['user_id'], limit)
+        return jsonify({
+            'success': True,
+            'meals': favorites['meals'],
+            'foods': favorites['foods']
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/log_favorite/<int:favorite_id>', methods=['POST'])
+@login_required
+def log_favorite(favorite_id):
+    try:
+        result = supabase.table('user_meal_stats').select('user_input, total_calories, detailed_breakdown').eq('id', favorite_id).eq('user_id', session['user_id']).execute()
+        if not result.data:
+            return jsonify({
+                'success': False,
+                'error': 'Favorite not found'
+            })
         
-        for entry in result.data:
-            date = entry['date']
-            calories = entry['total_calories']
-            daily_totals[date] = daily_totals.get(date, 0) + calories
-            daily_entries[date] = daily_entries.get(date, 0) + 1
-        
-        # Create chart data for last 7 days
-        chart_data = []
-        total_entries = 0
-        for i in range(7):
-            date = (start_date + timedelta(days=i)).isoformat()
-            chart_data.append({
-                'date': date,
-                'calories': daily_totals.get(date, 0),
-                'entries': daily_entries.get(date, 0),
-                'day': (start_date + timedelta(days=i)).strftime('%a')
+        meal = result.data[0]
+        detailed_breakdown = decode_json_column(meal['detailed_breakdown'], [])
+        success, entry_id, logs = save_to_database(meal['user_input'], detailed_breakdown, meal['total_calories'], detailed_breakdown)
+        invalidate_request_cache('get_favorites')
+        return jsonify(with_dashboard_state({
+            'success': success,
+            'error': None if success else logs[-1],
+            'entry_id': entry_id,
+            'user_input': meal['user_input'],
+            'total_calories': meal['total_calories'],
+            'detailed_breakdown': detailed_breakdown,
+            'logs': logs
+        }))
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+# Full nutrition dataset, built by `flask build-nutrition-db` and memory-mapped
+# read-only so every worker shares the same pages
+NUTRITION_DB_PATH = os.environ.get('NUTRITION_DB_PATH', os.path.join(app.root_path, 'data', 'nutrition.bin'))
+nutrition_store = NutritionStore.open(NUTRITION_DB_PATH)
+
+# Built-in foods as a nutrient matrix for vectorized macro totals
+food_table = NutrientTable.from_dict(NUTRIENTS_PER_100G)
+
+@app.cli.command('build-nutrition-db')
+@click.argument('csv_path', required=False)
+def build_nutrition_db_command(csv_path):
+    """Write the nutrition database from the built-in foods plus an optional CSV.
+
+    The CSV needs a food (or name) column; every other column is read as a
+    nutrient value per 100g.
+    """
+    nutrient_names = list(next(iter(NUTRIENTS_PER_100G.values())))
+    foods = list(NUTRIENTS_PER_100G.items())
+    if csv_path:
+        with open(csv_path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            name_column = 'food' if 'food' in reader.fieldnames else 'name'
+            nutrient_names += [column for column in reader.fieldnames if column not in nutrient_names and column != name_column]
+            for row in reader:
+                values = {}
+                for nutrient in nutrient_names:
+                    try:
+                        values[nutrient] = float(row.get(nutrient) or 'nan')
+                    except ValueError:
+                        pass
+                foods.append((row[name_column], values))
+    count = write_nutrition_store(NUTRITION_DB_PATH, nutrient_names, foods)
+    print(f"Done: {count} foods x {len(nutrient_names)} nutrients written to {NUTRITION_DB_PATH}")
+
+@app.route('/food_lookup')
+@login_required
+def food_lookup():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({
+            'success': False,
+            'error': 'Missing q parameter'
+        })
+    
+    # Resolved locally from the fuzzy food index, no model call
+    match = food_matcher.index.lookup(query)
+    if not match:
+        # Fall back to an exact name in the memory-mapped nutrition database
+        food_id = nutrition_store.find(query) if nutrition_store else None
+        return jsonify({
+            'success': True,
+            'query': query,
+            'match': {
+                'food': nutrition_store.name(food_id),
+                'score': 1.0,
+                'matched_name': nutrition_store.name(food_id),
+                'per_100g': nutrition_store.nutrients(food_id)
+            } if food_id is not None else None
+        })
+    
+    food, score, matched_name = match
+    return jsonify({
+        'success': True,
+        'query': query,
+        'match': {
+            'food': food,
+            'score': score,
+            'matched_name': matched_name,
+            'macros': COMMON_FOODS[food],
+            'per_100g': NUTRIENTS_PER_100G[food]
+        }
+    })
+
+# Background jobs (job_queue.py), kept in SQLite so they survive restarts.
+# They are off unless JOB_QUEUE_PATH names a file on persistent storage that
+# every web and worker process can reach, so read-only serverless deploys
+# (Vercel) still boot; offline sync and AI-parsed imports need them.
+# Web processes run JOB_WORKER_THREADS workers of their own; set it to 0 when
+# a dedicated `flask --app app run-jobs` process does the work instead.
+# Lower priority numbers run first and equal priorities keep arrival order.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+BACKGROUND_MODEL = os.environ.get('BACKGROUND_MODEL', 'mistral-ai/Ministral-3B')
+JOB_QUEUE_PATH = os.environ.get('JOB_QUEUE_PATH')
+JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', '1'))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', '300'))
+JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', '7'))
+
+job_queue = JobQueue(JOB_QUEUE_PATH, lease_seconds=JOB_LEASE_SECONDS, max_attempts=JOB_MAX_ATTEMPTS) if JOB_QUEUE_PATH else None
+if job_queue and GREEN_THREADS:
+    # sqlite3 isn't cooperative; keep its waits off the gevent hub
+    import gevent
+    job_queue.offload = lambda fn, args, kwargs: gevent.get_hub().threadpool.apply(fn, args, kwargs)
+JOB_HANDLERS = {}
+
+def job_handler(kind):
+    """Register fn(payload) -> JSON-serializable result as the runner for a job kind"""
+    def decorator(f):
+        JOB_HANDLERS[kind] = f
+        return f
+    return decorator
+
+def enqueue_extraction(user_id, user_input, entry_date=None, priority=PRIORITY_NORMAL, model_name=BACKGROUND_MODEL,
+                       created_at=None, client_id=None, timezone=None):
+    """Queue a meal description for AI extraction outside the request; returns the job id"""
+    return job_queue.enqueue('extract_food', {
+        'user_id': user_id,
+        'user_input': user_input,
+        'date': entry_date,
+        'model': model_name,
+        'created_at': created_at,
+        'client_id': client_id,
+        'timezone': timezone
+    }, priority=priority, user_id=user_id)
+
+# Queued meals draw from a per-user bucket of their own (same size as the
+# interactive one), so a big import drains at the user's rate without
+# locking them out of /process_food
+def take_model_token(user_id=None):
+    """Draw a background model call from the quotas, or postpone the job until one is free"""
+    user_key = f"llm:user:{user_id}:jobs" if user_id else None
+    if user_key:
+        allowed, wait = llm_user_limiter.check(user_key)
+        if not allowed:
+            raise RetryLater(wait)
+    allowed, wait = llm_global_limiter.check('llm:global')
+    if not allowed:
+        if user_key:
+            llm_user_limiter.refund(user_key)
+        raise RetryLater(wait)
+
+def logged_at(job):
+    """When a queued meal was logged in the user's timezone (a synced entry's created_at, else midday on its date), or None for now"""
+    tz = client_timezone(job.get('timezone'))
+    if job.get('created_at'):
+        try:
+            moment = datetime.fromisoformat(str(job['created_at']).replace('Z', '+00:00'))
+            return moment.astimezone(tz) if moment.tzinfo else moment.replace(tzinfo=tz)
+        except ValueError:
+            pass
+    if job.get('date'):
+        try:
+            return datetime.fromisoformat(f"{job['date']}T12:00:00").replace(tzinfo=tz)
+        except ValueError:
+            pass
+    return None
+
+@job_handler('extract_food')
+def run_extraction_job(job):
+    reused = find_reusable_entry(job['user_id'], job['user_input'], logged_at(job))
+    if reused:
+        food_entries = detailed_breakdown = reused[0]['detailed_breakdown']
+        total_calories = reused[0]['total_calories']
+    else:
+        take_model_token(job['user_id'])
+        model_client = get_model_client(job['model'])
+        # A model error must fail the attempt, not save the meal as "no food found"
+        food_entries, _ = advanced_food_extraction(job['user_input'], model_client, job['model'], raise_errors=True)
+        if not food_entries:
+            print(f"No food detected for queued entry: {job['user_input']!r}")
+            return {'entry_id': None}
+        
+        total_calories, detailed_breakdown, _ = calculate_enhanced_calories(food_entries)
+    success, entry_id, logs = save_to_database(job['user_input'], food_entries, total_calories, detailed_breakdown,
+                                               user_id=job['user_id'], entry_date=job['date'],
+                                               created_at=job.get('created_at'), client_id=job.get('client_id'))
+    if not success:
+        # Raising hands the job back for a retry; client_id keeps offline entries from doubling
+        raise RuntimeError('\n'.join(logs))
+    return {'entry_id': entry_id, 'total_calories': total_calories}
+
+@job_handler('meal_insights')
+def run_insights_job(job):
+    take_model_token()
+    insights, logs = get_llm_insights(job['food_entries'], job['total_calories'], get_model_client(job['model']), job['model'])
+    if insights is None:
+        raise RuntimeError('\n'.join(logs))
+    return {'entry_id': job.get('entry_id'), 'insights': insights}
+
+@job_handler('recalculate_totals')
+def run_recalculate_job(job):
+    entries_seen, entries_fixed = recalculate_entry_totals()
+    return {'entries_seen': entries_seen, 'entries_fixed': entries_fixed}
+
+@job_handler('backfill_food_items')
+def run_backfill_job(job):
+    entries_seen, rows_written = backfill_food_items()
+    return {'entries_seen': entries_seen, 'rows_written': rows_written}
+
+def job_status(job):
+    """The parts of a job a client may see"""
+    return {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'max_attempts': job['max_attempts'],
+        'created_at': datetime.fromtimestamp(job['created_at']).isoformat(),
+        'finished_at': datetime.fromtimestamp(job['finished_at']).isoformat() if job['finished_at'] else None,
+        'result': job['result'],
+        'error': job['last_error'] if job['status'] == 'failed' else None
+    }
+
+@app.route('/jobs/<int:job_id>')
+@login_required
+def job_detail(job_id):
+    job = job_queue.get(job_id) if job_queue else None
+    if not job or job['user_id'] != session['user_id']:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    return jsonify({
+        'success': True,
+        'job': job_status(job)
+    })
+
+@app.route('/jobs')
+@login_required
+def job_list():
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    return jsonify({
+        'success': True,
+        'jobs': [job_status(job) for job in job_queue.recent(session['user_id'], limit)] if job_queue else []
+    })
+
+def job_worker(stop=None):
+    while True:
+        try:
+            job_queue.work(JOB_HANDLERS, stop=stop)
+            return
+        except Exception as e:
+            print(f"Error in job worker: {str(e)}")
+            time.sleep(1)
+
+def start_job_workers():
+    """Start this process's JOB_WORKER_THREADS; only server entry points call this, never CLI commands"""
+    if job_queue is None:
+        return
+    for n in range(JOB_WORKER_THREADS):
+        threading.Thread(target=job_worker, name=f"jobs-{n}", daemon=True).start()
+
+def require_job_queue():
+    if job_queue is None:
+        raise click.UsageError('Background jobs are off; set JOB_QUEUE_PATH')
+
+@app.cli.command('run-jobs')
+@click.option('--threads', default=4, show_default=True, help='Jobs to run at once')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty')
+def run_jobs_command(threads, burst):
+    """Run background jobs until interrupted"""
+    require_job_queue()
+    purged = job_queue.purge(JOB_RETENTION_DAYS * 86400)
+    print(f"Job queue at {JOB_QUEUE_PATH}: {job_queue.counts()} ({purged} old jobs purged)")
+    stop = threading.Event()
+    if burst:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            processed = sum(pool.map(lambda _: job_queue.work(JOB_HANDLERS, burst=True), range(threads)))
+        print(f"Done: {processed} jobs run")
+        return
+    workers = [threading.Thread(target=job_worker, args=(stop,), name=f"jobs-{n}", daemon=True) for n in range(threads)]
+    for worker in workers:
+        worker.start()
+    try:
+        while any(worker.is_alive() for worker in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop.set()
+        job_queue.wakeup.set()
+        print('Stopping after the running jobs finish...')
+        for worker in workers:
+            worker.join()
+
+@app.cli.command('enqueue-job')
+@click.argument('kind', type=click.Choice(['recalculate_totals', 'backfill_food_items']))
+def enqueue_job_command(kind):
+    """Queue a maintenance pass for the job workers"""
+    require_job_queue()
+    job_id = job_queue.enqueue(kind, priority=PRIORITY_LOW, max_attempts=1)
+    print(f"Queued {kind} as job {job_id}")
+
+# Batched sync for the offline client. Meals logged offline arrive with a
+# client-generated UUID; known ids are acknowledged as duplicates so the
+# client can retry a whole batch safely.
+SYNC_MAX_ENTRIES = int(os.environ.get('SYNC_MAX_ENTRIES', '100'))
+
+@app.route('/sync_entries', methods=['POST'])
+@login_required
+def sync_entries():
+    body = request.get_json(silent=True) or {}
+    pending = body.get('entries') or []
+    model_name = body.get('model') or BACKGROUND_MODEL
+    if model_name not in AVAILABLE_MODELS:
+        model_name = BACKGROUND_MODEL
+    if not isinstance(pending, list) or len(pending) > SYNC_MAX_ENTRIES:
+        return jsonify({
+            'success': False,
+            'error': f"Send a list of at most {SYNC_MAX_ENTRIES} entries"
+        }), 400
+    
+    if job_queue is None:
+        # The client keeps its entries and tries again later
+        return jsonify({
+            'success': False,
+            'error': 'Offline sync is not available on this server'
+        }), 503
+    
+    user_id = session['user_id']
+    if body.get('user_id') and str(body['user_id']) != str(user_id):
+        # A queue left behind by another account on this browser
+        return jsonify({
+            'success': False,
+            'error': 'These entries belong to a different account'
+        }), 409
+    accepted = []
+    duplicates = []
+    rejected = []
+    jobs = {}
+    
+    valid = []
+    for item in pending:
+        client_id = str(item.get('client_id') or '') if isinstance(item, dict) else ''
+        user_input = (item.get('user_input') or '').strip() if isinstance(item, dict) else ''
+        try:
+            uuid.UUID(client_id)
+        except ValueError:
+            rejected.append({'client_id': client_id or None, 'error': 'Invalid client_id'})
+            continue
+        if not user_input:
+            rejected.append({'client_id': client_id, 'error': 'Empty entry'})
+            continue
+        valid.append((client_id, user_input, item))
+    
+    try:
+        existing = set()
+        if valid:
+            result = supabase.table('calorie_entries').select('client_id').eq('user_id', user_id).in_('client_id', [v[0] for v in valid]).execute()
+            existing = {row['client_id'] for row in result.data}
+        
+        for client_id, user_input, item in valid:
+            if client_id in existing:
+                duplicates.append(client_id)
+                continue
+            entry_date = parse_import_date(item.get('date')) or datetime.now().date().isoformat()
+            jobs[client_id] = enqueue_extraction(user_id, user_input, entry_date, priority=PRIORITY_NORMAL, model_name=model_name,
+                                                 created_at=item.get('created_at'), client_id=client_id,
+                                                 timezone=item.get('timezone'))
+            accepted.append(client_id)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+    
+    return jsonify({
+        'success': True,
+        'accepted': accepted,
+        'duplicates': duplicates,
+        'rejected': rejected,
+        'jobs': jobs
+    })
+
+# Bulk import of history from other trackers. Header names are matched
+# case-insensitively against these aliases.
+IMPORT_COLUMNS = {
+    'user_input': ['user_input', 'description', 'meal', 'food', 'food name', 'food_name', 'item', 'name'],
+    'total_calories': ['total_calories', 'calories', 'kcal', 'energy (kcal)', 'energy'],
+    'quantity': ['quantity', 'servings', 'amount', 'qty'],
+    'date': ['date', 'day', 'logged_on', 'created_at', 'timestamp', 'datetime']
+}
+IMPORT_DATE_FORMATS = ['%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%Y/%m/%d']
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '500'))
+
+def map_import_columns(fieldnames):
+    """Map our field names to whichever CSV header carries them"""
+    headers = {name.strip().lower(): name for name in fieldnames or []}
+    mapping = {}
+    for field, aliases in IMPORT_COLUMNS.items():
+        for alias in aliases:
+            if alias in headers:
+                mapping[field] = headers[alias]
+                break
+    return mapping
+
+def parse_import_date(value):
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).date().isoformat()
+    except ValueError:
+        pass
+    for date_format in IMPORT_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+def parse_import_number(value):
+    try:
+        return float(str(value).replace(',', '').strip())
+    except (TypeError, ValueError):
+        return None
+
+def flush_import_batch(rows):
+    """Insert a chunk of imported entries and their food item rows"""
+    result = supabase.table('calorie_entries').insert(rows).execute()
+    item_rows = []
+    for entry in result.data:
+        item_rows.extend(build_food_item_rows(entry['id'], entry['user_id'], entry['date'], decode_json_column(entry['detailed_breakdown'], [])))
+    if item_rows:
+        supabase.table('calorie_entry_items').insert(item_rows).execute()
+    return len(result.data)
+
+@app.route('/import', methods=['POST'])
+@login_required
+def import_history():
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({
+            'success': False,
+            'error': 'No file uploaded'
+        }), 400
+    
+    user_id = session['user_id']
+    reader = csv.DictReader(io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline=''))
+    columns = map_import_columns(reader.fieldnames)
+    if 'user_input' not in columns and 'total_calories' not in columns:
+        return jsonify({
+            'success': False,
+            'error': 'Could not find a description or calories column'
+        }), 400
+    
+    imported = 0
+    queued = 0
+    skipped = []
+    rejected = []
+    batch = []
+    
+    try:
+        for line_number, row in enumerate(reader, start=2):
+            values = {field: row.get(header) for field, header in columns.items()}
+            description = (values.get('user_input') or '').strip()
+            calories = parse_import_number(values.get('total_calories'))
+            quantity = parse_import_number(values.get('quantity')) or 1.0
+            entry_date = parse_import_date(values.get('date')) or datetime.now().date().isoformat()
+            
+            # float() accepts "nan" and "inf", which would fail the JSON/DB write for the whole batch
+            if calories is not None and not (math.isfinite(calories) and calories >= 0):
+                rejected.append({'line': line_number, 'error': f"Invalid calories: {values.get('total_calories')}"})
+                continue
+            if not (math.isfinite(quantity) and quantity > 0):
+                rejected.append({'line': line_number, 'error': f"Invalid quantity: {values.get('quantity')}"})
+                continue
+            
+            if calories is None:
+                if not description:
+                    skipped.append(line_number)
+                elif job_queue is None:
+                    rejected.append({'line': line_number, 'error': 'No calories given'})
+                else:
+                    # Nothing to map directly, let the model work it out later (at the user's quota rate)
+                    enqueue_extraction(user_id, description, entry_date, priority=PRIORITY_LOW)
+                    queued += 1
+                continue
+            
+            food = description or 'Imported entry'
+            batch.append({
+                'user_id': user_id,
+                'user_input': food,
+                'food_items': [food],
+                'total_calories': int(round(calories)),
+                'detailed_breakdown': [{
+                    'food': food,
+                    'base_calories': calories / quantity,
+                    'quantity': quantity,
+                    'portion': 'serving',
+                    'container_multiplier': 1.0,
+                    'total_multiplier': quantity,
+                    'total_calories': int(round(calories)),
+                    'confidence': 1.0
+                }],
+                'created_at': f"{entry_date}T12:00:00",
+                'date': entry_date
             })
-            total_entries += daily_entries.get(date, 0)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                imported += flush_import_batch(batch)
+                batch = []
         
-        return chart_data, total_entries
+        if batch:
+            imported += flush_import_batch(batch)
     except Exception as e:
-        return [], 0
+        if imported:
+            bump_data_version(user_id)
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'imported': imported,
+            'queued': queued,
+            'rejected': rejected
+        })
+    
+    if imported:
+        bump_data_version(user_id)
+        publish_change(user_id, 'state_changed')
+    return jsonify({
+        'success': True,
+        'imported': imported,
+        'queued': queued,
+        # Every line, so the user can fix and re-import just those
+        'skipped_lines': skipped,
+        'skipped_count': len(skipped),
+        'rejected': rejected,
+        'rejected_count': len(rejected)
+    })
+
+# Columns included in /export for each table
+EXPORT_TABLES = {
+    'calorie_entries': ['id', 'date', 'created_at', 'user_input', 'food_items', 'total_calories', 'detailed_breakdown'],
+    'user_macros': ['id', 'date', 'created_at', 'protein', 'carbs', 'fats', 'fiber', 'calories'],
+    'chat_history': ['id', 'created_at', 'is_user', 'message']
+}
+EXPORT_PAGE_SIZE = int(os.environ.get('EXPORT_PAGE_SIZE', '1000'))
+
+def iter_user_rows(table, user_id, columns):
+    """Yield a user's rows one page at a time, using the id as a keyset cursor"""
+    last_id = 0
+    while True:
+        result = supabase.table(table).select(','.join(columns)).eq('user_id', user_id).gt('id', last_id).order('id').limit(EXPORT_PAGE_SIZE).execute()
+        if not result.data:
+            return
+        yield from result.data
+        if len(result.data) < EXPORT_PAGE_SIZE:
+            return
+        last_id = result.data[-1]['id']
+
+def stream_csv_export(table, user_id):
+    columns = EXPORT_TABLES[table]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in iter_user_rows(table, user_id, columns):
+        writer.writerow([
+            json.dumps(row.get(column)) if isinstance(row.get(column), (list, dict)) else row.get(column)
+            for column in columns
+        ])
+        # Hand each row to the client as soon as it is written
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    yield buffer.getvalue()
+
+def stream_ndjson_export(tables, user_id):
+    for table in tables:
+        for row in iter_user_rows(table, user_id, EXPORT_TABLES[table]):
+            row['table'] = table
+            yield json.dumps(row) + '\n'
+
+@app.route('/export')
+@login_required
+def export_data():
+    export_format = request.args.get('format', 'csv').lower()
+    tables = [t.strip() for t in request.args.get('tables', ','.join(EXPORT_TABLES)).split(',') if t.strip()]
+    unknown = [t for t in tables if t not in EXPORT_TABLES]
+    if unknown or not tables:
+        return jsonify({
+            'success': False,
+            'error': f"Unknown tables: {', '.join(unknown)}" if unknown else 'No tables requested'
+        }), 400
+    
+    user_id = session['user_id']
+    stamp = datetime.now().strftime('%Y%m%d')
+    if 'chat_history' in tables:
+        # Include messages still waiting in the write-behind buffer
+        flush_chat_buffer()
+    
+    if export_format == 'ndjson':
+        return Response(
+            stream_with_context(stream_ndjson_export(tables, user_id)),
+            mimetype='application/x-ndjson',
+            headers={'Content-Disposition': f'attachment; filename=calorie-tracker-{stamp}.ndjson'}
+        )
+    
+    if export_format == 'csv':
+        # CSV has a single header row, so it exports one table at a time
+        if len(tables) > 1:
+            tables = [request.args.get('table', 'calorie_entries')]
+            if tables[0] not in EXPORT_TABLES:
+                return jsonify({
+                    'success': False,
+                    'error': f"Unknown table: {tables[0]}"
+                }), 400
+        return Response(
+            stream_with_context(stream_csv_export(tables[0], user_id)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={tables[0]}-{stamp}.csv'}
+        )
+    
+    return jsonify({
+        'success': False,
+        'error': f"Unsupported format: {export_format}"
+    }), 400
 
 @app.route('/delete_all_entries', methods=['DELETE'])
 @login_required
@@ -2461,12 +2443,15 @@ def delete_all_entries():
     try:
         # Delete all entries for the current user
         result = supabase.table('calorie_entries').delete().eq('user_id', session['user_id']).execute()
+        invalidate_request_cache('get_daily_summary', 'get_week_entries', 'get_recent_history')
+        bump_data_version(session['user_id'])
+        publish_change(session['user_id'], 'entries_cleared')
         
         if result.data:
-            return jsonify({
+            return jsonify(with_dashboard_state({
                 'success': True,
                 'message': 'All entries deleted successfully'
-            })
+            }))
         else:
             return jsonify({
                 'success': False,
@@ -2480,6 +2465,7 @@ def delete_all_entries():
 
 @app.route('/chat', methods=['POST'])
 @login_required
+@llm_quota
 def chat():
     try:
         message = request.json.get('message', '')
@@ -2611,107 +2597,18 @@ Assistant:"""
                 'calories': sum(m['calories'] for m in current_macros) if current_macros else 0
             }
             
-            # Enhanced food database with quantities and more foods
-            common_foods = {
-                'samosa': {'protein': 3, 'carbs': 15, 'fats': 8, 'calories': 150},
-                'idli': {'protein': 2, 'carbs': 15, 'fats': 0.5, 'calories': 70},
-                'sambar': {'protein': 3, 'carbs': 10, 'fats': 1, 'calories': 60},
-                'rice': {'protein': 2, 'carbs': 45, 'fats': 0.5, 'calories': 200},
-                'chapati': {'protein': 3, 'carbs': 15, 'fats': 1, 'calories': 100},
-                'dal': {'protein': 6, 'carbs': 20, 'fats': 1, 'calories': 120},
-                'bread': {'protein': 3, 'carbs': 15, 'fats': 1, 'calories': 80},
-                'pasta': {'protein': 5, 'carbs': 30, 'fats': 1, 'calories': 150},
-                'pizza': {'protein': 10, 'carbs': 30, 'fats': 12, 'calories': 300},
-                'burger': {'protein': 15, 'carbs': 30, 'fats': 20, 'calories': 350},
-                'salad': {'protein': 2, 'carbs': 5, 'fats': 0.5, 'calories': 30},
-                'paneer': {'protein': 18, 'carbs': 2, 'fats': 20, 'calories': 265},
-                'curd': {'protein': 3, 'carbs': 4, 'fats': 2, 'calories': 60},
-                'milk': {'protein': 8, 'carbs': 12, 'fats': 8, 'calories': 150},
-                'banana': {'protein': 1, 'carbs': 27, 'fats': 0.3, 'calories': 105},
-                'apple': {'protein': 0.5, 'carbs': 25, 'fats': 0.3, 'calories': 95},
-                'orange': {'protein': 1, 'carbs': 12, 'fats': 0.1, 'calories': 47},
-                'mango': {'protein': 1, 'carbs': 15, 'fats': 0.4, 'calories': 60},
-                'chicken': {'protein': 31, 'carbs': 0, 'fats': 3.6, 'calories': 165},
-                'fish': {'protein': 22, 'carbs': 0, 'fats': 3.5, 'calories': 120},
-                'egg': {'protein': 6, 'carbs': 0.6, 'fats': 5, 'calories': 68},
-                'boiled egg': {'protein': 6, 'carbs': 0.6, 'fats': 5, 'calories': 68},
-                'dosa': {'protein': 3, 'carbs': 20, 'fats': 2, 'calories': 133},
-                'upma': {'protein': 4, 'carbs': 25, 'fats': 3, 'calories': 150},
-                'poha': {'protein': 3, 'carbs': 22, 'fats': 2, 'calories': 120},
-                'paratha': {'protein': 5, 'carbs': 30, 'fats': 8, 'calories': 200},
-                'biryani': {'protein': 15, 'carbs': 45, 'fats': 12, 'calories': 350},
-                'noodles': {'protein': 4, 'carbs': 35, 'fats': 2, 'calories': 180},
-                'sandwich': {'protein': 8, 'carbs': 25, 'fats': 5, 'calories': 180},
-                'soup': {'protein': 2, 'carbs': 8, 'fats': 1, 'calories': 50},
-                'juice': {'protein': 0, 'carbs': 25, 'fats': 0, 'calories': 100},
-                'coffee': {'protein': 0, 'carbs': 0, 'fats': 0, 'calories': 2},
-                'tea': {'protein': 0, 'carbs': 0, 'fats': 0, 'calories': 7},
-                'water': {'protein': 0, 'carbs': 0, 'fats': 0, 'calories': 0}
-            }
-            
-            # Enhanced food detection with quantity and containers
+            # Find foods, quantities and containers in one pass over the message tokens
             detected_foods = []
             message_lower = message.lower()
             
-            # Common container sizes and their multipliers
-            containers = {
-                'bowl': 1.5,
-                'plate': 2.0,
-                'cup': 1.0,
-                'glass': 1.0,
-                'piece': 1.0,
-                'slice': 1.0,
-                'serving': 1.0,
-                'portion': 1.0,
-                'small': 0.7,
-                'medium': 1.0,
-                'large': 1.3,
-                'half': 0.5,
-                'quarter': 0.25,
-                'full': 1.0
-            }
-            
-            for food, macros in common_foods.items():
-                if food in message_lower:
-                    # Look for quantity and container before the food name
-                    quantity = 1
-                    container_multiplier = 1.0
-                    words = message_lower.split()
-                    food_index = words.index(food)
-                    
-                    if food_index > 0:
-                        # Check for numbers
-                        try:
-                            quantity = float(words[food_index - 1])
-                        except (ValueError, IndexError):
-                            # Check for common quantity words
-                            if words[food_index - 1] in ['a', 'an', 'one']:
-                                quantity = 1
-                            elif words[food_index - 1] in ['two', '2']:
-                                quantity = 2
-                            elif words[food_index - 1] in ['three', '3']:
-                                quantity = 3
-                            elif words[food_index - 1] in ['four', '4']:
-                                quantity = 4
-                            elif words[food_index - 1] in ['five', '5']:
-                                quantity = 5
-                            
-                            # Check for container sizes
-                            for container, multiplier in containers.items():
-                                if container in words[food_index - 1]:
-                                    container_multiplier = multiplier
-                                    break
-                    
-                    food_detected = True
-                    detected_foods.append(food)
-                    
-                    # Calculate macros with quantity and container
-                    total_multiplier = quantity * container_multiplier
-                    if not macro_data:
-                        macro_data = {k: v * total_multiplier for k, v in macros.items()}
-                    else:
-                        for key in macro_data:
-                            macro_data[key] += macros[key] * total_multiplier
+            # Chat is ordinary prose: no typo folding, or "apply" would log an apple
+            matches = food_matcher.find(message, fuzzy=False)
+            if matches:
+                food_detected = True
+                detected_foods = [match['food'] for match in matches]
+                
+                # Macros are grams x per-100g values, summed over every food in one go
+                macro_data = food_table.totals(food_table.ids(detected_foods), [match['grams'] for match in matches])
             
             # Update macros if food was detected
             if food_detected:
@@ -2770,6 +2667,7 @@ Assistant:"""
             'error': "I'm having trouble processing your request right now. Please try again in a moment."
         })
 
+@request_memoized
 def get_user_goals(user_id):
     """Get user's current goals"""
     try:
@@ -2793,6 +2691,7 @@ def save_user_goal(user_id, goal_data):
             goal_data['user_id'] = user_id
             result = supabase.table('user_goals').insert(goal_data).execute()
         
+        invalidate_request_cache('get_user_goals')
         return result.data[0] if result.data else None
     except Exception as e:
         print(f"Error saving user goal: {str(e)}")
@@ -2803,12 +2702,17 @@ def save_user_macros(user_id, macro_data):
     try:
         macro_data['user_id'] = user_id
         macro_data['date'] = datetime.now().date().isoformat()
+        if macro_data.get('calories') is not None:
+            # user_macros.calories is an INTEGER column
+            macro_data['calories'] = int(round(macro_data['calories']))
         result = supabase.table('user_macros').insert(macro_data).execute()
+        invalidate_request_cache('get_user_macros')
         return result.data[0] if result.data else None
     except Exception as e:
         print(f"Error saving user macros: {str(e)}")
         return None
 
+@request_memoized
 def get_user_macros(user_id, date=None):
     """Get user's macros for a specific date"""
     if not date:
@@ -2821,20 +2725,213 @@ def get_user_macros(user_id, date=None):
         print(f"Error getting user macros: {str(e)}")
         return []
 
+# Write-behind buffer for chat_history. Messages are appended to a local
+# journal and flushed to Supabase in bulk inserts by a background thread,
+# so chat responses never wait on a database round trip. Each process keeps
+# its own journal (CHAT_JOURNAL_PATH.<pid>) and adopts the journals of
+# processes that have exited; rows that keep failing on their own go to a
+# dead-letter file (CHAT_JOURNAL_PATH.dead) instead of blocking the queue.
+# The journal belongs on a disk that survives a reboot, not a temp dir; where
+# it can't be written (Vercel) messages are still buffered, just in memory.
+CHAT_JOURNAL_PATH = os.environ.get('CHAT_JOURNAL_PATH', os.path.join(app.root_path, 'data', 'chat_history.journal'))
+CHAT_FLUSH_INTERVAL = float(os.environ.get('CHAT_FLUSH_INTERVAL_MS', '300')) / 1000
+CHAT_FLUSH_BATCH_SIZE = int(os.environ.get('CHAT_FLUSH_BATCH_SIZE', '500'))
+CHAT_MAX_ATTEMPTS = int(os.environ.get('CHAT_MAX_ATTEMPTS', '5'))
+chat_journal_path = f"{CHAT_JOURNAL_PATH}.{os.getpid()}"
+chat_dead_letter_path = f"{CHAT_JOURNAL_PATH}.dead"
+try:
+    os.makedirs(os.path.dirname(os.path.abspath(CHAT_JOURNAL_PATH)), exist_ok=True)
+except OSError as e:
+    print(f"Error creating chat journal directory: {str(e)}")
+
+chat_buffer = []
+chat_buffer_lock = threading.Lock()
+chat_flush_lock = threading.Lock()  # One flusher at a time, so no batch is inserted twice
+chat_flush_event = threading.Event()
+
+def chat_row(record):
+    """The chat_history row for a buffered record, without its retry count"""
+    return {key: value for key, value in record.items() if key != 'attempts'}
+
+def _rewrite_chat_journal():
+    """Rewrite this process's journal with whatever is still pending (caller holds the lock)"""
+    tmp_path = chat_journal_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for record in chat_buffer:
+            f.write(json.dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, chat_journal_path)
+
+def _read_chat_journal(path):
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # A torn final line from a crash mid-write
+                continue
+    return records
+
+def _journal_owner_alive(path):
+    """True while the process named in a journal or claim file is still running"""
+    match = re.fullmatch(r'(?:claim-)?(\d+)(?:-\w+)?', path[len(CHAT_JOURNAL_PATH) + 1:])
+    if not match:
+        return True  # Not a journal name we wrote; leave it alone
+    pid = int(match.group(1))
+    if pid == os.getpid():
+        # Left by an earlier process that had our pid
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def replay_chat_journal():
+    """Adopt the journals of processes that have exited.
+    
+    A journal is claimed by renaming it before its rows are read, so when
+    several workers start at once only one of them replays each file.
+    """
+    replayed = 0
+    # Our own journal name goes first: before this process has written, a file
+    # there was left by an earlier one with the same pid (a restarted
+    # container), and it must be claimed before the rewrite below replaces it
+    paths = glob.glob(glob.escape(CHAT_JOURNAL_PATH) + '.*')
+    for path in [chat_journal_path, CHAT_JOURNAL_PATH] + [path for path in paths if path != chat_journal_path]:
+        if not os.path.exists(path):
+            continue
+        if path == chat_dead_letter_path or path.endswith('.tmp'):
+            continue
+        if path != CHAT_JOURNAL_PATH and _journal_owner_alive(path):
+            continue
+        claimed = f"{CHAT_JOURNAL_PATH}.claim-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue  # Another worker claimed it first
+        
+        try:
+            records = _read_chat_journal(claimed)
+            with chat_buffer_lock:
+                chat_buffer.extend(records)
+                _rewrite_chat_journal()
+            os.remove(claimed)
+            replayed += len(records)
+        except Exception as e:
+            print(f"Error replaying chat journal {path}: {str(e)}")
+    return replayed
+
+def _dead_letter_chat(records, error):
+    with open(chat_dead_letter_path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(dict(record, error=error)) + '\n')
+    print(f"Moved {len(records)} chat messages to {chat_dead_letter_path}: {error}")
+
+def _isolate_failed_chat_batch(batch, error):
+    """After a failed bulk insert, find out whether the first row is the problem.
+    
+    Returns the records that are finished with (inserted or dead-lettered).
+    The first row is only blamed when the rows behind it insert fine, so an
+    outage never counts against anyone's message.
+    """
+    first, rest = batch[0], batch[1:]
+    try:
+        supabase.table('chat_history').insert(chat_row(first)).execute()
+        return [first]
+    except Exception as e:
+        error = str(e)
+    if not rest:
+        return []
+    try:
+        supabase.table('chat_history').insert([chat_row(record) for record in rest]).execute()
+    except Exception:
+        return []
+    
+    first['attempts'] = first.get('attempts', 0) + 1
+    if first['attempts'] >= CHAT_MAX_ATTEMPTS:
+        _dead_letter_chat([first], error)
+        return batch
+    return rest
+
+def flush_chat_buffer():
+    """Bulk insert buffered chat messages; failed batches stay queued for retry"""
+    flushed = 0
+    with chat_flush_lock:
+        while True:
+            with chat_buffer_lock:
+                batch = chat_buffer[:CHAT_FLUSH_BATCH_SIZE]
+            if not batch:
+                return flushed
+            
+            try:
+                supabase.table('chat_history').insert([chat_row(record) for record in batch]).execute()
+                finished = batch
+            except Exception as e:
+                print(f"Error flushing chat messages: {str(e)}")
+                finished = _isolate_failed_chat_batch(batch, str(e))
+                if not finished:
+                    return flushed
+            
+            finished_ids = {id(record) for record in finished}
+            with chat_buffer_lock:
+                chat_buffer[:] = [record for record in chat_buffer if id(record) not in finished_ids]
+                try:
+                    _rewrite_chat_journal()
+                except Exception as e:
+                    print(f"Error compacting chat journal: {str(e)}")
+            flushed += len(finished)
+
+def discard_buffered_chat(user_id):
+    """Drop a user's queued chat messages (used when their history is wiped)"""
+    with chat_flush_lock, chat_buffer_lock:
+        chat_buffer[:] = [record for record in chat_buffer if record['user_id'] != user_id]
+        try:
+            _rewrite_chat_journal()
+        except OSError as e:
+            print(f"Error compacting chat journal: {str(e)}")
+
+def chat_flush_worker():
+    """Background loop that drains the chat buffer every few hundred ms, backing off while inserts fail"""
+    failures = 0
+    while True:
+        chat_flush_event.wait(CHAT_FLUSH_INTERVAL * 2 ** min(failures, 8))
+        chat_flush_event.clear()
+        flush_chat_buffer()
+        with chat_buffer_lock:
+            failures = failures + 1 if chat_buffer else 0
+
 def save_chat_message(user_id, message, is_user):
-    """Save chat message to history"""
+    """Queue chat message for a batched write to history"""
     try:
         data = {
             'user_id': user_id,
             'message': message,
-            'is_user': is_user
+            'is_user': is_user,
+            'created_at': datetime.now().isoformat()
         }
-        result = supabase.table('chat_history').insert(data).execute()
-        return result.data[0] if result.data else None
+        with chat_buffer_lock:
+            # Journal first so the message survives a crash before the flush
+            try:
+                with open(chat_journal_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(data) + '\n')
+            except OSError as e:
+                # Unwritable disk: keep the message in memory rather than drop it
+                print(f"Error journaling chat message: {str(e)}")
+            chat_buffer.append(data)
+        return data
     except Exception as e:
         print(f"Error saving chat message: {str(e)}")
         return None
 
+@request_memoized
 def get_chat_history(user_id, limit=10):
     """Get recent chat history"""
     try:
@@ -2854,20 +2951,31 @@ def reset_all_data():
         supabase.table('calorie_entries').delete().eq('user_id', user_id).execute()
         supabase.table('user_goals').delete().eq('user_id', user_id).execute()
         supabase.table('user_macros').delete().eq('user_id', user_id).execute()
+        discard_buffered_chat(user_id)
         supabase.table('chat_history').delete().eq('user_id', user_id).execute()
+        bump_data_version(user_id)
+        publish_change(user_id, 'entries_cleared')
         
-        return jsonify({
+        return jsonify(with_dashboard_state({
             'success': True,
             'message': 'All user data has been reset successfully'
-        })
+        }))
     except Exception as e:
         return jsonify({
             'success': False,
             'error': str(e)
         })
 
+# Start the chat write-behind flusher, replaying anything left from the last run
+replay_chat_journal()
+threading.Thread(target=chat_flush_worker, name='chat-flush', daemon=True).start()
+atexit.register(flush_chat_buffer)
+
 # Change the run configuration at the bottom
 if __name__ == '__main__':
+    # The debug reloader runs this file in a watcher and a child; only the child serves
+    if os.environ.get('FLASK_ENV') != 'development' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_job_workers()
     # For local development
     if os.environ.get('FLASK_ENV') == 'development':
         app.run(debug=True)
@@ -0,0 +1,67 @@
+// Writes static/css/icons.css with just the Font Awesome icons the templates
+// and dashboard script use. Each icon is an SVG mask on the <i> element, so
+// no icon JavaScript runs in the browser and dynamically inserted icons work.
+import { readFileSync, readdirSync, statSync, writeFileSync } from 'node:fs';
+import { join } from 'node:path';
+import { fas } from '@fortawesome/free-solid-svg-icons';
+
+const SOURCES = ['templates', 'static/js'];
+const OUTPUT = 'static/css/icons.css';
+// Built at runtime as `fa-${icon}` in dashboard.js, so the scan cannot see them
+const SAFELIST = ['user', 'robot'];
+// Modifier classes rather than icons
+const MODIFIERS = new Set(['spin', 'fw', 'solid']);
+
+function listFiles(dir) {
+  return readdirSync(dir).flatMap((name) => {
+    const path = join(dir, name);
+    return statSync(path).isDirectory() ? listFiles(path) : [path];
+  });
+}
+
+function iconIndex() {
+  // Index every icon under its name and its v5 aliases (trash-alt, redo, ...)
+  const index = new Map();
+  for (const definition of Object.values(fas)) {
+    index.set(definition.iconName, definition);
+    for (const alias of definition.icon[2]) {
+      if (typeof alias === 'string') index.set(alias, definition);
+    }
+  }
+  return index;
+}
+
+function usedIconNames() {
+  const names = new Set(SAFELIST);
+  for (const file of SOURCES.flatMap(listFiles)) {
+    for (const match of readFileSync(file, 'utf8').matchAll(/\bfa-([a-z0-9-]+)/g)) {
+      if (!MODIFIERS.has(match[1])) names.add(match[1]);
+    }
+  }
+  return [...names].sort();
+}
+
+function iconRule(name, definition) {
+  const [width, height, , , pathData] = definition.icon;
+  const d = Array.isArray(pathData) ? pathData.join(' ') : pathData;
+  const svg = `<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 ${width} ${height}"><path d="${d}"/></svg>`;
+  return `.fa-${name}{--fa-width:${(width / height).toFixed(4)}em;--fa-icon:url("data:image/svg+xml,${encodeURIComponent(svg)}")}`;
+}
+
+const index = iconIndex();
+const rules = [
+  '.fas,.fa-solid{display:inline-block;width:var(--fa-width,1em);height:1em;vertical-align:-.125em;background-color:currentColor;-webkit-mask:var(--fa-icon) center/contain no-repeat;mask:var(--fa-icon) center/contain no-repeat}',
+  '.fa-fw{width:1.25em}',
+  '.fa-spin{animation:fa-spin 2s linear infinite}',
+  '@keyframes fa-spin{to{transform:rotate(360deg)}}',
+];
+const missing = [];
+for (const name of usedIconNames()) {
+  const definition = index.get(name);
+  if (definition) rules.push(iconRule(name, definition));
+  else missing.push(name);
+}
+
+writeFileSync(OUTPUT, rules.join('\n') + '\n');
+console.log(`Wrote ${rules.length - 4} icons to ${OUTPUT}`);
+if (missing.length) console.warn(`Unknown icons: ${missing.join(', ')}`);
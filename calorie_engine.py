@@ -0,0 +1,93 @@
+"""Vectorized calorie and macro computation.
+
+Everything here works on arrays: one row per food item, with an optional
+entry id per item so many entries are totalled in one pass. The per-entry
+code paths in app.py build one-row-per-item arrays and call the same
+functions, so single entries and bulk recomputation share one code path.
+"""
+import numpy as np
+
+
+class NutrientTable:
+    """Nutrient values per 100g as a (nutrients x foods) matrix addressed by food id"""
+
+    def __init__(self, food_names, nutrient_names, matrix):
+        self.food_names = list(food_names)
+        self.nutrient_names = list(nutrient_names)
+        self.matrix = matrix
+        self.food_ids = {name: food_id for food_id, name in enumerate(self.food_names)}
+
+    @classmethod
+    def from_dict(cls, per_100g):
+        """Table from {food: {nutrient: value}} such as NUTRIENTS_PER_100G"""
+        food_names = list(per_100g)
+        nutrient_names = list(next(iter(per_100g.values())))
+        matrix = np.array([[per_100g[food][nutrient] for food in food_names] for nutrient in nutrient_names], dtype=np.float64)
+        return cls(food_names, nutrient_names, matrix)
+
+    @classmethod
+    def from_store(cls, store):
+        """Zero-copy table over a memory-mapped NutritionStore (float32 on disk; math is done in float64)"""
+        matrix = np.frombuffer(store.matrix(), dtype='<f4')
+        food_names = [store.name(food_id) for food_id in range(store.food_count)]
+        return cls(food_names, store.nutrient_names, matrix.reshape(store.nutrient_count, store.food_count))
+
+    def ids(self, names):
+        """Food ids for names, -1 where a name isn't in the table"""
+        return np.fromiter((self.food_ids.get(name, -1) for name in names), dtype=np.int64)
+
+    def nutrients(self, food_ids, grams):
+        """(items x nutrients) values for each food id at its weight in grams"""
+        food_ids = np.asarray(food_ids, dtype=np.int64)
+        grams = np.asarray(grams, dtype=np.float64)
+        values = self.matrix[:, food_ids].T.astype(np.float64) * (grams / 100.0)[:, None]
+        values[food_ids < 0] = 0.0
+        return np.nan_to_num(values)
+
+    def totals(self, food_ids, grams):
+        """{nutrient: total} over every item, rounded to 2 decimals so float error never shows"""
+        summed = self.nutrients(food_ids, grams).sum(axis=0)
+        return {nutrient: round(float(value), 2) for nutrient, value in zip(self.nutrient_names, summed)}
+
+
+def item_calories(base_calories, multipliers):
+    """Calories per item: base calories x total multiplier, truncated like int()"""
+    base_calories = np.asarray(base_calories, dtype=np.float64)
+    multipliers = np.asarray(multipliers, dtype=np.float64)
+    # Round off float error first, so 100 x 0.29 (28.999999999999996) truncates to 29, not 28
+    return np.trunc(np.round(base_calories * multipliers, 6)).astype(np.int64)
+
+
+def entry_totals(values, entry_ids, entry_count):
+    """Sum per-item values into per-entry totals; entry_ids are 0..entry_count-1"""
+    values = np.asarray(values)
+    entry_ids = np.asarray(entry_ids, dtype=np.int64)
+    if values.ndim == 1:
+        return np.bincount(entry_ids, weights=values, minlength=entry_count)
+    totals = np.zeros((entry_count, values.shape[1]), dtype=np.float64)
+    np.add.at(totals, entry_ids, values)
+    return totals
+
+
+def breakdown_arrays(breakdowns):
+    """Flatten a list of detailed_breakdown lists into item arrays.
+
+    Returns (entry_ids, base_calories, multipliers) with one row per item;
+    items missing a value count as zero.
+    """
+    entry_ids, base_calories, multipliers = [], [], []
+    for entry_id, breakdown in enumerate(breakdowns):
+        for item in breakdown or []:
+            entry_ids.append(entry_id)
+            base_calories.append(item.get('base_calories') or 0)
+            multipliers.append(item.get('total_multiplier') or 0)
+    return (np.asarray(entry_ids, dtype=np.int64),
+            np.asarray(base_calories, dtype=np.float64),
+            np.asarray(multipliers, dtype=np.float64))
+
+
+def recompute_totals(breakdowns):
+    """Total calories per entry for many stored breakdowns at once"""
+    entry_ids, base_calories, multipliers = breakdown_arrays(breakdowns)
+    calories = item_calories(base_calories, multipliers)
+    return entry_totals(calories, entry_ids, len(breakdowns)).astype(np.int64)
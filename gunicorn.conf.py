@@ -0,0 +1,34 @@
+"""Gunicorn settings, picked up automatically by `gunicorn app:app`.
+
+The default gevent worker serves the LLM-bound routes (/process_food,
+/chat, /events) on green threads: while a request waits on the model or
+Supabase its greenlet yields, so each worker process holds up to
+WORKER_CONNECTIONS requests instead of one per thread. Set
+WORKER_CLASS=gthread (or sync) to compare against the threaded setup.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+worker_class = os.environ.get('WORKER_CLASS', 'gevent')
+# Rate-limit buckets and the SSE change feed are per process unless they
+# live in Redis, so extra workers split them; default to one worker (which
+# gevent already lets hold WORKER_CONNECTIONS requests) unless both do.
+shared_state = all(os.environ.get(name) == 'redis' for name in ('RATE_LIMIT_BACKEND', 'CHANGE_FEED_BACKEND'))
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() if shared_state else 1))
+
+# gevent: concurrent requests per worker; gthread: threads per worker
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', '1000'))
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+
+# Model calls can take a while; SSE connections send a heartbeat well inside this
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_worker_init(worker):
+    # Job workers start here rather than on import, so CLI commands that
+    # import the app (run-jobs, enqueue-job, backfill) don't run jobs too
+    from app import start_job_workers
+    start_job_workers()
@@ -0,0 +1,304 @@
+"""Durable background jobs in a local SQLite file.
+
+Work that doesn't have to finish inside the HTTP request (model calls for
+queued meals, meal insights, maintenance passes) is written to a jobs table
+and run by worker threads in the web process or by a separate
+`flask --app app run-jobs` process. Jobs survive restarts: a claimed job
+holds a lease that its worker renews while the handler runs, and one whose
+worker died is claimed again once the lease expires.
+Failed jobs are retried with exponential backoff up to max_attempts.
+"""
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    user_id TEXT,
+    payload TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 5,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_at REAL NOT NULL,
+    lease_until REAL,
+    worker TEXT,
+    result TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority, run_at, id);
+CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user_id, id);
+"""
+
+
+class RetryLater(Exception):
+    """Raised by a handler to run its job again after delay seconds without using up an attempt"""
+
+    def __init__(self, delay):
+        super().__init__(f"Retry in {delay:.0f}s")
+        self.delay = delay
+
+
+def _blocking(method):
+    """Run a SQLite call through queue.offload when one is set.
+
+    Under gevent, sqlite3 blocks the whole hub (up to its 30s busy timeout
+    while another process holds the write lock); app.py sets offload to
+    gevent's native thread pool so only the calling greenlet waits.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.offload is None:
+            return method(self, *args, **kwargs)
+        return self.offload(method, (self,) + args, kwargs)
+    return wrapper
+
+
+def _job(row):
+    """Row as a dict with payload and result decoded"""
+    job = dict(row)
+    job['payload'] = json.loads(job['payload'])
+    job['result'] = json.loads(job['result']) if job['result'] is not None else None
+    return job
+
+
+class JobQueue:
+    """Priority queue of jobs; lower priority numbers run first, then oldest first"""
+
+    def __init__(self, path, lease_seconds=300, max_attempts=3, retry_delay=5.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.offload = None
+        # Wakes this process's workers as soon as it enqueues something
+        self.wakeup = threading.Event()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as db:
+            # WAL lets web workers enqueue while a worker process holds a write
+            db.execute('PRAGMA journal_mode=WAL')
+            db.executescript(SCHEMA)
+        self._migrate()
+
+    @contextmanager
+    def _connection(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction that takes the lock up front, so claims never race"""
+        with self._connection() as db:
+            db.execute('BEGIN IMMEDIATE')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+
+    def _migrate(self):
+        """Rebuild queues created when user_id was an INTEGER column (user ids are UUIDs)"""
+        with self._transaction() as db:
+            columns = {row['name']: row['type'] for row in db.execute('PRAGMA table_info(jobs)')}
+            if columns.get('user_id') != 'INTEGER':
+                return
+            db.execute('DROP INDEX jobs_ready')
+            db.execute('DROP INDEX jobs_user')
+            db.execute('ALTER TABLE jobs RENAME TO jobs_old')
+            for statement in SCHEMA.split(';'):
+                if statement.strip():
+                    db.execute(statement)
+            names = ', '.join(name for name in columns if name != 'user_id')
+            db.execute(f"INSERT INTO jobs (user_id, {names}) SELECT CAST(user_id AS TEXT), {names} FROM jobs_old")
+            db.execute('DROP TABLE jobs_old')
+
+    def enqueue(self, kind, payload=None, priority=5, user_id=None, delay=0, max_attempts=None):
+        """Add a job and return its id"""
+        job_id = self._insert(kind, json.dumps(payload or {}), priority, user_id, delay, max_attempts or self.max_attempts)
+        self.wakeup.set()
+        return job_id
+
+    @_blocking
+    def _insert(self, kind, payload, priority, user_id, delay, max_attempts):
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute(
+                'INSERT INTO jobs (kind, user_id, payload, priority, max_attempts, run_at, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (kind, user_id, payload, priority, max_attempts, now + delay, now))
+        return cursor.lastrowid
+
+    @_blocking
+    def claim(self, worker, kinds=None):
+        """Lease the next runnable job to worker, or return None.
+
+        Runnable means queued and due, or running under a lease that has expired.
+        """
+        now = time.time()
+        kind_filter = ''
+        params = [now, now]
+        if kinds is not None:
+            kinds = list(kinds)
+            kind_filter = f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+        with self._transaction() as db:
+            while True:
+                row = db.execute(
+                    "SELECT id, attempts, max_attempts FROM jobs "
+                    "WHERE ((status = 'queued' AND run_at <= ?) OR (status = 'running' AND lease_until < ?))"
+                    f"{kind_filter} ORDER BY priority, run_at, id LIMIT 1", params).fetchone()
+                if row is None:
+                    return None
+                if row['attempts'] >= row['max_attempts']:
+                    # Its last attempt's worker died without reporting back
+                    db.execute("UPDATE jobs SET status = 'failed', last_error = ?, finished_at = ?, lease_until = NULL "
+                               "WHERE id = ?", ('Worker lost the job (lease expired)', now, row['id']))
+                    continue
+                db.execute("UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, lease_until = ? "
+                           "WHERE id = ?", (worker, now + self.lease_seconds, row['id']))
+                return _job(db.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone())
+
+    @_blocking
+    def renew(self, job_id, worker):
+        """Extend worker's lease on a running job; False if the job is no longer worker's"""
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                                (time.time() + self.lease_seconds, job_id, worker))
+        return cursor.rowcount == 1
+
+    @_blocking
+    def complete(self, job_id, worker, result=None):
+        """Record worker's result; False (and nothing written) if its lease was lost"""
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET status = 'done', result = ?, lease_until = NULL, finished_at = ? "
+                                "WHERE id = ? AND worker = ? AND status = 'running'",
+                                (json.dumps(result), time.time(), job_id, worker))
+        return cursor.rowcount == 1
+
+    @_blocking
+    def fail(self, job_id, worker, error):
+        """Record a failed attempt by worker; returns True if the job will be retried"""
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker = ? AND status = 'running'",
+                             (job_id, worker)).fetchone()
+            if row is None:
+                # The lease lapsed and the job was reclaimed or given up on
+                return False
+            if row['attempts'] < row['max_attempts']:
+                backoff = self.retry_delay * 2 ** (row['attempts'] - 1)
+                db.execute("UPDATE jobs SET status = 'queued', run_at = ?, last_error = ?, lease_until = NULL "
+                           "WHERE id = ?", (now + backoff, error, job_id))
+                return True
+            db.execute("UPDATE jobs SET status = 'failed', last_error = ?, lease_until = NULL, finished_at = ? "
+                       "WHERE id = ?", (error, now, job_id))
+            return False
+
+    @_blocking
+    def postpone(self, job_id, worker, delay):
+        """Hand worker's job back to the queue for delay seconds, not counting the attempt"""
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET status = 'queued', run_at = ?, attempts = attempts - 1, lease_until = NULL "
+                                "WHERE id = ? AND worker = ? AND status = 'running'",
+                                (time.time() + delay, job_id, worker))
+        return cursor.rowcount == 1
+
+    @_blocking
+    def get(self, job_id):
+        with self._connection() as db:
+            row = db.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return _job(row) if row else None
+
+    @_blocking
+    def recent(self, user_id, limit=20):
+        """A user's newest jobs"""
+        with self._connection() as db:
+            rows = db.execute('SELECT * FROM jobs WHERE user_id = ? ORDER BY id DESC LIMIT ?', (user_id, limit)).fetchall()
+        return [_job(row) for row in rows]
+
+    @_blocking
+    def counts(self):
+        """{status: number of jobs}"""
+        with self._connection() as db:
+            rows = db.execute('SELECT status, COUNT(*) AS count FROM jobs GROUP BY status').fetchall()
+        return {row['status']: row['count'] for row in rows}
+
+    @_blocking
+    def purge(self, older_than):
+        """Delete finished jobs older than older_than seconds; returns how many"""
+        with self._transaction() as db:
+            cursor = db.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                                (time.time() - older_than,))
+        return cursor.rowcount
+
+    @contextmanager
+    def _keep_lease(self, job_id, worker):
+        """Renew worker's lease on a job every lease_seconds / 3 while the block runs"""
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.lease_seconds / 3):
+                try:
+                    if not self.renew(job_id, worker):
+                        print(f"Lost the lease on job {job_id}")
+                        return
+                except sqlite3.Error as e:
+                    print(f"Error renewing lease on job {job_id}: {str(e)}")
+
+        threading.Thread(target=heartbeat, name=f"lease-{job_id}", daemon=True).start()
+        try:
+            yield
+        finally:
+            done.set()
+
+    def work(self, handlers, worker=None, poll_interval=1.0, stop=None, burst=False):
+        """Run jobs with handlers {kind: fn(payload) -> result} until stop is set.
+
+        With burst=True, return once nothing is runnable. Returns the number of
+        jobs processed.
+        """
+        worker = worker or f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+        stop = stop or threading.Event()
+        processed = 0
+        while not stop.is_set():
+            try:
+                job = self.claim(worker, handlers)
+            except sqlite3.Error as e:
+                print(f"Error claiming job: {str(e)}")
+                job = None
+            if job is None:
+                if burst:
+                    break
+                self.wakeup.wait(poll_interval)
+                self.wakeup.clear()
+                continue
+
+            try:
+                with self._keep_lease(job['id'], worker):
+                    result = handlers[job['kind']](job['payload'])
+            except RetryLater as e:
+                self.postpone(job['id'], worker, e.delay)
+            except Exception as e:
+                retrying = self.fail(job['id'], worker, f"{type(e).__name__}: {str(e)}")
+                print(f"Error in {job['kind']} job {job['id']} (attempt {job['attempts']}"
+                      f"{', will retry' if retrying else ', giving up'}): {str(e)}")
+            else:
+                if not self.complete(job['id'], worker, result):
+                    print(f"Dropped the result of {job['kind']} job {job['id']}: its lease had lapsed")
+            processed += 1
+        return processed
@@ -0,0 +1,151 @@
+"""Throughput benchmark for the LLM-bound routes.
+
+Compares worker classes under slow model calls without spending API quota:
+
+    # 1. A fake OpenAI-compatible model that answers after a fixed delay
+    python loadtest.py fake-model --port 9100 --delay 2.0
+
+    # 2. The app pointed at it, once per worker class. The run is one user,
+    #    so turn the AI quotas off (0 per minute) or nearly every call is a 429
+    export MODEL_ENDPOINT=http://127.0.0.1:9100 LLM_USER_PER_MINUTE=0 LLM_GLOBAL_PER_MINUTE=0
+    WORKER_CLASS=gthread gunicorn app:app
+    WORKER_CLASS=gevent gunicorn app:app
+
+    # 3. Concurrent /process_food calls as a real (test) user
+    python loadtest.py run --url http://127.0.0.1:8000 --username demo --password demo -c 200 -n 2000
+
+Supabase is still the real one, so use a throwaway account.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FOOD_REPLY = [
+    {"food": "chapati", "quantity": 2, "portion": "medium", "calories_per_item": 120,
+     "total_calories": 240, "confidence": 0.9},
+    {"food": "dal", "quantity": 1, "portion": "bowl", "calories_per_item": 180,
+     "total_calories": 180, "confidence": 0.85}
+]
+
+INSIGHTS_REPLY = {
+    "macro_balance": "Balanced", "nutrition_gaps": "Vegetables",
+    "health_score": 72, "next_meal": "Add a salad"
+}
+
+MEALS = ['2 chapati and dal', 'a bowl of rice with dal', '3 idli with sambar', 'paneer tikka and naan']
+
+
+class FakeModelHandler(BaseHTTPRequestHandler):
+    """Answers /chat/completions like the model API, after server.delay seconds"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        prompt = ' '.join(str(message.get('content', '')) for message in body.get('messages', []))
+        time.sleep(self.server.delay)
+
+        reply = INSIGHTS_REPLY if 'nutrition insights' in prompt else FOOD_REPLY
+        payload = json.dumps({
+            "id": "chatcmpl-loadtest", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get('model', 'fake'),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps(reply)}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_fake_model(args):
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), FakeModelHandler)
+    server.daemon_threads = True
+    server.delay = args.delay
+    print(f"Fake model on http://127.0.0.1:{args.port} ({args.delay}s per call)")
+    server.serve_forever()
+
+
+def login(url, username, password):
+    """Opener holding a logged-in session cookie"""
+    cookies = CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(cookies))
+    form = urllib.parse.urlencode({'username': username, 'password': password}).encode()
+    with opener.open(f"{url}/login", form, timeout=30) as response:
+        landed = urllib.parse.urlparse(response.geturl()).path
+    if landed.rstrip('/').endswith('login') or not len(cookies):
+        raise SystemExit('Login failed - check the username and password')
+    return opener
+
+
+def run_load(args):
+    opener = login(args.url, args.username, args.password)
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def call(number):
+        # reuse=False so repeated meals still exercise the model call
+        body = json.dumps({'user_input': MEALS[number % len(MEALS)], 'model': args.model, 'reuse': False}).encode()
+        request = urllib.request.Request(f"{args.url}/process_food", body, {'Content-Type': 'application/json'})
+        started = time.perf_counter()
+        try:
+            with opener.open(request, timeout=args.timeout) as response:
+                ok = json.loads(response.read()).get('success')
+            failure = None if ok else 'success=false'
+        except Exception as e:
+            failure = type(e).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            if failure:
+                errors.append(failure)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(call, range(args.requests)))
+    duration = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {duration:.1f}s")
+    print(f"  throughput  {args.requests / duration:.1f} req/s")
+    print(f"  p50         {statistics.median(latencies) * 1000:.0f} ms")
+    print(f"  p95         {latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms")
+    print(f"  errors      {len(errors)}" + (f" ({', '.join(sorted(set(errors)))})" if errors else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fake = commands.add_parser('fake-model', help='serve a slow fake model API')
+    fake.add_argument('--port', type=int, default=9100)
+    fake.add_argument('--delay', type=float, default=2.0, help='seconds per model call')
+    fake.set_defaults(handler=serve_fake_model)
+
+    run = commands.add_parser('run', help='fire concurrent /process_food requests')
+    run.add_argument('--url', default='http://127.0.0.1:8000')
+    run.add_argument('--username', required=True)
+    run.add_argument('--password', required=True)
+    run.add_argument('--model', default='mistral-ai/Ministral-3B')
+    run.add_argument('-c', '--concurrency', type=int, default=100)
+    run.add_argument('-n', '--requests', type=int, default=1000)
+    run.add_argument('--timeout', type=float, default=120)
+    run.set_defaults(handler=run_load)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
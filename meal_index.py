@@ -0,0 +1,228 @@
+"""Per-user index of past meals, so repeats skip the model call.
+
+"Same breakfast as yesterday" resolves against the day and meal time each
+entry was logged, read in the asking user's timezone; a near-identical
+re-type of an earlier meal is found by TF-IDF cosine similarity over
+food-aware tokens (so "2 rotis" and "2 chapatis" agree).
+"""
+import math
+import re
+import threading
+from datetime import datetime, timedelta
+
+from nutrition import GRAMMAR_WORDS, QUANTITY_PATTERN, quantity_from_match, food_matcher
+
+# Words that say nothing about what was eaten
+STOP_WORDS = {
+    'i', 'im', 'ive', 'had', 'have', 'has', 'ate', 'eaten', 'eat', 'just', 'my', 'me', 'the', 'for', 'with',
+    'and', 'today', 'breakfast', 'lunch', 'dinner', 'snack', 'snacks', 'meal', 'was', 'in', 'at', 'on', 'then'
+}
+
+MEAL_SLOTS = ('breakfast', 'lunch', 'snack', 'dinner')
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+REPEAT_PATTERN = re.compile(r"\b(?:same|repeat|again|usual)\b")
+SLOT_PATTERN = re.compile(r"\b(breakfast|lunch|dinner|snack)s?\b")
+DAY_PATTERN = re.compile(rf"\b(yesterday|today|last night|this morning|{'|'.join(WEEKDAYS)})\b")
+
+
+def meal_slot(moment):
+    """Meal slot for a datetime, from the time it was logged"""
+    if moment.hour < 11:
+        return 'breakfast'
+    if moment.hour < 16:
+        return 'lunch'
+    if moment.hour < 19:
+        return 'snack'
+    return 'dinner'
+
+
+def quantity_signature(text):
+    """Sorted (amount, unit) pairs in text; a bare "a"/"one" is the same as no amount"""
+    signature = []
+    for match in QUANTITY_PATTERN.finditer(text.lower()):
+        if match.group(0).strip():
+            quantity = quantity_from_match(match, 1.0)
+            if quantity['amount'] != 1.0 or quantity['unit'] or quantity['size']:
+                signature.append((quantity['amount'], quantity['unit'] or '', quantity['size'] or ''))
+    return sorted(signature)
+
+
+def _logged_at(entry):
+    """When an entry was logged, keeping its UTC offset if it has one"""
+    try:
+        return datetime.fromisoformat(str(entry.get('created_at')).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def _local(moment, tz):
+    """moment as wall-clock time in tz; a naive moment is taken to be local already"""
+    if moment.tzinfo is None or tz is None:
+        return moment.replace(tzinfo=None)
+    return moment.astimezone(tz).replace(tzinfo=None)
+
+
+class MealIndex:
+    """TF-IDF vectors and log times for one user's recent entries, newest first"""
+
+    def __init__(self, entries, limit=None):
+        self.limit = limit
+        # add() runs on the request that saved an entry while others search
+        self.lock = threading.RLock()
+        self.entries = []
+        self.logged = []
+        self.signatures = []
+        self.term_counts = []
+        self.document_frequency = {}
+        for entry in entries:
+            self._append(entry)
+        self._build_vectors()
+
+    def _append(self, entry, newest=False):
+        if not entry.get('detailed_breakdown'):
+            return False
+        position = 0 if newest else len(self.entries)
+        counts = self._term_counts(entry.get('user_input') or '')
+        self.entries.insert(position, entry)
+        self.logged.insert(position, _logged_at(entry))
+        self.signatures.insert(position, quantity_signature(entry.get('user_input') or ''))
+        self.term_counts.insert(position, counts)
+        for term in counts:
+            self.document_frequency[term] = self.document_frequency.get(term, 0) + 1
+        return True
+
+    def _drop_oldest(self):
+        for term in self.term_counts.pop():
+            self.document_frequency[term] -= 1
+            if not self.document_frequency[term]:
+                del self.document_frequency[term]
+        for column in (self.entries, self.logged, self.signatures):
+            column.pop()
+
+    def add(self, entry):
+        """Take in a newly saved entry without refetching or re-tokenizing the others"""
+        with self.lock:
+            # Already here if the index was fetched after the entry was saved
+            if entry.get('id') is not None and any(known.get('id') == entry['id'] for known in self.entries):
+                return
+            if not self._append(entry, newest=True):
+                return
+            while self.limit and len(self.entries) > self.limit:
+                self._drop_oldest()
+            # Every weight moves with the idf; rebuilt on the next similarity search
+            self.vectors = None
+
+    def _build_vectors(self):
+        # Smoothed idf so a term every entry shares still counts a little
+        total = len(self.entries)
+        self.idf = {term: math.log((1 + total) / (1 + count)) + 1 for term, count in self.document_frequency.items()}
+        # A word this user has never logged is as telling as the rarest one
+        self.unseen_idf = math.log(1 + total) + 1
+        self.vectors = [self._vector(counts) for counts in self.term_counts]
+        self.postings = {}
+        for position, vector in enumerate(self.vectors):
+            for term in vector:
+                self.postings.setdefault(term, []).append(position)
+
+    @staticmethod
+    def _term_counts(text):
+        """Food-name terms with aliases folded ("roti" -> "chapati"); amounts live in the signature"""
+        counts = {}
+        canonical = food_matcher.index.canonical
+        for token, _, _ in food_matcher.tokenize(text):
+            if token in STOP_WORDS or token in GRAMMAR_WORDS or token[0].isdigit():
+                continue
+            term = canonical.get(token, token)
+            counts[term] = counts.get(term, 0) + 1
+        return counts
+
+    def _vector(self, counts):
+        vector = {term: count * self.idf.get(term, self.unseen_idf) for term, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def most_similar(self, text):
+        """(entry, cosine similarity) of the closest past entry with the same amounts, or None"""
+        counts = self._term_counts(text)
+        if not counts:
+            return None
+        signature = quantity_signature(text)
+        with self.lock:
+            if self.vectors is None:
+                self._build_vectors()
+            vector = self._vector(counts)
+            scores = {}
+            for term, weight in vector.items():
+                for position in self.postings.get(term, ()):
+                    scores[position] = scores.get(position, 0.0) + weight * self.vectors[position][term]
+
+            # "2 rotis" must never reuse a "3 rotis" breakdown, however similar the words
+            for position, score in sorted(scores.items(), key=lambda item: -item[1]):
+                if self.signatures[position] == signature:
+                    return self.entries[position], round(score, 3)
+        return None
+
+    def resolve_reference(self, text, now=None):
+        """Entry meant by "same breakfast as yesterday", "same as monday" or "usual lunch", or None.
+
+        now is when the user asked, in their timezone; entries are bucketed into days and
+        meal slots in that same timezone.
+        """
+        text = text.lower()
+        if not REPEAT_PATTERN.search(text):
+            return None
+        now = now or datetime.now().astimezone()
+        tz = now.tzinfo
+        now = now.replace(tzinfo=None)
+        today = now.date()
+
+        slot_match = SLOT_PATTERN.search(text)
+        slot = slot_match.group(1) if slot_match else None
+        day_match = DAY_PATTERN.search(text)
+        day = None
+        if day_match:
+            word = day_match.group(1)
+            if word == 'yesterday':
+                day = today - timedelta(days=1)
+            elif word == 'last night':
+                day, slot = today - timedelta(days=1), slot or 'dinner'
+            elif word == 'this morning':
+                day, slot = today, slot or 'breakfast'
+            elif word == 'today':
+                day = today
+            else:
+                # Most recent past weekday of that name
+                day = today - timedelta(days=(today.weekday() - WEEKDAYS.index(word) - 1) % 7 + 1)
+
+        # "Same as yesterday" with no meal named means the meal logged at this time of day
+        slot = slot or meal_slot(now)
+        with self.lock:
+            for entry, logged_at in zip(self.entries, self.logged):
+                if not logged_at:
+                    continue
+                logged_at = _local(logged_at, tz)
+                if meal_slot(logged_at) != slot:
+                    continue
+                if day and logged_at.date() != day:
+                    continue
+                if not day and logged_at.date() == today and not slot_match:
+                    continue
+                return entry
+        return None
+
+    def find(self, text, min_similarity, now=None):
+        """(entry, similarity, reason) for an entry to reuse instead of calling a model, or None.
+
+        Entries must be ordered newest first, so references pick the latest match.
+        """
+        if REPEAT_PATTERN.search(text.lower()):
+            # A repeat that also names foods ("same as yesterday plus a banana") needs the model
+            if not food_matcher.find(text):
+                entry = self.resolve_reference(text, now)
+                return (entry, 1.0, 'reference') if entry else None
+            return None
+        match = self.most_similar(text)
+        if match and match[1] >= min_similarity:
+            return match[0], match[1], 'similar'
+        return None
@@ -0,0 +1,537 @@
+"""Local food knowledge for the AI Calorie Tracker: the built-in nutrition
+table and the matcher that finds foods in free text without a model call."""
+import re
+from collections import Counter
+from functools import lru_cache
+
+# Per-item macros for foods the coach recognises in chat
+COMMON_FOODS = {
+    'samosa': {'protein': 3, 'carbs': 15, 'fats': 8, 'calories': 150},
+    'idli': {'protein': 2, 'carbs': 15, 'fats': 0.5, 'calories': 70},
+    'sambar': {'protein': 3, 'carbs': 10, 'fats': 1, 'calories': 60},
+    'rice': {'protein': 2, 'carbs': 45, 'fats': 0.5, 'calories': 200},
+    'chapati': {'protein': 3, 'carbs': 15, 'fats': 1, 'calories': 100},
+    'dal': {'protein': 6, 'carbs': 20, 'fats': 1, 'calories': 120},
+    'bread': {'protein': 3, 'carbs': 15, 'fats': 1, 'calories': 80},
+    'pasta': {'protein': 5, 'carbs': 30, 'fats': 1, 'calories': 150},
+    'pizza': {'protein': 10, 'carbs': 30, 'fats': 12, 'calories': 300},
+    'burger': {'protein': 15, 'carbs': 30, 'fats': 20, 'calories': 350},
+    'salad': {'protein': 2, 'carbs': 5, 'fats': 0.5, 'calories': 30},
+    'paneer': {'protein': 18, 'carbs': 2, 'fats': 20, 'calories': 265},
+    'curd': {'protein': 3, 'carbs': 4, 'fats': 2, 'calories': 60},
+    'milk': {'protein': 8, 'carbs': 12, 'fats': 8, 'calories': 150},
+    'banana': {'protein': 1, 'carbs': 27, 'fats': 0.3, 'calories': 105},
+    'apple': {'protein': 0.5, 'carbs': 25, 'fats': 0.3, 'calories': 95},
+    'orange': {'protein': 1, 'carbs': 12, 'fats': 0.1, 'calories': 47},
+    'mango': {'protein': 1, 'carbs': 15, 'fats': 0.4, 'calories': 60},
+    'chicken': {'protein': 31, 'carbs': 0, 'fats': 3.6, 'calories': 165},
+    'fish': {'protein': 22, 'carbs': 0, 'fats': 3.5, 'calories': 120},
+    'egg': {'protein': 6, 'carbs': 0.6, 'fats': 5, 'calories': 68},
+    'boiled egg': {'protein': 6, 'carbs': 0.6, 'fats': 5, 'calories': 68},
+    'dosa': {'protein': 3, 'carbs': 20, 'fats': 2, 'calories': 133},
+    'upma': {'protein': 4, 'carbs': 25, 'fats': 3, 'calories': 150},
+    'poha': {'protein': 3, 'carbs': 22, 'fats': 2, 'calories': 120},
+    'paratha': {'protein': 5, 'carbs': 30, 'fats': 8, 'calories': 200},
+    'biryani': {'protein': 15, 'carbs': 45, 'fats': 12, 'calories': 350},
+    'noodles': {'protein': 4, 'carbs': 35, 'fats': 2, 'calories': 180},
+    'sandwich': {'protein': 8, 'carbs': 25, 'fats': 5, 'calories': 180},
+    'soup': {'protein': 2, 'carbs': 8, 'fats': 1, 'calories': 50},
+    'juice': {'protein': 0, 'carbs': 25, 'fats': 0, 'calories': 100},
+    'coffee': {'protein': 0, 'carbs': 0, 'fats': 0, 'calories': 2},
+    'tea': {'protein': 0, 'carbs': 0, 'fats': 0, 'calories': 7},
+    'water': {'protein': 0, 'carbs': 0, 'fats': 0, 'calories': 0}
+}
+
+# Category and grams of the single serving each COMMON_FOODS row describes
+FOOD_SERVINGS = {
+    'samosa': ('snack', 60), 'idli': ('snack', 40), 'sambar': ('curry', 150),
+    'rice': ('grain', 150), 'chapati': ('bread', 40), 'dal': ('curry', 150),
+    'bread': ('bread', 30), 'pasta': ('grain', 100), 'pizza': ('bread', 110),
+    'burger': ('bread', 200), 'salad': ('salad', 100), 'paneer': ('dairy', 100),
+    'curd': ('dairy', 100), 'milk': ('beverage', 240), 'banana': ('fruit', 118),
+    'apple': ('fruit', 180), 'orange': ('fruit', 130), 'mango': ('fruit', 100),
+    'chicken': ('protein', 100), 'fish': ('protein', 100), 'egg': ('egg', 50),
+    'boiled egg': ('egg', 50), 'dosa': ('bread', 80), 'upma': ('grain', 150),
+    'poha': ('grain', 120), 'paratha': ('bread', 80), 'biryani': ('grain', 250),
+    'noodles': ('grain', 150), 'sandwich': ('bread', 120), 'soup': ('beverage', 240),
+    'juice': ('beverage', 240), 'coffee': ('beverage', 240), 'tea': ('beverage', 240),
+    'water': ('beverage', 250)
+}
+
+# Grams (or ml) in one household measure, by food category. 'default' keeps
+# the old flat multipliers for foods we don't know, at a 150g serving.
+DEFAULT_SERVING_GRAMS = 150
+CATEGORY_PORTION_GRAMS = {
+    'grain': {'serving': 150, 'portion': 150, 'cup': 160, 'bowl': 200, 'plate': 300, 'handful': 40, 'scoop': 100, 'tbsp': 12, 'tsp': 4},
+    'curry': {'serving': 150, 'portion': 150, 'cup': 240, 'bowl': 180, 'plate': 300, 'glass': 250, 'scoop': 100, 'tbsp': 15, 'tsp': 5},
+    'beverage': {'cup': 240, 'glass': 250, 'bowl': 300, 'scoop': 30, 'tbsp': 15, 'tsp': 5},
+    'bread': {'plate': 200, 'handful': 30},
+    'snack': {'plate': 150, 'bowl': 120, 'handful': 30},
+    'fruit': {'slice': 30, 'cup': 150, 'bowl': 200, 'plate': 250, 'handful': 80},
+    'dairy': {'piece': 30, 'slice': 30, 'cup': 245, 'bowl': 200, 'glass': 250, 'tbsp': 15, 'tsp': 5},
+    'protein': {'piece': 60, 'slice': 30, 'bowl': 200, 'plate': 250},
+    'egg': {'plate': 100},
+    'salad': {'cup': 75, 'bowl': 150, 'plate': 200},
+    'default': {'bowl': 225, 'plate': 300, 'cup': 150, 'glass': 150, 'piece': 150, 'slice': 150,
+                'serving': 150, 'portion': 150, 'handful': 75, 'scoop': 150, 'tbsp': 15, 'tsp': 5}
+}
+
+# Units that mean "one of the food's own servings" when a category doesn't size them
+ITEM_UNITS = {None, 'piece', 'slice', 'serving', 'portion'}
+
+# Flattened once at import so lookups are a single dict hit
+PORTION_TABLE = {(category, unit): grams for category, units in CATEGORY_PORTION_GRAMS.items() for unit, grams in units.items()}
+NUTRIENTS_PER_100G = {
+    food: {key: value * 100 / FOOD_SERVINGS[food][1] for key, value in macros.items()}
+    for food, macros in COMMON_FOODS.items()
+}
+
+# Hindi/regional names and common spellings mapped onto COMMON_FOODS keys
+FOOD_ALIASES = {
+    'roti': 'chapati', 'phulka': 'chapati', 'chapathi': 'chapati', 'chappati': 'chapati',
+    'chawal': 'rice', 'bhaat': 'rice', 'bhat': 'rice', 'annam': 'rice',
+    'dhal': 'dal', 'daal': 'dal', 'dahl': 'dal',
+    'dahi': 'curd', 'yogurt': 'curd', 'yoghurt': 'curd', 'thayir': 'curd',
+    'dosai': 'dosa', 'iddli': 'idli', 'idly': 'idli', 'sambhar': 'sambar',
+    'parantha': 'paratha', 'parotta': 'paratha', 'pav': 'bread',
+    'paneer tikka': 'paneer', 'chhena': 'paneer',
+    'murgh': 'chicken', 'kozhi': 'chicken', 'machli': 'fish', 'meen': 'fish',
+    'anda': 'egg', 'ande': 'egg', 'ubla anda': 'boiled egg',
+    'doodh': 'milk', 'chai': 'tea', 'chaay': 'tea', 'kaapi': 'coffee', 'paani': 'water',
+    'kela': 'banana', 'seb': 'apple', 'aam': 'mango', 'santra': 'orange',
+    'biriyani': 'biryani', 'briyani': 'biryani', 'shorba': 'soup', 'samosas': 'samosa'
+}
+
+# Aliases that are also everyday English words ("sitting idly"). In
+# conversational text they only count as food right after a quantity ("3 idly").
+ENGLISH_ALIASES = {'idly'}
+
+# Amount words the quantity grammar understands, longest phrases win
+AMOUNT_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10, 'eleven': 11, 'twelve': 12,
+    'couple': 2, 'a couple': 2, 'a couple of': 2, 'few': 3, 'a few': 3, 'dozen': 12, 'a dozen': 12,
+    'half': 0.5, 'a half': 0.5, 'quarter': 0.25, 'a quarter': 0.25,
+    'bit': 0.5, 'a bit': 0.5, 'a bit of': 0.5, 'little': 0.5, 'a little': 0.5
+}
+
+# Surface forms of every unit, keyed by the canonical unit name
+UNIT_ALIASES = {
+    'g': ('g', 'gm', 'gms', 'gram', 'grams', 'gramme', 'grammes'),
+    'kg': ('kg', 'kgs', 'kilo', 'kilos', 'kilogram', 'kilograms'),
+    'oz': ('oz', 'ounce', 'ounces'),
+    'lb': ('lb', 'lbs', 'pound', 'pounds'),
+    'ml': ('ml', 'millilitre', 'millilitres', 'milliliter', 'milliliters'),
+    'l': ('l', 'litre', 'litres', 'liter', 'liters', 'ltr'),
+    'tbsp': ('tbsp', 'tbs', 'tablespoon', 'tablespoons'),
+    'tsp': ('tsp', 'teaspoon', 'teaspoons'),
+    'cup': ('cup', 'cups'),
+    'glass': ('glass', 'glasses'),
+    'bowl': ('bowl', 'bowls', 'katori', 'katoris'),
+    'plate': ('plate', 'plates'),
+    'piece': ('piece', 'pieces', 'pc', 'pcs'),
+    'slice': ('slice', 'slices'),
+    'serving': ('serving', 'servings'),
+    'portion': ('portion', 'portions'),
+    'handful': ('handful', 'handfuls'),
+    'scoop': ('scoop', 'scoops')
+}
+UNIT_LOOKUP = {alias: unit for unit, aliases in UNIT_ALIASES.items() for alias in aliases}
+
+# Metric units converted to grams / millilitres
+MASS_UNITS = {'g': 1.0, 'kg': 1000.0, 'oz': 28.35, 'lb': 453.6}
+VOLUME_UNITS = {'ml': 1.0, 'l': 1000.0}
+
+SIZE_WORDS = {'small': 0.7, 'medium': 1.0, 'regular': 1.0, 'large': 1.3, 'big': 1.3, 'full': 1.0}
+
+# Words allowed between a quantity/container and the food ("2 bowls of rice")
+FILLER_WORDS = {'of', 'some'}
+
+
+def _alternation(words):
+    return '|'.join(re.escape(word).replace('\\ ', r'\s+') for word in sorted(words, key=len, reverse=True))
+
+
+# A number is a whole run of digits ("250kcal" is 250, never 25), optionally
+# with thousands separators ("1,200")
+_NUMBER = r"(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d+)?(?!\d|,\d)|\.\d+(?!\d)"
+_WORD = _alternation(AMOUNT_WORDS)
+_AMOUNT = rf"""
+    (?P<mixed_whole>\d+)\s+(?P<mixed_num>\d+)\s*/\s*(?P<mixed_den>\d+)
+  | (?P<frac_num>{_NUMBER})\s*/\s*(?P<frac_den>{_NUMBER})
+  | (?P<range_low>{_NUMBER})\s*(?:-|\u2013|to|or)\s*(?P<range_high>{_NUMBER})
+  | (?P<number>{_NUMBER})
+  | (?P<word>{_WORD})(?![a-z])
+"""
+# Words must end where a word ends ("2 grapes" has no unit g); digits may be
+# followed by anything ("100cal")
+_QUANTITY = rf"""
+    (?<![\w.])(?<!\d,)
+    (?:(?:{_AMOUNT})(?:\s+and\s+(?:a\s+)?(?P<plus>half|quarter)(?![a-z]))?)?
+    (?:\s*(?P<size>{_alternation(SIZE_WORDS)})(?![a-z]))?
+    (?:\s*(?P<unit>{_alternation(UNIT_LOOKUP)})(?![a-z]))?
+"""
+
+# Compiled once: quantity anywhere in a string, and the quantity right before a food name
+QUANTITY_PATTERN = re.compile(_QUANTITY, re.X)
+TRAILING_QUANTITY_PATTERN = re.compile(_QUANTITY + rf"(?:\s+(?:{_alternation(FILLER_WORDS)}))*\s*$", re.X)
+
+
+def _number(text):
+    return float(text.replace(',', ''))
+
+
+def quantity_from_match(match, default):
+    """parse_quantity's result dict for a QUANTITY_PATTERN match"""
+    groups = match.groupdict()
+    if groups['mixed_whole']:
+        amount = int(groups['mixed_whole']) + int(groups['mixed_num']) / (int(groups['mixed_den']) or 1)
+    elif groups['frac_num']:
+        denominator = _number(groups['frac_den'])
+        amount = _number(groups['frac_num']) / denominator if denominator else default
+    elif groups['range_low']:
+        # "2-3 rotis" is logged as the midpoint
+        amount = (_number(groups['range_low']) + _number(groups['range_high'])) / 2
+    elif groups['number']:
+        amount = _number(groups['number'])
+    elif groups['word']:
+        amount = float(AMOUNT_WORDS[' '.join(groups['word'].split())])
+    else:
+        amount = default
+    if groups['plus']:
+        amount += AMOUNT_WORDS[groups['plus']]
+    unit = UNIT_LOOKUP.get(groups['unit']) if groups['unit'] else None
+    return {
+        'amount': amount,
+        'unit': unit,
+        'size': groups['size'],
+        'grams': amount * MASS_UNITS[unit] if unit in MASS_UNITS else None,
+        'ml': amount * VOLUME_UNITS[unit] if unit in VOLUME_UNITS else None
+    }
+
+
+def parse_quantity(text, default=1.0):
+    """First quantity in text ("1 1/2 cups", "200g", "2-3", "a couple of")
+    as a dict with amount, unit, size, grams and ml"""
+    if isinstance(text, (int, float)):
+        return {'amount': float(text), 'unit': None, 'size': None, 'grams': None, 'ml': None}
+    text = str(text or '').lower()
+    for match in QUANTITY_PATTERN.finditer(text):
+        if match.group(0).strip():
+            return quantity_from_match(match, default)
+    return {'amount': default, 'unit': None, 'size': None, 'grams': None, 'ml': None}
+
+
+def parse_trailing_quantity(text, default=1.0):
+    """Quantity that ends text, e.g. the "2 large bowls of" in "2 large bowls of rice"""
+    match = TRAILING_QUANTITY_PATTERN.search(str(text or '').lower())
+    if match and match.group(0).strip():
+        return quantity_from_match(match, default)
+    return {'amount': default, 'unit': None, 'size': None, 'grams': None, 'ml': None}
+
+
+# Tokens the fuzzy food lookup must leave alone
+GRAMMAR_WORDS = {word for phrase in AMOUNT_WORDS for word in phrase.split()} | set(UNIT_LOOKUP) | set(SIZE_WORDS) | FILLER_WORDS | {'and', 'or', 'to'}
+
+TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)?|[a-z]+")
+
+# Trigram (Dice) similarity a fuzzy match must reach to count as a food
+FUZZY_MIN_SCORE = 0.65
+
+# In free text a word is only read as a misspelled food when it is this long
+# and one edit away. Shorter words and derived forms ("milky", "watery",
+# "riced") are ordinary English far more often than they are typos.
+TYPO_MIN_LENGTH = 6
+TYPO_MAX_EDITS = 1
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between a and b, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous_previous, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def is_typo(word, name):
+    """True when word reads as a misspelling of the food name rather than another word"""
+    if len(word) < TYPO_MIN_LENGTH or ' ' in name:
+        return False
+    if word.startswith(name) or name.startswith(word):
+        return False
+    return edit_distance(word, name, TYPO_MAX_EDITS) <= TYPO_MAX_EDITS
+
+
+def trigrams(text):
+    """Character trigrams of a name, padded so short words still get some"""
+    padded = f"  {' '.join(text.lower().split())} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class FoodIndex:
+    """Trigram index over food names and aliases for typo-tolerant lookups.
+
+    Exact names and aliases resolve with score 1.0; anything else is scored
+    by Dice similarity of trigram sets against the names sharing at least
+    one trigram, so "chapathi", "bananna" or "biriyani" resolve locally
+    instead of falling through to a model call.
+    """
+
+    def __init__(self, foods, aliases=FOOD_ALIASES):
+        self.canonical = {name: name for name in foods}
+        self.canonical.update({alias: food for alias, food in aliases.items() if food in self.canonical})
+        self.names = list(self.canonical)
+        self.name_grams = [set(trigrams(name)) for name in self.names]
+        self.postings = {}
+        for position, grams in enumerate(self.name_grams):
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(position)
+        self.lookup = lru_cache(maxsize=4096)(self._lookup)
+
+    def _lookup(self, text, min_score=FUZZY_MIN_SCORE):
+        """(food, score, matched name) for the closest name, or None below min_score"""
+        name = ' '.join(text.lower().split())
+        if name in self.canonical:
+            return self.canonical[name], 1.0, name
+        grams = set(trigrams(name))
+        shared = Counter(position for gram in grams for position in self.postings.get(gram, ()))
+        best = None
+        for position, overlap in shared.items():
+            score = 2.0 * overlap / (len(grams) + len(self.name_grams[position]))
+            if score >= min_score and (best is None or score > best[1]):
+                best = (self.canonical[self.names[position]], round(score, 3), self.names[position])
+        return best
+
+
+class TokenAutomaton:
+    """Aho-Corasick automaton over word tokens.
+
+    Patterns are token sequences, so matches always fall on word boundaries
+    ("tea" never matches inside "steak") and multi-word names like
+    "boiled egg" are found in the same single pass as one-word ones.
+    """
+
+    def __init__(self, patterns):
+        # State 0 is the root; goto[state] maps token -> next state
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]  # (pattern length in tokens, value) ending at this state
+        self.vocabulary = set()
+        for tokens, value in patterns:
+            self._add(tokens, value)
+        self._build_failure_links()
+
+    def _add(self, tokens, value):
+        state = 0
+        for token in tokens:
+            self.vocabulary.add(token)
+            next_state = self.goto[state].get(token)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+                self.goto[state][token] = next_state
+            state = next_state
+        self.outputs[state].append((len(tokens), value))
+
+    def _build_failure_links(self):
+        frontier = list(self.goto[0].values())
+        while frontier:
+            next_frontier = []
+            for state in frontier:
+                for token, child in self.goto[state].items():
+                    fallback = self.fail[state]
+                    while fallback and token not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    self.fail[child] = self.goto[fallback].get(token, 0)
+                    self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+                    next_frontier.append(child)
+            frontier = next_frontier
+
+    def iter_matches(self, tokens):
+        """Yield (start, end, value) for every pattern occurrence in tokens"""
+        state = 0
+        for index, token in enumerate(tokens):
+            while state and token not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(token, 0)
+            for length, value in self.outputs[state]:
+                yield index - length + 1, index + 1, value
+
+
+class FoodMatcher:
+    """Finds foods in a message together with the quantity and container before them"""
+
+    def __init__(self, foods, aliases=FOOD_ALIASES):
+        self.index = FoodIndex(foods, aliases)
+        self.automaton = TokenAutomaton((name.split(), food) for name, food in self.index.canonical.items())
+
+    def tokenize(self, text, fuzzy=True):
+        """(token, start, end) for lower-case words and numbers, with plurals (and,
+        if fuzzy, clear misspellings) folded onto known words"""
+        tokens = []
+        known = self.automaton.vocabulary
+        for match in TOKEN_PATTERN.finditer(text.lower()):
+            token = match.group(0)
+            if token not in known and token not in GRAMMAR_WORDS and len(token) > 3:
+                tokens.extend((folded, match.start(), match.end()) for folded in self._fold_unknown(token, fuzzy))
+            else:
+                tokens.append((token, match.start(), match.end()))
+        return tokens
+
+    def _fold_unknown(self, token, fuzzy):
+        if token.endswith('s'):
+            for singular in (token[:-3] + 'y' if token.endswith('ies') else None, token[:-2], token[:-1]):
+                if singular and singular in self.automaton.vocabulary:
+                    return [singular]
+        match = self.index.lookup(token) if fuzzy else None
+        return [match[2]] if match and is_typo(token, match[2]) else [token]
+
+    def find(self, text, fuzzy=True):
+        """Every food in text as dicts with quantity, container and multiplier.
+
+        Pass fuzzy=False for conversational text, where only exact names,
+        aliases and plurals should count as foods, and ENGLISH_ALIASES only
+        after a quantity.
+        """
+        tokens = self.tokenize(text, fuzzy)
+
+        # Keep the leftmost-longest match so "boiled egg" wins over "egg"
+        candidates = sorted(self.automaton.iter_matches([token for token, _, _ in tokens]), key=lambda m: (m[0], m[0] - m[1]))
+        matches = []
+        covered_until = 0
+        for start, end, food in candidates:
+            if start >= covered_until:
+                matches.append((start, end, food))
+                covered_until = end
+
+        results = []
+        previous_end = 0
+        for start, end, food in matches:
+            # The shared quantity grammar reads whatever ends the text since the previous food
+            before = text[previous_end:tokens[start][1]]
+            name = ' '.join(token for token, _, _ in tokens[start:end])
+            if not fuzzy and name in ENGLISH_ALIASES and not parse_trailing_quantity(before, default=0.0)['amount']:
+                continue
+            quantity = parse_trailing_quantity(before)
+            grams = quantity_grams(food, quantity)
+            servings = grams / serving_grams(food)
+            results.append({
+                'food': food,
+                'quantity': quantity['amount'],
+                'unit': quantity['unit'],
+                'container': quantity['unit'] or quantity['size'],
+                'grams': grams,
+                'container_multiplier': servings / quantity['amount'] if quantity['amount'] else 1.0,
+                'total_multiplier': servings
+            })
+            previous_end = tokens[end - 1][2]
+        return results
+
+
+food_matcher = FoodMatcher(COMMON_FOODS)
+
+
+@lru_cache(maxsize=4096)
+def resolve_food(name):
+    """COMMON_FOODS key for a free-text food name ("Basmati Rice" -> "rice"), or None"""
+    matches = food_matcher.find(str(name or ''))
+    return matches[0]['food'] if matches else None
+
+
+def serving_grams(food):
+    """Grams in one serving of a known food, DEFAULT_SERVING_GRAMS otherwise"""
+    return FOOD_SERVINGS[food][1] if food in FOOD_SERVINGS else DEFAULT_SERVING_GRAMS
+
+
+def unit_grams(food, unit):
+    """Grams in one household unit of a food, by its category"""
+    category = FOOD_SERVINGS[food][0] if food in FOOD_SERVINGS else 'default'
+    grams = PORTION_TABLE.get((category, unit))
+    if grams is None:
+        grams = serving_grams(food) if unit in ITEM_UNITS else PORTION_TABLE.get(('default', unit), DEFAULT_SERVING_GRAMS)
+    return grams
+
+
+def quantity_grams(food, quantity):
+    """Grams described by a parse_quantity result for a food"""
+    if quantity['grams'] or quantity['ml']:
+        # Treat ml as grams; close enough for drinks, dals and soups
+        return quantity['grams'] or quantity['ml']
+    return quantity['amount'] * unit_grams(food, quantity['unit']) * SIZE_WORDS.get(quantity['size'], 1.0)
+
+
+def portion_servings(food, portion):
+    """Servings in one item of a portion description such as "large bowl" or "half plate".
+
+    A whole-number count in the description ("3 pieces") is dropped, since the
+    entry's quantity already carries it; fractions ("half plate") size the portion.
+    """
+    if not portion:
+        return 1.0
+    parsed = parse_quantity(portion)
+    if parsed['amount'] >= 1 and float(parsed['amount']).is_integer():
+        parsed = dict(parsed, amount=1.0)
+    return quantity_grams(food, parsed) / serving_grams(food)
+
+
+def measure_portion(food_name, quantity, portion=None):
+    """Quantity, portion, serving multipliers and grams for a model-reported entry"""
+    food = resolve_food(food_name)
+    parsed = parse_quantity(quantity)
+    if parsed['grams'] or parsed['ml']:
+        # calories_per_item already covers a weighed amount like "200g"
+        return {
+            'quantity': 1.0,
+            'portion': portion or f"{parsed['amount']:g}{parsed['unit']}",
+            'container_multiplier': 1.0,
+            'total_multiplier': 1.0,
+            'grams': quantity_grams(food, parsed)
+        }
+    weighed = parse_quantity(portion) if portion else None
+    if weighed and (weighed['grams'] or weighed['ml']):
+        # Likewise for each item of a weighed portion ("2" x "200g")
+        return {
+            'quantity': parsed['amount'],
+            'portion': portion,
+            'container_multiplier': 1.0,
+            'total_multiplier': parsed['amount'],
+            'grams': parsed['amount'] * quantity_grams(food, weighed)
+        }
+    portion = portion or parsed['unit']
+    servings = portion_servings(food, portion)
+    return {
+        'quantity': parsed['amount'],
+        'portion': portion or 'standard',
+        'container_multiplier': servings,
+        'total_multiplier': parsed['amount'] * servings,
+        'grams': parsed['amount'] * servings * serving_grams(food)
+    }
+
+
+if __name__ == '__main__':
+    # Throughput benchmark: python nutrition.py
+    import timeit
+
+    samples = ['1.5', '1/2', '1 1/2 cups', '2-3', 'a couple of', '200g', '250 ml',
+               'one and a half', 'large bowl', 'a bit', 'half plate', '3 pieces']
+    messages = ['I had 2 large bowls of rice and a boiled egg',
+                'half plate biryani, 2-3 rotis and a cup of chai',
+                'just some coffee']
+    for label, fn, inputs in (('parse_quantity', parse_quantity, samples),
+                              ('food_matcher.find', food_matcher.find, messages)):
+        runs = 20000 // len(inputs)
+        seconds = timeit.timeit(lambda: [fn(value) for value in inputs], number=runs)
+        calls = runs * len(inputs)
+        print(f"{label}: {calls / seconds:,.0f} calls/s ({seconds / calls * 1e6:.1f} us/call)")
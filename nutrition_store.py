@@ -0,0 +1,168 @@
+"""Compact, memory-mapped nutrition database.
+
+A full nutrition dataset (hundreds of thousands of foods x dozens of
+nutrients) would cost hundreds of MB per worker as Python dicts. Instead it
+is written once to a columnar file and every worker mmaps it read-only, so
+opening is near-instant and the OS shares the pages between processes.
+
+File layout (little-endian, every section 4-byte aligned):
+
+    header        magic, version, food count, nutrient count, section offsets
+    string ids    uint32 offsets into the string table (nutrients, then foods, then end)
+    strings       UTF-8 nutrient names followed by lower-cased food names
+    name index    uint32 food ids sorted by name, for binary search
+    matrix        float32 values per 100g, one contiguous column per nutrient
+"""
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+MAGIC = b'NUTR'
+VERSION = 1
+HEADER = struct.Struct('<4sIIIIIII')
+
+
+def _align(offset):
+    return (offset + 3) & ~3
+
+
+def normalize_name(name):
+    return ' '.join(str(name).lower().split())
+
+
+def write_nutrition_store(path, nutrient_names, foods):
+    """Write foods, an iterable of (name, {nutrient: value per 100g}), to path.
+
+    The file is written next to the target and swapped in with os.replace, so
+    workers that still map the old file keep reading valid pages.
+    """
+    nutrient_names = list(nutrient_names)
+    names = []
+    columns = [[] for _ in nutrient_names]
+    for name, values in foods:
+        names.append(normalize_name(name))
+        for column, nutrient in zip(columns, nutrient_names):
+            value = values.get(nutrient)
+            column.append(float(value) if value not in (None, '') else float('nan'))
+
+    encoded = [name.encode('utf-8') for name in nutrient_names + names]
+    string_ids = [0]
+    for value in encoded:
+        string_ids.append(string_ids[-1] + len(value))
+    name_index = sorted(range(len(names)), key=lambda food_id: encoded[len(nutrient_names) + food_id])
+
+    string_ids_pos = HEADER.size
+    strings_pos = _align(string_ids_pos + 4 * len(string_ids))
+    index_pos = _align(strings_pos + string_ids[-1])
+    matrix_pos = _align(index_pos + 4 * len(names))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(names), len(nutrient_names),
+                                string_ids_pos, strings_pos, index_pos, matrix_pos))
+            f.write(struct.pack(f'<{len(string_ids)}I', *string_ids))
+            f.write(b'\0' * (strings_pos - f.tell()))
+            f.write(b''.join(encoded))
+            f.write(b'\0' * (index_pos - f.tell()))
+            f.write(struct.pack(f'<{len(name_index)}I', *name_index))
+            f.write(b'\0' * (matrix_pos - f.tell()))
+            for column in columns:
+                f.write(struct.pack(f'<{len(column)}f', *column))
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+    return len(names)
+
+
+class NutritionStore:
+    """Read-only view over a file written by write_nutrition_store"""
+
+    def __init__(self, path):
+        if sys.byteorder != 'little':
+            raise RuntimeError('NutritionStore needs a little-endian host')
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.food_count, self.nutrient_count,
+         string_ids_pos, strings_pos, index_pos, matrix_pos) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} nutrition store")
+
+        # Zero-copy views straight onto the mapped pages
+        view = memoryview(self._mmap)
+        string_count = self.nutrient_count + self.food_count
+        self._string_ids = view[string_ids_pos:string_ids_pos + 4 * (string_count + 1)].cast('I')
+        self._strings = view[strings_pos:strings_pos + self._string_ids[string_count]]
+        self._name_index = view[index_pos:index_pos + 4 * self.food_count].cast('I')
+        self._matrix = view[matrix_pos:matrix_pos + 4 * self.food_count * self.nutrient_count].cast('f')
+        self._matrix_pos = matrix_pos
+        self.nutrient_names = [self._string(i) for i in range(self.nutrient_count)]
+        self._nutrient_ids = {name: i for i, name in enumerate(self.nutrient_names)}
+
+    @classmethod
+    def open(cls, path):
+        """The store at path, or None when no database has been built"""
+        if not path or not os.path.exists(path):
+            return None
+        return cls(path)
+
+    def __len__(self):
+        return self.food_count
+
+    def _string_bytes(self, string_id):
+        return self._strings[self._string_ids[string_id]:self._string_ids[string_id + 1]]
+
+    def _string(self, string_id):
+        return bytes(self._string_bytes(string_id)).decode('utf-8')
+
+    def name(self, food_id):
+        return self._string(self.nutrient_count + food_id)
+
+    def find(self, name):
+        """Food id for an exact (case/space-insensitive) name, or None"""
+        target = normalize_name(name).encode('utf-8')
+        low, high = 0, self.food_count
+        while low < high:
+            middle = (low + high) // 2
+            if bytes(self._string_bytes(self.nutrient_count + self._name_index[middle])) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.food_count:
+            food_id = self._name_index[low]
+            if bytes(self._string_bytes(self.nutrient_count + food_id)) == target:
+                return food_id
+        return None
+
+    def column(self, nutrient):
+        """Every food's value for one nutrient, as a float32 memoryview"""
+        start = self._nutrient_ids[nutrient] * self.food_count
+        return self._matrix[start:start + self.food_count]
+
+    def matrix(self):
+        """Every value as one float32 memoryview, nutrient columns back to back (nutrients x foods)"""
+        return self._matrix
+
+    def column_offset(self, nutrient):
+        """Byte offset of a nutrient column in the file, for numpy.frombuffer"""
+        return self._matrix_pos + 4 * self._nutrient_ids[nutrient] * self.food_count
+
+    def nutrients(self, food_id):
+        """{nutrient: value per 100g} for one food, skipping missing values"""
+        values = {}
+        for nutrient_id, nutrient in enumerate(self.nutrient_names):
+            value = self._matrix[nutrient_id * self.food_count + food_id]
+            if value == value:  # NaN marks a missing value
+                values[nutrient] = value
+        return values
+
+    def close(self):
+        for view in (self._string_ids, self._strings, self._name_index, self._matrix):
+            view.release()
+        self._mmap.close()
@@ -0,0 +1,1169 @@
+// Global variables
+let isProcessing = false;
+let isRecording = false;
+let recognition = null;
+let weeklyChart = null;
+let currentModel = 'mistral-ai/Ministral-3B';
+let chatContext = [];  // Store chat context
+let userGoals = null;  // Store user goals
+let dashboardState = null;  // Last rendered /dashboard_state, kept current by the change feed
+let pendingEntries = [];  // Meals logged offline and not yet synced
+const clientId = window.crypto && crypto.randomUUID ? crypto.randomUUID() : String(Math.random()).slice(2);
+const userId = document.body.dataset.userId;  // Scopes the offline queue and service worker cache
+OfflineQueue.useUser(userId);
+
+// DOM elements
+const foodInput = document.getElementById('foodInput');
+const processBtn = document.getElementById('processBtn');
+const voiceBtn = document.getElementById('voiceBtn');
+const modelSelect = document.getElementById('modelSelect');
+const resultsSection = document.getElementById('resultsSection');
+const resultsContent = document.getElementById('resultsContent');
+const logsContainer = document.getElementById('logsContainer');
+const dailySummary = document.getElementById('dailySummary');
+const historyContainer = document.getElementById('historyContainer');
+const chatInput = document.getElementById('chatInput');
+const sendMessageBtn = document.getElementById('sendMessageBtn');
+const chatMessages = document.getElementById('chatMessages');
+const proteinValue = document.getElementById('proteinValue');
+const carbsValue = document.getElementById('carbsValue');
+const fatsValue = document.getElementById('fatsValue');
+const caloriesValue = document.getElementById('caloriesValue');
+const proteinGoal = document.getElementById('proteinGoal');
+const carbsGoal = document.getElementById('carbsGoal');
+const fatsGoal = document.getElementById('fatsGoal');
+const caloriesGoal = document.getElementById('caloriesGoal');
+const proteinBar = document.getElementById('proteinBar');
+const carbsBar = document.getElementById('carbsBar');
+const fatsBar = document.getElementById('fatsBar');
+const caloriesBar = document.getElementById('caloriesBar');
+
+// Tab switching functionality
+const tabs = document.querySelectorAll('.sidebar-tab');
+const tabContents = document.querySelectorAll('.tab-content');
+
+tabs.forEach(tab => {
+    tab.addEventListener('click', () => {
+        // Remove active class from all tabs and contents
+        tabs.forEach(t => t.classList.remove('active'));
+        tabContents.forEach(c => c.classList.remove('active'));
+
+        // Add active class to clicked tab and corresponding content
+        tab.classList.add('active');
+        const tabId = tab.getAttribute('data-tab');
+        document.getElementById(tabId).classList.add('active');
+
+        // If switching to history tab, refresh the history
+        if (tabId === 'history') {
+            loadHistory();
+        }
+    });
+});
+
+// Chat functionality
+function addMessage(content, isUser = false) {
+    const messageDiv = document.createElement('div');
+    messageDiv.className = 'chat-message flex items-start space-x-3';
+
+    const icon = isUser ? 'user' : 'robot';
+    const iconColor = isUser ? 'from-blue-400 to-purple-500' : 'from-green-400 to-blue-500';
+
+    messageDiv.innerHTML = `
+        <div class="w-8 h-8 rounded-full bg-gradient-to-br ${iconColor} flex items-center justify-center text-white flex-shrink-0">
+            <i class="fas fa-${icon} text-sm"></i>
+        </div>
+        <div class="flex-1">
+            <div class="bg-white/50 rounded-xl p-4">
+                <p class="text-gray-700">${content}</p>
+            </div>
+            <div class="text-xs text-gray-500 mt-1">Just now</div>
+        </div>
+    `;
+
+    chatMessages.appendChild(messageDiv);
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+function showTypingIndicator() {
+    const indicatorDiv = document.createElement('div');
+    indicatorDiv.className = 'chat-message flex items-start space-x-3';
+    indicatorDiv.id = 'typingIndicator';
+
+    indicatorDiv.innerHTML = `
+        <div class="w-8 h-8 rounded-full bg-gradient-to-br from-green-400 to-blue-500 flex items-center justify-center text-white flex-shrink-0">
+            <i class="fas fa-robot text-sm"></i>
+        </div>
+        <div class="flex-1">
+            <div class="bg-white/50 rounded-xl p-4">
+                <div class="typing-indicator">
+                    <span></span>
+                    <span></span>
+                    <span></span>
+                </div>
+            </div>
+        </div>
+    `;
+
+    chatMessages.appendChild(indicatorDiv);
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+function removeTypingIndicator() {
+    const indicator = document.getElementById('typingIndicator');
+    if (indicator) {
+        indicator.remove();
+    }
+}
+
+async function sendMessage() {
+    const message = chatInput.value.trim();
+    if (!message) return;
+
+    // Add user message
+    addMessage(message, true);
+    chatInput.value = '';
+
+    // Show typing indicator
+    showTypingIndicator();
+
+    try {
+        // Send message to backend with selected model
+        const response = await fetch('/chat', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                message: message,
+                context: chatContext,
+                model: currentModel
+            })
+        });
+
+        const data = await response.json();
+
+        // Remove typing indicator
+        removeTypingIndicator();
+
+        if (data.success) {
+            // Add AI response with formatted content
+            addMessage(formatMessage(data.response));
+
+            // Update context
+            chatContext = data.context;
+
+            // Update macros if available
+            if (data.macros) {
+                updateMacros(data.macros);
+            }
+
+            // Update goals if changed
+            if (data.goal_changed) {
+                userGoals = data.user_goals;
+                // Refresh macros to update goals
+                if (data.macros) {
+                    updateMacros(data.macros);
+                }
+            }
+
+            // If food was detected, update the dashboard
+            if (data.food_detected) {
+                // Trigger food processing
+                foodInput.value = data.food_input;
+                processBtn.click();
+            }
+        } else if (response.status === 429) {
+            // Over the AI quota; the server says how long to wait
+            addMessage(data.error);
+        } else {
+            addMessage('Sorry, I encountered an error. Please try again.');
+        }
+    } catch (error) {
+        removeTypingIndicator();
+        addMessage('Sorry, I encountered an error. Please try again.');
+    }
+}
+
+function resetChat() {
+    if (confirm('Are you sure you want to reset the chat? This will clear our conversation history.')) {
+        chatContext = [];
+        chatMessages.innerHTML = `
+            <div class="chat-message flex items-start space-x-3">
+                <div class="w-8 h-8 rounded-full bg-gradient-to-br from-green-400 to-blue-500 flex items-center justify-center text-white flex-shrink-0">
+                    <i class="fas fa-robot text-sm"></i>
+                </div>
+                <div class="flex-1">
+                    <div class="bg-white/50 rounded-xl p-4">
+                        <p class="text-gray-700">Hello! I'm your AI Nutrition Coach. I can help you achieve your health and fitness goals. What would you like to work on today?</p>
+                    </div>
+                    <div class="text-xs text-gray-500 mt-1">Just now</div>
+                </div>
+            </div>
+        `;
+    }
+}
+
+// Event listeners
+sendMessageBtn.addEventListener('click', sendMessage);
+chatInput.addEventListener('keypress', function(e) {
+    if (e.key === 'Enter' && !e.shiftKey) {
+        e.preventDefault();
+        sendMessage();
+    }
+});
+
+// Auto-resize chat input
+chatInput.addEventListener('input', function() {
+    this.style.height = 'auto';
+    this.style.height = this.scrollHeight + 'px';
+});
+
+// Initialize the app
+document.addEventListener('DOMContentLoaded', function() {
+    initializeVoiceRecognition();
+    loadDashboardState();
+    loadFavorites();
+    connectChangeFeed();
+    registerServiceWorker();
+    refreshPendingEntries().then(flushOfflineQueue);
+});
+
+window.addEventListener('online', flushOfflineQueue);
+
+// Offline support: the service worker serves the cached dashboard, and
+// meals logged without a connection wait in OfflineQueue until they can be
+// sent to /sync_entries in one batch.
+function registerServiceWorker() {
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register(`/sw.js?user=${encodeURIComponent(userId)}`).catch(error => console.error('Service worker registration failed:', error));
+    }
+}
+
+// Nothing of this user's may outlive the session on a shared device: drop
+// the offline queue, cached pages and the service worker before logging out
+async function clearOfflineData() {
+    const tasks = [OfflineQueue.destroy()];
+    if (window.caches) {
+        tasks.push(caches.keys().then(names => Promise.all(
+            names.filter(name => name.startsWith('calorie-tracker-')).map(name => caches.delete(name)))));
+    }
+    if ('serviceWorker' in navigator) {
+        tasks.push(navigator.serviceWorker.getRegistrations().then(registrations =>
+            Promise.all(registrations.map(registration => registration.unregister()))));
+    }
+    await Promise.allSettled(tasks);
+}
+
+document.getElementById('logoutLink').addEventListener('click', async (event) => {
+    event.preventDefault();
+    await clearOfflineData();
+    window.location.href = '/logout';
+});
+
+async function refreshPendingEntries() {
+    try {
+        pendingEntries = (await OfflineQueue.all()).sort((a, b) => b.created_at.localeCompare(a.created_at));
+    } catch (error) {
+        pendingEntries = [];
+    }
+    if (dashboardState) {
+        applyDashboardState(dashboardState);
+    }
+}
+
+async function queueOfflineEntry(userInput, entryClientId) {
+    await OfflineQueue.add(userInput, entryClientId);
+    await refreshPendingEntries();
+    foodInput.value = '';
+    logsContainer.innerHTML = '<p class="text-yellow-400">📴 You are offline. Meal saved and will sync when you reconnect.</p>';
+
+    // Let the browser retry in the background even if this tab is closed
+    if ('serviceWorker' in navigator && 'SyncManager' in window) {
+        const registration = await navigator.serviceWorker.ready;
+        registration.sync.register('sync-entries').catch(() => {});
+    }
+}
+
+async function flushOfflineQueue() {
+    if (!navigator.onLine) return;
+    try {
+        const result = await OfflineQueue.flush(currentModel);
+        if (result.synced) {
+            logsContainer.innerHTML = `<p class="text-green-400">✅ Synced ${result.synced} offline meal${result.synced === 1 ? '' : 's'}; they will appear as they are analyzed</p>`;
+        }
+    } catch (error) {
+        console.error('Offline sync failed:', error);
+    }
+    await refreshPendingEntries();
+}
+
+// Initialize voice recognition
+function initializeVoiceRecognition() {
+    if ('webkitSpeechRecognition' in window || 'SpeechRecognition' in window) {
+        const SpeechRecognition = window.SpeechRecognition || window.webkitSpeechRecognition;
+        recognition = new SpeechRecognition();
+        recognition.continuous = false;
+        recognition.interimResults = false;
+        recognition.lang = 'en-US';
+
+        recognition.onstart = function() {
+            isRecording = true;
+            voiceBtn.innerHTML = '<i class="fas fa-stop voice-recording"></i>';
+            voiceBtn.classList.add('bg-red-500');
+            voiceBtn.classList.remove('bg-green-500');
+        };
+
+        recognition.onresult = function(event) {
+            const transcript = event.results[0][0].transcript;
+            foodInput.value = transcript;
+            logsContainer.innerHTML = `<p class="text-blue-400">🎤 Voice input: "${transcript}"</p>`;
+        };
+
+        recognition.onend = function() {
+            isRecording = false;
+            voiceBtn.innerHTML = '<i class="fas fa-microphone"></i>';
+            voiceBtn.classList.add('bg-green-500');
+            voiceBtn.classList.remove('bg-red-500');
+        };
+
+        recognition.onerror = function(event) {
+            console.error('Speech recognition error:', event.error);
+            logsContainer.innerHTML = `<p class="text-red-400">❌ Voice recognition error: ${event.error}</p>`;
+        };
+    } else {
+        voiceBtn.style.display = 'none';
+        console.log('Speech recognition not supported');
+    }
+}
+
+// Voice button click handler
+voiceBtn.addEventListener('click', function() {
+    if (!recognition) return;
+
+    if (isRecording) {
+        recognition.stop();
+    } else {
+        recognition.start();
+        logsContainer.innerHTML = '<p class="text-blue-400">🎤 Listening... Speak now!</p>';
+    }
+});
+
+// Model selection handler
+modelSelect.addEventListener('change', function() {
+    currentModel = this.value;
+    logsContainer.innerHTML = `<p class="text-blue-400">🔄 Switched to ${this.options[this.selectedIndex].text} model</p>`;
+});
+
+// Process food entry
+processBtn.addEventListener('click', async function() {
+    const userInput = foodInput.value.trim();
+
+    if (!userInput) {
+        alert('Please enter what you ate or use voice input!');
+        return;
+    }
+
+    if (isProcessing) return;
+
+    isProcessing = true;
+    processBtn.disabled = true;
+    processBtn.innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i>Processing...';
+
+    logsContainer.innerHTML = `<p class="text-yellow-400">🔄 AI is analyzing your food entry using ${modelSelect.options[modelSelect.selectedIndex].text}...</p>`;
+
+    if (!navigator.onLine) {
+        await queueOfflineEntry(userInput);
+        isProcessing = false;
+        processBtn.disabled = false;
+        processBtn.innerHTML = '<i class="fas fa-brain mr-2"></i>Process with AI';
+        return;
+    }
+
+    // Sent with the request and reused if it has to be queued, so a save that
+    // went through before the connection dropped is not logged twice
+    const entryClientId = OfflineQueue.newClientId();
+    try {
+        const response = await fetch('/process_food', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', 'X-Client-Id': clientId },
+            body: JSON.stringify({ 
+                user_input: userInput,
+                model: currentModel,
+                client_id: entryClientId,
+                timezone: Intl.DateTimeFormat().resolvedOptions().timeZone,
+                include_state: true
+            })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            displayResults(data);
+            displayLogs(data.logs);
+            refreshDashboard(data);
+            updateNutritionInsights(data);
+            updateMealRecommendations(data);
+            updateHealthScore(data);
+            if (data.insights_job) {
+                waitForInsights(data.insights_job);
+            }
+            loadFavorites();
+            foodInput.value = '';
+        } else {
+            logsContainer.innerHTML = `<p class="text-red-400">❌ Error processing food entry: ${data.error || 'Unknown error'}</p>`;
+        }
+    } catch (error) {
+        console.error('Error:', error);
+        if (error instanceof TypeError) {
+            // No response; keep the meal for later under the same client_id
+            await queueOfflineEntry(userInput, entryClientId);
+        } else {
+            logsContainer.innerHTML = `<p class="text-red-400">❌ Network error: ${error.message}</p>`;
+        }
+    } finally {
+        isProcessing = false;
+        processBtn.disabled = false;
+        processBtn.innerHTML = '<i class="fas fa-brain mr-2"></i>Process with AI';
+    }
+});
+
+// Display results
+function displayResults(data) {
+    const resultsHTML = `
+        <div class="space-y-4">
+            <div class="bg-gradient-to-br from-blue-50 to-purple-50 p-4 rounded-xl">
+                <h3 class="font-semibold text-gray-800 mb-3 flex items-center">
+                    <i class="fas fa-utensils mr-2 text-blue-500"></i>
+                    Detected Food Items
+                </h3>
+                <div class="space-y-2">
+                    ${data.detailed_breakdown.map(item => `
+                        <div class="flex justify-between items-center bg-white/50 p-3 rounded-lg group hover:bg-white/80 transition-all duration-200">
+                            <div class="flex items-center space-x-3">
+                                <div class="w-8 h-8 rounded-lg bg-gradient-to-br from-blue-500/10 to-purple-500/10 flex items-center justify-center text-blue-500">
+                                    <i class="fas fa-utensils text-sm"></i>
+                                </div>
+                                <span class="font-medium text-gray-800">${item.food}</span>
+                            </div>
+                            <div class="flex items-center space-x-2">
+                                <span class="text-sm text-gray-600 bg-gray-100 px-2 py-1 rounded">
+                                    ${item.quantity}x
+                                </span>
+                                <span class="text-sm text-gray-600 bg-gray-100 px-2 py-1 rounded">
+                                    ×${item.container_multiplier}x
+                                </span>
+                                <span class="font-medium text-blue-600">
+                                    ${item.total_calories} cal
+                                </span>
+                            </div>
+                        </div>
+                    `).join('')}
+                </div>
+            </div>
+
+            <div class="bg-gradient-to-br from-green-50 to-blue-50 p-4 rounded-xl">
+                <div class="flex items-center justify-between mb-3">
+                    <h3 class="font-semibold text-gray-800 flex items-center">
+                        <i class="fas fa-fire mr-2 text-orange-500"></i>
+                        Total Calories
+                    </h3>
+                    <div class="text-sm text-gray-500">
+                        ${data.daily_entries_count} entries today
+                    </div>
+                </div>
+                <div class="flex items-center justify-between">
+                    <div class="text-3xl font-bold text-green-600">${data.total_calories}</div>
+                    <div class="text-sm text-gray-600">
+                        Daily Total: ${data.daily_total} cal
+                    </div>
+                </div>
+            </div>
+        </div>
+    `;
+
+    resultsContent.innerHTML = resultsHTML;
+    resultsSection.classList.remove('hidden');
+}
+
+// Display processing logs
+function displayLogs(logs) {
+    const logsHTML = logs.map(log => {
+        // Add different colors based on log type
+        let colorClass = 'text-gray-400';
+        if (log.includes('❌')) colorClass = 'text-red-400';
+        if (log.includes('✅')) colorClass = 'text-green-400';
+        if (log.includes('🤖')) colorClass = 'text-blue-400';
+        if (log.includes('📊')) colorClass = 'text-purple-400';
+        if (log.includes('💾')) colorClass = 'text-yellow-400';
+
+        return `<p class="mb-0.5 ${colorClass}">${log}</p>`;
+    }).join('');
+
+    logsContainer.innerHTML = logsHTML;
+    logsContainer.scrollTop = logsContainer.scrollHeight;
+}
+
+// Delete entry function
+async function deleteEntry(entryId) {
+    if (!confirm('Are you sure you want to delete this entry?')) return;
+
+    try {
+        const response = await fetch(`/delete_entry/${entryId}?include_state=1`, { method: 'DELETE', headers: { 'X-Client-Id': clientId } });
+        const data = await response.json();
+
+        if (data.success) {
+            refreshDashboard(data);
+            logsContainer.innerHTML = '<p class="text-green-400">✅ Entry deleted successfully</p>';
+        } else {
+            logsContainer.innerHTML = `<p class="text-red-400">❌ Error: ${data.error}</p>`;
+        }
+    } catch (error) {
+        logsContainer.innerHTML = `<p class="text-red-400">❌ Error deleting entry</p>`;
+    }
+}
+
+// Insights for a new entry come from a background job; poll its status
+// until it finishes, then fill in the insight cards as if they came inline
+async function waitForInsights(jobId, delay = 1000) {
+    for (let attempt = 0; attempt < 30; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, delay));
+        try {
+            const response = await fetch(`/jobs/${jobId}`);
+            const data = await response.json();
+            if (!data.success || data.job.status === 'failed') return;
+            if (data.job.status === 'done') {
+                const insightData = { ai_insights: data.job.result.insights };
+                updateNutritionInsights(insightData);
+                updateMealRecommendations(insightData);
+                updateHealthScore(insightData);
+                return;
+            }
+        } catch (error) {
+            console.error('Error checking insights job:', error);
+        }
+        delay = Math.min(delay * 1.5, 5000);
+    }
+}
+
+// Favorites: the most logged meals as chips; a tap logs the stored
+// breakdown through /log_favorite with no AI call
+async function loadFavorites() {
+    try {
+        const response = await fetch('/favorites');
+        const data = await response.json();
+        if (data.success) {
+            renderFavorites(data.meals);
+        }
+    } catch (error) {
+        console.error('Error loading favorites:', error);
+    }
+}
+
+function renderFavorites(meals) {
+    const section = document.getElementById('favoritesSection');
+    const list = document.getElementById('favoritesList');
+    list.innerHTML = '';
+    section.classList.toggle('hidden', meals.length === 0);
+
+    meals.forEach(meal => {
+        const chip = document.createElement('button');
+        chip.className = 'bg-white/60 hover:bg-blue-50 border border-blue-100 text-gray-700 text-xs py-1.5 px-3 rounded-full transition-all duration-200 max-w-full truncate';
+        chip.title = `${meal.user_input} · ${meal.total_calories} cal · logged ${meal.times_logged}×`;
+        chip.textContent = `${meal.user_input} (${meal.total_calories})`;
+        chip.addEventListener('click', () => logFavorite(meal.id, chip));
+        list.appendChild(chip);
+    });
+}
+
+async function logFavorite(favoriteId, chip) {
+    chip.disabled = true;
+    try {
+        const response = await fetch(`/log_favorite/${favoriteId}?include_state=1`, {
+            method: 'POST',
+            headers: { 'X-Client-Id': clientId }
+        });
+        const data = await response.json();
+
+        if (data.success) {
+            displayResults(data);
+            displayLogs(data.logs);
+            refreshDashboard(data);
+            loadFavorites();
+        } else {
+            logsContainer.innerHTML = `<p class="text-red-400">❌ Error: ${data.error}</p>`;
+        }
+    } catch (error) {
+        logsContainer.innerHTML = `<p class="text-red-400">❌ Error logging favorite</p>`;
+    } finally {
+        chip.disabled = false;
+    }
+}
+
+// Render everything from one /dashboard_state response
+function applyDashboardState(state) {
+    dashboardState = state;
+    renderDailySummary(state.daily_summary);
+    renderHistory({ success: true, entries: state.history });
+    renderWeeklyChart(state.weekly);
+    renderQuickStats(state.weekly);
+}
+
+async function loadDashboardState() {
+    try {
+        const response = await fetch('/dashboard_state');
+        const state = await response.json();
+        if (state.success) {
+            applyDashboardState(state);
+        }
+    } catch (error) {
+        console.error('Error loading dashboard:', error);
+    }
+}
+
+// Use the state a mutating endpoint sent back, or fetch it if it did not
+function refreshDashboard(data) {
+    if (data && data.dashboard_state) {
+        applyDashboardState(data.dashboard_state);
+    } else {
+        loadDashboardState();
+    }
+}
+
+// Live updates from other tabs and devices. Each event is a small delta
+// applied to dashboardState; events caused by this tab are skipped because
+// its own mutation responses already carry the new state.
+function connectChangeFeed() {
+    if (!window.EventSource) return;
+
+    const source = new EventSource('/events');
+    const handle = (handler) => (event) => {
+        const change = JSON.parse(event.data);
+        if (change.origin === clientId) return;
+        if (!dashboardState) {
+            loadDashboardState();
+            return;
+        }
+        handler(change);
+        applyDashboardState(dashboardState);
+    };
+
+    source.addEventListener('entry_added', handle(change => adjustTotals(change.entry, 1)));
+    source.addEventListener('entry_removed', handle(change => adjustTotals({
+        id: change.entry_id,
+        date: change.date,
+        total_calories: change.total_calories
+    }, -1)));
+    source.addEventListener('entries_cleared', handle(() => {
+        dashboardState.history = [];
+        dashboardState.daily_summary.entries = [];
+        dashboardState.daily_summary.total_calories = 0;
+        dashboardState.daily_summary.entries_count = 0;
+        dashboardState.weekly.data.forEach(day => { day.calories = 0; day.entries = 0; });
+        dashboardState.weekly.total_entries = 0;
+    }));
+    source.addEventListener('state_changed', (event) => {
+        if (JSON.parse(event.data).origin !== clientId) loadDashboardState();
+    });
+}
+
+// Add (sign 1) or remove (sign -1) one entry from the cached dashboard state
+function adjustTotals(entry, sign) {
+    const state = dashboardState;
+    if (sign > 0) {
+        state.history.unshift(entry);
+        state.history = state.history.slice(0, 15);
+    } else {
+        state.history = state.history.filter(e => e.id !== entry.id);
+    }
+
+    if (entry.date === state.daily_summary.date) {
+        if (sign > 0) {
+            state.daily_summary.entries.push(entry);
+        } else {
+            state.daily_summary.entries = state.daily_summary.entries.filter(e => e.id !== entry.id);
+        }
+        state.daily_summary.total_calories += sign * entry.total_calories;
+        state.daily_summary.entries_count += sign;
+    }
+
+    const day = state.weekly.data.find(d => d.date === entry.date);
+    if (day) {
+        day.calories += sign * entry.total_calories;
+        day.entries += sign;
+        state.weekly.total_entries += sign;
+    }
+}
+
+// Load daily summary
+async function loadDailySummary() {
+    try {
+        const response = await fetch('/get_daily_summary');
+        renderDailySummary(await response.json());
+    } catch (error) {
+        dailySummary.innerHTML = '<p class="text-red-600">Error loading daily summary</p>';
+    }
+}
+
+function renderDailySummary(data) {
+    try {
+        const percentage = Math.round((data.total_calories / 2000) * 100);
+        const remaining = Math.max(0, 2000 - data.total_calories);
+
+        // Update header progress
+        document.getElementById('todayProgress').textContent = `${data.total_calories}/2000`;
+        document.getElementById('goalProgressBar').style.width = `${Math.min(percentage, 100)}%`;
+
+        const summaryHTML = `
+            <div class="space-y-4">
+                <div class="text-center">
+                    <div class="text-3xl font-bold text-blue-600">${data.total_calories}</div>
+                    <div class="text-gray-600 mb-2">calories today</div>
+                    <div class="w-full bg-gray-200 rounded-full h-3">
+                        <div class="bg-gradient-to-r from-blue-500 to-purple-600 h-3 rounded-full transition-all duration-500" 
+                             style="width: ${Math.min(percentage, 100)}%"></div>
+                    </div>
+                    <div class="text-sm text-gray-500 mt-1">${percentage}% of 2000 cal goal</div>
+                    <div class="text-sm font-medium text-green-600 mt-2">${remaining} calories remaining</div>
+                    ${pendingEntries.length ? `<div class="text-xs text-yellow-600 mt-1">+${pendingEntries.length} meal${pendingEntries.length === 1 ? '' : 's'} waiting to sync</div>` : ''}
+                </div>
+                <div class="grid grid-cols-2 gap-4 text-center">
+                    <div class="bg-green-50 p-3 rounded-lg">
+                        <div class="text-lg font-bold text-green-600">${data.entries_count}</div>
+                        <div class="text-xs text-gray-600">Entries</div>
+                    </div>
+                    <div class="bg-purple-50 p-3 rounded-lg">
+                        <div class="text-lg font-bold text-purple-600">${new Date().toLocaleDateString()}</div>
+                        <div class="text-xs text-gray-600">Today</div>
+                    </div>
+                </div>
+            </div>
+        `;
+
+        dailySummary.innerHTML = summaryHTML;
+    } catch (error) {
+        dailySummary.innerHTML = '<p class="text-red-600">Error loading daily summary</p>';
+    }
+}
+
+// Load recent history
+async function loadHistory() {
+    try {
+        const response = await fetch('/get_history');
+        renderHistory(await response.json());
+    } catch (error) {
+        historyContainer.innerHTML = '<p class="text-red-600">Error loading history</p>';
+    }
+}
+
+function renderHistory(data) {
+    try {
+        if (data.success && (data.entries.length > 0 || pendingEntries.length > 0)) {
+            const historyHTML = `
+                <div class="space-y-4">
+                    ${pendingEntries.map(entry => `
+                        <div class="relative">
+                            <div class="absolute -left-8 top-1/2 -translate-y-1/2 w-4 h-4 rounded-full bg-yellow-400 border-2 border-white shadow-lg"></div>
+                            <div class="bg-yellow-50/50 border border-dashed border-yellow-300 p-4 rounded-xl">
+                                <p class="font-medium text-gray-800 mb-2 line-clamp-2">"${entry.user_input}"</p>
+                                <div class="flex items-center text-xs text-yellow-700">
+                                    <i class="fas fa-clock mr-1"></i>
+                                    <span>Waiting to sync · ${new Date(entry.created_at).toLocaleString()}</span>
+                                </div>
+                            </div>
+                        </div>
+                    `).join('')}
+                    ${data.entries.map((entry, index) => `
+                        <div class="relative group">
+                            <div class="absolute -left-8 top-1/2 -translate-y-1/2 w-4 h-4 rounded-full bg-gradient-to-r from-blue-500 to-purple-500 border-2 border-white shadow-lg"></div>
+                            <div class="bg-gradient-to-r from-blue-50/50 to-purple-50/50 border border-blue-100/50 p-4 rounded-xl group-hover:shadow-lg transition-all duration-200 relative">
+                                <div class="flex flex-col h-full">
+                                    <div class="flex items-start justify-between">
+                                        <div class="flex-1">
+                                            <p class="font-medium text-gray-800 mb-2 line-clamp-2">"${entry.user_input}"</p>
+                                            <div class="flex items-center text-sm text-gray-600">
+                                                <i class="fas fa-fire mr-1 text-orange-500"></i>
+                                                <span>${entry.total_calories} calories</span>
+                                            </div>
+                                        </div>
+                                        <button 
+                                            onclick="deleteEntry(${entry.id})"
+                                            class="opacity-0 group-hover:opacity-100 bg-red-500/10 hover:bg-red-500/20 text-red-500 p-2 rounded-lg transition-all duration-200 ml-2"
+                                            title="Delete Entry"
+                                        >
+                                            <i class="fas fa-trash-alt text-xs"></i>
+                                        </button>
+                                    </div>
+                                    <div class="flex items-center text-xs text-gray-500 mt-2">
+                                        <i class="fas fa-clock mr-1"></i>
+                                        <span>${new Date(entry.created_at).toLocaleString()}</span>
+                                    </div>
+                                </div>
+                            </div>
+                        </div>
+                    `).join('')}
+                </div>
+            `;
+            historyContainer.innerHTML = historyHTML;
+        } else {
+            historyContainer.innerHTML = `
+                <div class="text-center py-8 text-gray-500">
+                    <i class="fas fa-utensils text-4xl mb-4"></i>
+                    <p>No entries yet. Start tracking your calories!</p>
+                </div>
+            `;
+        }
+    } catch (error) {
+        historyContainer.innerHTML = '<p class="text-red-600">Error loading history</p>';
+    }
+}
+
+// Load weekly chart
+async function loadWeeklyChart() {
+    try {
+        const response = await fetch('/get_weekly_data');
+        renderWeeklyChart(await response.json());
+    } catch (error) {
+        console.error('Error loading weekly chart:', error);
+    }
+}
+
+function renderWeeklyChart(data) {
+    try {
+        const ctx = document.getElementById('weeklyChart').getContext('2d');
+
+        if (weeklyChart) {
+            weeklyChart.destroy();
+        }
+
+        weeklyChart = new Chart(ctx, {
+            type: 'line',
+            data: {
+                labels: data.data.map(d => d.day),
+                datasets: [{
+                    label: 'Daily Calories',
+                    data: data.data.map(d => d.calories),
+                    borderColor: 'rgb(99, 102, 241)',
+                    backgroundColor: 'rgba(99, 102, 241, 0.1)',
+                    borderWidth: 3,
+                    fill: true,
+                    tension: 0.4,
+                    pointBackgroundColor: 'rgb(99, 102, 241)',
+                    pointBorderColor: '#fff',
+                    pointBorderWidth: 2,
+                    pointRadius: 6
+                }]
+            },
+            options: {
+                responsive: true,
+                maintainAspectRatio: false,
+                plugins: {
+                    legend: {
+                        display: false
+                    }
+                },
+                scales: {
+                    y: {
+                        beginAtZero: true,
+                        grid: {
+                            color: 'rgba(0, 0, 0, 0.1)'
+                        },
+                        ticks: {
+                            callback: function(value) {
+                                return value + ' cal';
+                            }
+                        }
+                    },
+                    x: {
+                        grid: {
+                            display: false
+                        }
+                    }
+                },
+                elements: {
+                    point: {
+                        hoverRadius: 8
+                    }
+                }
+            }
+        });
+    } catch (error) {
+        console.error('Error loading weekly chart:', error);
+    }
+}
+
+// Update quick stats
+async function updateQuickStats() {
+    try {
+        const response = await fetch('/get_weekly_data');
+        renderQuickStats(await response.json());
+    } catch (error) {
+        console.error('Error updating quick stats:', error);
+    }
+}
+
+function renderQuickStats(data) {
+    try {
+        const totalWeekly = data.data.reduce((sum, day) => sum + day.calories, 0);
+        const avgDaily = Math.round(totalWeekly / 7);
+
+        document.getElementById('avgDaily').textContent = avgDaily.toLocaleString();
+        document.getElementById('weekTotal').textContent = totalWeekly.toLocaleString();
+        document.getElementById('totalEntries').textContent = data.total_entries.toLocaleString();
+    } catch (error) {
+        console.error('Error updating quick stats:', error);
+    }
+}
+
+// Allow Enter key to submit
+foodInput.addEventListener('keypress', function(e) {
+    if (e.key === 'Enter' && !e.shiftKey) {
+        e.preventDefault();
+        processBtn.click();
+    }
+});
+
+// Auto-resize textarea
+foodInput.addEventListener('input', function() {
+    this.style.height = 'auto';
+    this.style.height = this.scrollHeight + 'px';
+});
+
+// Add new functions for AI features
+function updateNutritionInsights(data) {
+    const nutritionGaps = document.getElementById('nutritionGaps');
+
+    if (data.ai_insights) {
+        // Format nutrition gaps as a list
+        const nutritionGapsText = Array.isArray(data.ai_insights.nutrition_gaps)
+            ? data.ai_insights.nutrition_gaps.join(', ')
+            : data.ai_insights.nutrition_gaps || 'Identifying gaps...';
+        nutritionGaps.innerHTML = nutritionGapsText;
+    }
+}
+
+function updateMealRecommendations(data) {
+    const nextMealSuggestion = document.getElementById('nextMealSuggestion');
+
+    if (data.ai_insights) {
+        // Format next meal suggestions as a list
+        const nextMealText = Array.isArray(data.ai_insights.next_meal)
+            ? data.ai_insights.next_meal.join(', ')
+            : data.ai_insights.next_meal || 'Based on your current intake...';
+        nextMealSuggestion.innerHTML = nextMealText;
+    }
+}
+
+function updateHealthScore(data) {
+    const scoreValue = document.getElementById('scoreValue');
+    const healthScoreDescription = document.getElementById('healthScoreDescription');
+    const healthScoreCircle = document.getElementById('healthScoreCircle');
+
+    if (data.ai_insights) {
+        const score = data.ai_insights.health_score || 75;
+
+        // Update description based on score
+        let description = '';
+        if (score >= 80) {
+            description = 'Excellent diet balance with optimal nutrition';
+        } else if (score >= 70) {
+            description = 'Good diet with minor improvements needed';
+        } else if (score >= 60) {
+            description = 'Moderate diet, consider adding more variety';
+        } else {
+            description = 'Diet needs improvement, focus on balanced nutrition';
+        }
+
+        // Update score
+        scoreValue.textContent = score;
+
+        // Update description
+        healthScoreDescription.textContent = description;
+
+        // Update circle color and animation
+        const offset = 251.2 - (251.2 * (score / 100));
+        healthScoreCircle.style.strokeDashoffset = offset;
+
+        // Update circle color based on score
+        if (score >= 80) {
+            healthScoreCircle.classList.remove('text-yellow-500', 'text-red-500');
+            healthScoreCircle.classList.add('text-green-500');
+        } else if (score >= 60) {
+            healthScoreCircle.classList.remove('text-green-500', 'text-red-500');
+            healthScoreCircle.classList.add('text-yellow-500');
+        } else {
+            healthScoreCircle.classList.remove('text-green-500', 'text-yellow-500');
+            healthScoreCircle.classList.add('text-red-500');
+        }
+    }
+}
+
+// Toggle logs panel
+const logsPanel = document.getElementById('logsPanel');
+const toggleLogs = document.getElementById('toggleLogs');
+let isLogsExpanded = true;
+
+toggleLogs.addEventListener('click', () => {
+    isLogsExpanded = !isLogsExpanded;
+    if (isLogsExpanded) {
+        logsPanel.style.transform = 'translateY(0)';
+        document.getElementById('logsContainer').style.maxHeight = '50vh';
+        toggleLogs.innerHTML = '<i class="fas fa-chevron-up text-xs"></i>';
+    } else {
+        logsPanel.style.transform = 'translateY(calc(100% - 2.5rem))';
+        document.getElementById('logsContainer').style.maxHeight = '100px';
+        toggleLogs.innerHTML = '<i class="fas fa-chevron-down text-xs"></i>';
+    }
+});
+
+// Add the deleteAllEntries function
+async function deleteAllEntries() {
+    if (!confirm('Are you sure you want to delete ALL entries? This action cannot be undone.')) return;
+
+    try {
+        const response = await fetch('/delete_all_entries?include_state=1', { method: 'DELETE', headers: { 'X-Client-Id': clientId } });
+        const data = await response.json();
+
+        if (data.success) {
+            refreshDashboard(data);
+            logsContainer.innerHTML = '<p class="text-green-400">✅ All entries deleted successfully</p>';
+        } else {
+            logsContainer.innerHTML = `<p class="text-red-400">❌ Error: ${data.error}</p>`;
+        }
+    } catch (error) {
+        logsContainer.innerHTML = `<p class="text-red-400">❌ Error deleting entries</p>`;
+    }
+}
+
+// Update macros display
+function updateMacros(macros) {
+    if (!macros) return;
+
+    // Get current goals based on user's goal type
+    const goalType = userGoals?.goal_type || 'maintenance';
+    let goals = {
+        protein: 120,
+        carbs: 300,
+        fats: 65,
+        calories: 2000
+    };
+
+    // Adjust goals based on goal type
+    if (goalType === 'weight_loss') {
+        goals = {
+            protein: 150,  // Higher protein for weight loss
+            carbs: 200,    // Lower carbs
+            fats: 50,      // Lower fats
+            calories: 1800 // Lower calories
+        };
+    } else if (goalType === 'weight_gain') {
+        goals = {
+            protein: 180,  // Higher protein for muscle gain
+            carbs: 400,    // Higher carbs
+            fats: 80,      // Higher fats
+            calories: 2500 // Higher calories
+        };
+    }
+
+    // Update goal displays
+    document.getElementById('proteinGoal').textContent = `${goals.protein}g`;
+    document.getElementById('carbsGoal').textContent = `${goals.carbs}g`;
+    document.getElementById('fatsGoal').textContent = `${goals.fats}g`;
+    document.getElementById('caloriesGoal').textContent = goals.calories;
+
+    // Update current values
+    document.getElementById('proteinValue').textContent = `${Math.round(macros.protein)}g`;
+    document.getElementById('carbsValue').textContent = `${Math.round(macros.carbs)}g`;
+    document.getElementById('fatsValue').textContent = `${Math.round(macros.fats)}g`;
+    document.getElementById('caloriesValue').textContent = Math.round(macros.calories);
+
+    // Calculate percentages (can exceed 100%)
+    const proteinPercent = (macros.protein / goals.protein) * 100;
+    const carbsPercent = (macros.carbs / goals.carbs) * 100;
+    const fatsPercent = (macros.fats / goals.fats) * 100;
+    const caloriesPercent = (macros.calories / goals.calories) * 100;
+
+    // Update progress bars with animation
+    updateProgressBar('proteinBar', proteinPercent);
+    updateProgressBar('carbsBar', carbsPercent);
+    updateProgressBar('fatsBar', fatsPercent);
+    updateProgressBar('caloriesBar', caloriesPercent);
+}
+
+function updateProgressBar(id, percent) {
+    const bar = document.getElementById(id);
+    const currentWidth = parseFloat(bar.style.width) || 0;
+    const targetWidth = Math.min(percent, 100);
+
+    // Animate the progress bar
+    bar.style.transition = 'width 0.5s ease-out';
+    bar.style.width = `${targetWidth}%`;
+
+    // Change color based on percentage
+    if (percent > 100) {
+        bar.style.backgroundColor = '#ef4444'; // Red for exceeding
+    } else if (percent > 80) {
+        bar.style.backgroundColor = '#22c55e'; // Green for good progress
+    } else {
+        bar.style.backgroundColor = '#3b82f6'; // Blue for normal progress
+    }
+}
+
+// Add resetAllData function
+async function resetAllData() {
+    if (!confirm('Are you sure you want to reset ALL your data? This will delete all your history, goals, macros, and chat history. This action cannot be undone.')) return;
+
+    try {
+        const response = await fetch('/reset_all_data?include_state=1', { method: 'POST', headers: { 'X-Client-Id': clientId } });
+        const data = await response.json();
+
+        if (data.success) {
+            // Reset all UI elements
+            refreshDashboard(data);
+            resetChat();
+            updateMacros(null);
+
+            // Show success message
+            logsContainer.innerHTML = '<p class="text-green-400">✅ All data reset successfully</p>';
+        } else {
+            logsContainer.innerHTML = `<p class="text-red-400">❌ Error: ${data.error}</p>`;
+        }
+    } catch (error) {
+        logsContainer.innerHTML = `<p class="text-red-400">❌ Error resetting data</p>`;
+    }
+}
+
+// Update the formatMessage function to better format AI responses
+function formatMessage(content) {
+    // Convert markdown headers to styled headers
+    content = content.replace(/^### (.*$)/gm, '<h3 class="text-lg font-bold text-gray-800 mt-4 mb-2">$1</h3>');
+    content = content.replace(/^## (.*$)/gm, '<h2 class="text-xl font-bold text-gray-800 mt-6 mb-3">$1</h2>');
+    content = content.replace(/^# (.*$)/gm, '<h1 class="text-2xl font-bold text-gray-800 mt-8 mb-4">$1</h1>');
+
+    // Convert bullet points with better styling
+    content = content.replace(/^\* (.*$)/gm, '<li class="ml-4 mb-2">$1</li>');
+    content = content.replace(/(<li class="ml-4 mb-2">.*<\/li>)/gm, '<ul class="list-disc space-y-2 my-4 bg-white/30 p-4 rounded-lg">$1</ul>');
+
+    // Convert numbered lists
+    content = content.replace(/^\d+\. (.*$)/gm, '<li class="ml-4 mb-2">$1</li>');
+    content = content.replace(/(<li class="ml-4 mb-2">.*<\/li>)/gm, '<ol class="list-decimal space-y-2 my-4 bg-white/30 p-4 rounded-lg">$1</ol>');
+
+    // Convert bold and italic with better styling
+    content = content.replace(/\*\*(.*?)\*\*/g, '<strong class="font-bold text-gray-800">$1</strong>');
+    content = content.replace(/\*(.*?)\*/g, '<em class="italic text-gray-700">$1</em>');
+
+    // Add action buttons for common responses
+    if (content.includes('Would you like me to create a diet plan?')) {
+        content += `
+            <div class="mt-4 flex space-x-2">
+                <button onclick="sendMessage('Yes, please create a diet plan')" class="bg-green-500 text-white px-4 py-2 rounded-lg text-sm hover:bg-green-600 transition-colors">
+                    Yes, create plan
+                </button>
+                <button onclick="sendMessage('No, not yet')" class="bg-gray-500 text-white px-4 py-2 rounded-lg text-sm hover:bg-gray-600 transition-colors">
+                    Not yet
+                </button>
+            </div>
+        `;
+    }
+
+    return content;
+}
@@ -0,0 +1,114 @@
+// Meals logged while offline, kept in IndexedDB so both the dashboard and
+// the service worker can read and flush them. Each user gets their own
+// database (useUser), so one account's meals never sync into another's.
+const OfflineQueue = (() => {
+    const DB_PREFIX = 'calorie-tracker-';
+    const STORE = 'pending_entries';
+    // Entries per /sync_entries request; the server refuses more than SYNC_MAX_ENTRIES (100)
+    const BATCH_SIZE = 100;
+    let userId = null;
+    let flushing = null;
+
+    function useUser(id) {
+        userId = id;
+    }
+
+    function openDatabase() {
+        return new Promise((resolve, reject) => {
+            if (!userId) {
+                reject(new Error('OfflineQueue.useUser has not been called'));
+                return;
+            }
+            const request = indexedDB.open(DB_PREFIX + userId, 1);
+            request.onupgradeneeded = () => request.result.createObjectStore(STORE, { keyPath: 'client_id' });
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    async function withStore(mode, action) {
+        const db = await openDatabase();
+        return new Promise((resolve, reject) => {
+            const tx = db.transaction(STORE, mode);
+            const request = action(tx.objectStore(STORE));
+            tx.oncomplete = () => resolve(request ? request.result : undefined);
+            tx.onerror = () => reject(tx.error);
+        });
+    }
+
+    function newClientId() {
+        if (self.crypto && crypto.randomUUID) return crypto.randomUUID();
+        return 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, c => {
+            const r = Math.random() * 16 | 0;
+            return (c === 'x' ? r : (r & 0x3 | 0x8)).toString(16);
+        });
+    }
+
+    // clientId: the id already sent with a /process_food attempt, so the
+    // server spots the retry if that attempt saved the meal after all
+    async function add(userInput, clientId) {
+        const now = new Date();
+        const entry = {
+            client_id: clientId || newClientId(),
+            user_input: userInput,
+            created_at: now.toISOString(),
+            date: now.toLocaleDateString('en-CA'),  // YYYY-MM-DD in local time
+            timezone: Intl.DateTimeFormat().resolvedOptions().timeZone  // meal slots are read in it
+        };
+        await withStore('readwrite', store => store.put(entry));
+        return entry;
+    }
+
+    function all() {
+        return withStore('readonly', store => store.getAll());
+    }
+
+    function remove(clientIds) {
+        return withStore('readwrite', store => {
+            clientIds.forEach(id => store.delete(id));
+        });
+    }
+
+    // Send everything pending to /sync_entries, BATCH_SIZE entries at a time.
+    // Acknowledged and duplicate ids leave the queue as soon as their batch is
+    // answered; anything else (including later batches after a failure) stays
+    // for next time.
+    function flush(model) {
+        if (flushing) return flushing;
+        flushing = (async () => {
+            const pending = await all();
+            let synced = 0;
+            const rejected = [];
+            for (let start = 0; start < pending.length; start += BATCH_SIZE) {
+                const response = await fetch('/sync_entries', {
+                    method: 'POST',
+                    credentials: 'same-origin',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ entries: pending.slice(start, start + BATCH_SIZE), model: model, user_id: userId })
+                });
+                const data = await response.json();
+                if (!data.success) throw new Error(data.error || 'Sync failed');
+
+                const done = data.accepted.concat(data.duplicates, data.rejected.map(r => r.client_id).filter(Boolean));
+                await remove(done);
+                synced += data.accepted.length + data.duplicates.length;
+                rejected.push(...data.rejected);
+            }
+            return { synced: synced, rejected: rejected };
+        })().finally(() => { flushing = null; });
+        return flushing;
+    }
+
+    // Drop the current user's queue (on logout)
+    function destroy() {
+        if (!userId) return Promise.resolve();
+        return new Promise((resolve, reject) => {
+            const request = indexedDB.deleteDatabase(DB_PREFIX + userId);
+            request.onsuccess = () => resolve();
+            request.onerror = () => reject(request.error);
+            request.onblocked = () => resolve();
+        });
+    }
+
+    return { useUser, newClientId, add, all, remove, flush, destroy };
+})();
@@ -0,0 +1,69 @@
+// Service worker: keeps the dashboard usable offline and flushes meals
+// queued in OfflineQueue when connectivity returns.
+importScripts('/static/js/offline-queue.js');
+
+// Registered as /sw.js?user=<id>; the cache and queue belong to that user,
+// and a new login registers a new worker whose activate drops the old cache
+const USER_ID = new URL(self.location).searchParams.get('user');
+const CACHE_NAME = `calorie-tracker-v2-${USER_ID}`;
+OfflineQueue.useUser(USER_ID);
+const SYNC_TAG = 'sync-entries';
+
+self.addEventListener('install', () => self.skipWaiting());
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names.filter(name => name !== CACHE_NAME).map(name => caches.delete(name)));
+        await self.clients.claim();
+    })());
+});
+
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok || response.type === 'opaque') {
+        const cache = await caches.open(CACHE_NAME);
+        cache.put(request, response.clone());
+    }
+    return response;
+}
+
+async function networkFirst(request) {
+    try {
+        const response = await fetch(request);
+        if (response.ok) {
+            const cache = await caches.open(CACHE_NAME);
+            cache.put(request, response.clone());
+        }
+        return response;
+    } catch (error) {
+        const cached = await caches.match(request);
+        if (cached) return cached;
+        throw error;
+    }
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) {
+        // CDN scripts (Chart.js, fallbacks) rarely change
+        event.respondWith(cacheFirst(request));
+    } else if (url.pathname.startsWith('/static/') && url.searchParams.has('v')) {
+        // Content-hashed, so a cached copy is always current
+        event.respondWith(cacheFirst(request));
+    } else if (USER_ID && (url.pathname === '/' || url.pathname === '/dashboard_state')) {
+        // Last known page and data when offline
+        event.respondWith(networkFirst(request));
+    }
+});
+
+self.addEventListener('sync', event => {
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(OfflineQueue.flush());
+    }
+});
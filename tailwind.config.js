@@ -0,0 +1,8 @@
+/** Only classes that appear in the templates and dashboard script end up in static/css/tailwind.css */
+module.exports = {
+  content: ['./templates/**/*.html', './static/js/**/*.js'],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};
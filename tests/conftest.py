@@ -0,0 +1,6 @@
+import os
+
+# app builds its Supabase and model clients at import; tests never contact them
+os.environ.setdefault('SUPABASE_URL', 'https://test.supabase.co')
+os.environ.setdefault('SUPABASE_KEY', 'eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.test')
+os.environ.setdefault('GITHUB_TOKEN', 'test-token')
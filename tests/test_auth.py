@@ -0,0 +1,16 @@
+import pytest
+
+pytest.importorskip('supabase')
+
+import app  # noqa: E402
+
+
+@pytest.mark.parametrize('path, message', [
+    ('/login', 'Too many login attempts'),
+    ('/register', 'Too many registration attempts'),
+])
+def test_throttled_attempt_shows_why(monkeypatch, path, message):
+    monkeypatch.setattr(app, 'auth_throttled', lambda username: True)
+    response = app.app.test_client().post(path, data={'username': 'someone', 'password': 'secret'})
+    assert response.status_code == 429
+    assert message in response.get_data(as_text=True)
@@ -0,0 +1,21 @@
+import numpy as np
+
+from calorie_engine import NutrientTable
+from nutrition_store import NutritionStore, write_nutrition_store
+
+
+def test_table_over_a_store_matches_the_dict_table(tmp_path):
+    per_100g = {
+        'rice': {'calories': 130.0, 'protein': 2.7},
+        'dal': {'calories': 116.0, 'protein': 9.0},
+        'paneer': {'calories': 265.0, 'protein': 18.3},
+    }
+    write_nutrition_store(str(tmp_path / 'foods.nutr'), ['calories', 'protein'], per_100g.items())
+    store = NutritionStore(str(tmp_path / 'foods.nutr'))
+
+    table = NutrientTable.from_store(store)
+    expected = NutrientTable.from_dict(per_100g)
+    ids = table.ids(['paneer', 'rice', 'dosa'])
+    assert list(ids[:2]) == [2, 0] and ids[2] == -1
+    np.testing.assert_allclose(table.nutrients(ids, [50, 200, 100]),
+                               expected.nutrients(expected.ids(['paneer', 'rice', 'dosa']), [50, 200, 100]), rtol=1e-6)
@@ -0,0 +1,26 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip('supabase')
+
+import app  # noqa: E402
+
+
+def test_leftover_journal_with_our_pid_is_replayed(tmp_path, monkeypatch):
+    # A restarted container can get the pid of the process that wrote the journal
+    base = str(tmp_path / 'chat_history.journal')
+    own = f"{base}.{os.getpid()}"
+    monkeypatch.setattr(app, 'CHAT_JOURNAL_PATH', base)
+    monkeypatch.setattr(app, 'chat_journal_path', own)
+    monkeypatch.setattr(app, 'chat_dead_letter_path', f"{base}.dead")
+    monkeypatch.setattr(app, 'chat_buffer', [])
+    with open(own, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'user_id': 'user', 'message': 'hi', 'is_user': True, 'created_at': '2024-01-01T08:00:00'}) + '\n')
+    with open(f"{base}.999999999", 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'user_id': 'user', 'message': 'bye', 'is_user': True, 'created_at': '2024-01-01T08:01:00'}) + '\n')
+
+    assert app.replay_chat_journal() == 2
+    assert sorted(record['message'] for record in app.chat_buffer) == ['bye', 'hi']
+    assert sorted(record['message'] for record in app._read_chat_journal(own)) == ['bye', 'hi']
@@ -0,0 +1,68 @@
+import sqlite3
+import time
+
+from job_queue import JobQueue, RetryLater
+
+
+def test_running_job_keeps_its_lease(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), lease_seconds=0.3, max_attempts=1)
+    job_id = queue.enqueue('slow')
+    stolen = []
+
+    def slow(payload):
+        time.sleep(1)
+        stolen.append(queue.claim('other-worker'))
+        return 'ok'
+
+    queue.work({'slow': slow}, worker='first-worker', burst=True)
+    job = queue.get(job_id)
+    assert stolen == [None]
+    assert (job['status'], job['attempts'], job['result']) == ('done', 1, 'ok')
+
+
+def test_lapsed_worker_cannot_overwrite_the_job(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), lease_seconds=0, max_attempts=2)
+    job_id = queue.enqueue('kind')
+    queue.claim('first-worker')
+    time.sleep(0.01)
+    assert queue.claim('second-worker')['id'] == job_id
+    assert not queue.complete(job_id, 'first-worker', 'stale')
+    assert not queue.fail(job_id, 'first-worker', 'stale')
+    assert not queue.renew(job_id, 'first-worker')
+    job = queue.get(job_id)
+    assert (job['status'], job['worker'], job['result']) == ('running', 'second-worker', None)
+    assert queue.complete(job_id, 'second-worker', 'fresh')
+
+
+def test_integer_user_id_queue_is_migrated(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    db = sqlite3.connect(path)
+    db.executescript(
+        "CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, user_id INTEGER, "
+        "payload TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 5, status TEXT NOT NULL DEFAULT 'queued', "
+        "attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, run_at REAL NOT NULL, "
+        "lease_until REAL, worker TEXT, result TEXT, last_error TEXT, created_at REAL NOT NULL, finished_at REAL);"
+        "CREATE INDEX jobs_ready ON jobs (status, priority, run_at, id);"
+        "CREATE INDEX jobs_user ON jobs (user_id, id);"
+        "INSERT INTO jobs (kind, user_id, payload, max_attempts, run_at, created_at) VALUES ('kind', 42, '{}', 3, 0, 0);")
+    db.close()
+
+    queue = JobQueue(path)
+    user_id = '6f1c2a9e-0000-4000-8000-000000000001'
+    queue.enqueue('kind', user_id=user_id)
+    assert [job['user_id'] for job in queue.recent('42')] == ['42']
+    assert [job['user_id'] for job in queue.recent(user_id)] == [user_id]
+    assert JobQueue(path).counts() == {'queued': 2}
+
+
+def test_retry_later_does_not_use_an_attempt(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), max_attempts=1)
+    job_id = queue.enqueue('busy')
+
+    def busy(payload):
+        raise RetryLater(60)
+
+    queue.work({'busy': busy}, worker='worker', burst=True)
+    job = queue.get(job_id)
+    assert (job['status'], job['attempts']) == ('queued', 0)
+    assert job['run_at'] > time.time() + 50
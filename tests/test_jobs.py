@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('supabase')
+
+import app  # noqa: E402
+from job_queue import JobQueue  # noqa: E402
+
+
+def model_client(create):
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def run_extraction(tmp_path, monkeypatch, create):
+    saved = []
+    monkeypatch.setattr(app, 'get_model_client', lambda name: model_client(create))
+    monkeypatch.setattr(app, 'find_reusable_entry', lambda *args: None)
+    monkeypatch.setattr(app, 'save_to_database', lambda *args, **kwargs: saved.append(args) or (True, 1, []))
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), max_attempts=2, retry_delay=0)
+    job_id = queue.enqueue('extract_food', {'user_id': 'user', 'user_input': '2 idli', 'date': '2024-01-01',
+                                            'model': app.BACKGROUND_MODEL})
+    queue.work(app.JOB_HANDLERS, worker='worker', burst=True)
+    return queue.get(job_id), saved
+
+
+def test_failed_model_call_is_retried_then_failed(tmp_path, monkeypatch):
+    def create(**kwargs):
+        raise TimeoutError('model timed out')
+
+    job, saved = run_extraction(tmp_path, monkeypatch, create)
+    assert (job['status'], job['attempts']) == ('failed', 2)
+    assert 'TimeoutError' in job['last_error']
+    assert saved == []
+
+
+def test_meal_without_food_completes(tmp_path, monkeypatch):
+    def create(**kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='[]'))])
+
+    job, saved = run_extraction(tmp_path, monkeypatch, create)
+    assert (job['status'], job['result']) == ('done', {'entry_id': None})
+    assert saved == []
+
+
+def test_queued_meals_wait_for_the_users_quota(tmp_path, monkeypatch):
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='[]'))])
+
+    monkeypatch.setattr(app, 'llm_user_limiter', app.TokenBucketLimiter(1, 1 / 60, store=app.LocalBucketStore()))
+    monkeypatch.setattr(app, 'get_model_client', lambda name: model_client(create))
+    monkeypatch.setattr(app, 'find_reusable_entry', lambda *args: None)
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), max_attempts=1)
+    job_ids = [queue.enqueue('extract_food', {'user_id': 'user', 'user_input': meal, 'date': '2024-01-01',
+                                              'model': app.BACKGROUND_MODEL}) for meal in ('2 idli', '1 dosa')]
+    queue.work(app.JOB_HANDLERS, worker='worker', burst=True)
+    first, second = (queue.get(job_id) for job_id in job_ids)
+    assert len(calls) == 1
+    assert first['status'] == 'done'
+    assert (second['status'], second['attempts']) == ('queued', 0)
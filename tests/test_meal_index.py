@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+from meal_index import MealIndex
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+
+def entry(entry_id, user_input, created_at):
+    return {
+        'id': entry_id,
+        'user_input': user_input,
+        'created_at': created_at,
+        'date': created_at[:10],
+        'total_calories': 300,
+        'detailed_breakdown': [{'food': user_input, 'total_calories': 300}]
+    }
+
+
+def test_reference_buckets_meals_in_the_users_timezone():
+    # Stored in UTC: 02:30Z is 08:00 breakfast in IST, 14:00Z is 19:30 dinner
+    index = MealIndex([
+        entry(2, '2 chapati and dal', '2026-10-18T14:00:00+00:00'),
+        entry(1, 'poha', '2026-10-18T02:30:00+00:00'),
+    ])
+    now = datetime(2026, 10, 19, 8, 30, tzinfo=IST)
+    assert index.resolve_reference('same breakfast as yesterday', now)['id'] == 1
+    assert index.resolve_reference('same dinner as yesterday', now)['id'] == 2
+    # No meal named: the one logged at this time of day
+    assert index.resolve_reference('same as yesterday', now)['id'] == 1
+
+
+def test_reference_day_follows_the_users_timezone():
+    # 20:00Z on the 18th is 01:30 on the 19th in IST: a meal from today, not yesterday
+    index = MealIndex([entry(1, 'maggi', '2026-10-18T20:00:00+00:00')])
+    now = datetime(2026, 10, 19, 9, 0, tzinfo=IST)
+    assert index.resolve_reference('same breakfast as yesterday', now) is None
+    assert index.resolve_reference('same breakfast as today', now)['id'] == 1
+
+
+def test_added_entry_is_found_without_a_rebuild():
+    index = MealIndex([entry(1, 'poha', '2026-10-18T02:30:00+00:00')], limit=2)
+    index.add(entry(2, '2 idli with sambar', '2026-10-18T06:30:00+00:00'))
+    index.add(entry(2, '2 idli with sambar', '2026-10-18T06:30:00+00:00'))
+    index.add(entry(3, 'masala dosa', '2026-10-18T13:30:00+00:00'))
+
+    assert [known['id'] for known in index.entries] == [3, 2]
+    assert index.most_similar('2 idli with sambar')[0]['id'] == 2
+    assert index.most_similar('poha') is None
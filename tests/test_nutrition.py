@@ -0,0 +1,50 @@
+import pytest
+
+from nutrition import food_matcher, measure_portion, parse_quantity
+
+
+def test_count_in_portion_is_not_applied_twice():
+    assert measure_portion('Idli', 3, '3 pieces')['total_multiplier'] == 3.0
+    assert measure_portion('Chapati', 2, '2 pieces')['total_multiplier'] == 2.0
+
+
+def test_weighed_portion_matches_weighed_quantity():
+    as_portion = measure_portion('Rice', 1, '200g')
+    as_quantity = measure_portion('Rice', '200g')
+    assert as_portion['total_multiplier'] == as_quantity['total_multiplier'] == 1.0
+    assert as_portion['grams'] == as_quantity['grams'] == 200.0
+
+
+def test_fractional_portion_still_sizes_the_serving():
+    assert measure_portion('Rice', 1, 'half plate')['total_multiplier'] == measure_portion('Rice', 1, '1/2 plate')['total_multiplier']
+    assert measure_portion('Rice', 2, 'large bowl')['total_multiplier'] == 2 * measure_portion('Rice', 1, 'large bowl')['total_multiplier']
+
+
+@pytest.mark.parametrize('text, amount', [
+    ('250kcal', 250.0),
+    ('100cal', 100.0),
+    ('500mg', 500.0),
+    ('1,200', 1200.0),
+    ('Calories: 1,200 kcal', 1200.0),
+    ('2 grapes', 2.0),
+])
+def test_numbers_are_never_split(text, amount):
+    assert parse_quantity(text, default=0.0)['amount'] == amount
+
+
+def test_units_still_need_a_word_boundary():
+    assert parse_quantity('200g')['grams'] == 200.0
+    assert parse_quantity('2 grapes')['unit'] is None
+
+
+@pytest.mark.parametrize('message', [
+    'what dose of vitamin d should i take',
+    'how many doses do i need',
+    'i was idly scrolling through recipes',
+])
+def test_english_words_are_not_foods_in_chat(message):
+    assert food_matcher.find(message, fuzzy=False) == []
+
+
+def test_english_alias_counts_after_a_quantity():
+    assert [match['food'] for match in food_matcher.find('had 3 idly and sambar', fuzzy=False)] == ['idli', 'sambar']